@@ -0,0 +1,81 @@
+"""Alertas de estoque baixo, mantidos junto com os saldos em memória (saldo_estoque.py).
+
+Um medicamento está em alerta quando o saldo fica abaixo da quantidade mínima (os
+descontinuados não entram). A carga completa dos saldos reavalia todos os medicamentos;
+cada leva de movimentos novos reavalia só os medicamentos tocados. Os alertas ficam em
+uma lista ordenada pela cobertura (saldo / mínimo, os mais críticos primeiro), mantida
+com `bisect`, e a resposta de /api/alertas/estoque_baixo é remontada apenas quando o
+conjunto muda, então consultar a rota não percorre tabela nenhuma.
+"""
+import bisect
+import threading
+import time
+from datetime import datetime
+
+STATUS_DESCONTINUADO = 'Descontinuado'
+
+
+def em_alerta(item):
+    """Saldo abaixo do mínimo, para medicamentos que continuam em linha."""
+    return item['Saldo'] < item['Quantidade Minima'] and STATUS_DESCONTINUADO not in item['Status']
+
+
+def _ordem(item, chave):
+    # Cobertura do mínimo; sem mínimo (saldo negativo) vem antes de todos
+    minimo = item['Quantidade Minima']
+    return (item['Saldo'] / minimo if minimo > 0 else float('-inf'), chave)
+
+
+class AlertasEstoqueBaixo:
+    """Medicamentos abaixo da quantidade mínima, reavaliados a cada mudança de saldo."""
+
+    def __init__(self, saldos):
+        self.versao = 0
+        self.alertas = []  # Resposta publicada, na ordem de `_ordenados`
+        self._ordenados = []  # (cobertura, chave) dos medicamentos em alerta
+        self._atuais = {}  # Chave -> (ordem em _ordenados, registro do alerta)
+        self._lock = threading.Lock()
+        saldos.observar(self.reavaliar)
+        if saldos.carregado.is_set():
+            self.reavaliar(saldos.itens, None)
+
+    def reavaliar(self, itens, tocados=None):
+        """Reavalia os medicamentos `tocados` (todos quando None) e publica a lista se algo mudou."""
+        inicio = time.perf_counter()
+        with self._lock:
+            if tocados is None:
+                tocados = itens.keys() | self._atuais.keys()
+
+            mudou = False
+            for chave in tocados:
+                item = itens.get(chave)
+                anterior = self._atuais.get(chave)
+                if item is not None and em_alerta(item):
+                    ordem = _ordem(item, chave)
+                    if anterior is not None and anterior[0] == ordem and anterior[1]['Saldo'] == item['Saldo']:
+                        continue
+                    if anterior is not None:
+                        self._remover(anterior[0])
+                    bisect.insort(self._ordenados, ordem)
+                    self._atuais[chave] = (ordem, {
+                        'Medicamento': item['Medicamento'],
+                        'Saldo': item['Saldo'],
+                        'Quantidade Minima': item['Quantidade Minima'],
+                        'Falta': item['Quantidade Minima'] - item['Saldo'],
+                        # Quando o medicamento entrou em alerta (mantido enquanto ele continuar abaixo)
+                        'Desde': anterior[1]['Desde'] if anterior is not None else datetime.now().isoformat(),
+                    })
+                    mudou = True
+                elif anterior is not None:
+                    self._remover(anterior[0])
+                    del self._atuais[chave]
+                    mudou = True
+
+            if mudou:
+                # Troca atômica da resposta: a rota só devolve a lista publicada
+                self.alertas = [self._atuais[chave][1] for _, chave in self._ordenados]
+                self.versao += 1
+        return {'alertas': len(self.alertas), 'tempo_ms': round((time.perf_counter() - inicio) * 1000, 3)}
+
+    def _remover(self, ordem):
+        del self._ordenados[bisect.bisect_left(self._ordenados, ordem)]
@@ -0,0 +1,204 @@
+"""Artefato pré-compilado do chatbot.
+
+O `medicamento.json` é compilado uma vez em um arquivo binário com tudo o que o `ChatBot`
+precisa para responder: vocabulário, matriz esparsa (CSR, termo x padrão) dos padrões
+normalizados, tag de cada padrão e índice de correção ortográfica. Os arrays são lidos
+com mmap, sem cópia, então cada processo carrega o artefato em milissegundos e os
+processos da API compartilham as mesmas páginas de memória.
+
+Formato: `MAGICO`, tamanho do cabeçalho (uint64), cabeçalho JSON e os arrays, cada um
+alinhado em `ALINHAMENTO` bytes. O cabeçalho guarda o checksum do JSON de origem; se o
+JSON mudar, o artefato é recompilado na próxima carga.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from ortografia import CorretorOrtografico
+
+MAGICO = b'SFCHATB1'
+FORMATO = 1
+ALINHAMENTO = 64
+CUTOFF_ORTOGRAFIA = 0.8
+
+
+class Artefato:
+    """Conteúdo do artefato: metadados do cabeçalho e arrays (mapeados em memória ou não)."""
+
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.arrays = arrays
+
+    def textos(self, nome):
+        """Lista de textos guardada como UTF-8 separado por '\\0'."""
+        dados = self.arrays[nome]
+        if dados.size == 0:
+            return []
+        return dados.tobytes().decode('utf-8').split('\0')
+
+
+def caminho_padrao(caminho_intents):
+    return os.path.splitext(caminho_intents)[0] + '.chatbot.bin'
+
+
+def calcular_checksum(conteudo):
+    """Checksum do JSON de origem e dos parâmetros da compilação."""
+    return hashlib.sha256(conteudo + f'|{FORMATO}|{CUTOFF_ORTOGRAFIA}'.encode()).hexdigest()
+
+
+def _textos(lista):
+    return np.frombuffer('\0'.join(lista).encode('utf-8'), dtype=np.uint8)
+
+
+def compilar(conteudo):
+    """Compila o JSON das intents (bytes) no conteúdo do artefato."""
+    # O scikit-learn só é necessário aqui, na compilação
+    from sklearn.feature_extraction.text import CountVectorizer
+    from sklearn.preprocessing import normalize
+
+    intents = json.loads(conteudo)['intents']
+
+    padroes, tags_padroes, respostas = [], [], {}
+    for intent in intents:
+        for padrao in intent['patterns']:
+            padroes.append(padrao.lower())
+            tags_padroes.append(intent['tag'])
+        # Como na busca linear original, vale a primeira intent com a tag
+        respostas.setdefault(intent['tag'], intent.get('responses'))
+
+    vetorizador = CountVectorizer().fit(padroes)
+    matriz = normalize(vetorizador.transform(padroes)).T.tocsr()
+    matriz.sort_indices()
+
+    corretor = CorretorOrtografico(" ".join(padroes).split(), cutoff=CUTOFF_ORTOGRAFIA)
+    return montar(tags_padroes, respostas, vetorizador.get_feature_names_out().tolist(),
+                  matriz.indptr, matriz.indices, matriz.data, corretor, calcular_checksum(conteudo))
+
+
+def montar(tags_padroes, respostas, termos, indptr, indices, dados, corretor, checksum=None):
+    """Conteúdo do artefato a partir da matriz CSR (termo x padrão) já normalizada.
+
+    Usado por `compilar` e pelo catálogo de intents gerado do banco (catalogo_chatbot.py).
+    """
+    tags = list(dict.fromkeys(tags_padroes))
+    posicao_tag = {tag: i for i, tag in enumerate(tags)}
+    palavras, letras, tamanhos, contagens = corretor.indice()
+
+    meta = {
+        'formato': FORMATO,
+        'checksum': checksum,
+        'padroes': len(tags_padroes),
+        'letras': letras,
+        'cutoff': corretor.cutoff,
+        'respostas': respostas,
+    }
+    arrays = {
+        'termos': _textos(termos),
+        'matriz_indptr': np.asarray(indptr, dtype=np.int64),
+        'matriz_indices': np.asarray(indices, dtype=np.int32),
+        'matriz_dados': np.asarray(dados, dtype=np.float64),
+        'tags': _textos(tags),
+        'tag_padrao': np.array([posicao_tag[tag] for tag in tags_padroes], dtype=np.int32),
+        'palavras': _textos(palavras),
+        'tamanhos': np.ascontiguousarray(tamanhos, dtype=np.float64),
+        'contagens': np.ascontiguousarray(contagens, dtype=np.int32),
+    }
+    return Artefato(meta, arrays)
+
+
+def _alinhar(posicao):
+    return -(-posicao // ALINHAMENTO) * ALINHAMENTO
+
+
+def salvar(artefato, destino):
+    """Grava o artefato de forma atômica (arquivo temporário + rename)."""
+    descricao, posicao = {}, 0
+    for nome, array in artefato.arrays.items():
+        posicao = _alinhar(posicao)
+        descricao[nome] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': posicao}
+        posicao += array.nbytes
+
+    cabecalho = json.dumps(dict(artefato.meta, arrays=descricao), ensure_ascii=False).encode('utf-8')
+    inicio_dados = _alinhar(len(MAGICO) + 8 + len(cabecalho))
+
+    diretorio = os.path.dirname(os.path.abspath(destino))
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, suffix='.tmp')
+    try:
+        with os.fdopen(descritor, 'wb') as f:
+            f.write(MAGICO + struct.pack('<Q', len(cabecalho)) + cabecalho)
+            for nome, array in artefato.arrays.items():
+                f.seek(inicio_dados + descricao[nome]['offset'])
+                f.write(np.ascontiguousarray(array).tobytes())
+        os.chmod(temporario, 0o644)  # mkstemp cria com 0600; os workers só precisam ler
+        os.replace(temporario, destino)
+    except BaseException:
+        os.remove(temporario)
+        raise
+
+
+def carregar(caminho):
+    """Abre o artefato com mmap; os arrays apontam direto para as páginas do arquivo."""
+    with open(caminho, 'rb') as f:
+        mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # Arquivo truncado ou mal formado vira ValueError, que `carregar_ou_compilar` recompila
+    inicio_cabecalho = len(MAGICO) + 8
+    if len(mapa) < inicio_cabecalho or mapa[:len(MAGICO)] != MAGICO:
+        raise ValueError(f'{caminho} não é um artefato do chatbot.')
+    (tamanho_cabecalho,) = struct.unpack('<Q', mapa[len(MAGICO):inicio_cabecalho])
+    if inicio_cabecalho + tamanho_cabecalho > len(mapa):
+        raise ValueError(f'{caminho} está truncado.')
+    meta = json.loads(mapa[inicio_cabecalho:inicio_cabecalho + tamanho_cabecalho].decode('utf-8'))
+    if not isinstance(meta, dict) or not isinstance(meta.get('arrays'), dict):
+        raise ValueError(f'Cabeçalho de {caminho} sem a descrição dos arrays.')
+    inicio_dados = _alinhar(inicio_cabecalho + tamanho_cabecalho)
+
+    arrays = {}
+    for nome, descricao in meta.pop('arrays').items():
+        try:
+            dtype = np.dtype(descricao['dtype'])
+            quantidade = int(np.prod(descricao['shape']))
+            if quantidade == 0:
+                arrays[nome] = np.empty(descricao['shape'], dtype=dtype)
+                continue
+            # O frombuffer recusa (ValueError) offset ou tamanho além do fim do arquivo
+            arrays[nome] = np.frombuffer(mapa, dtype=dtype, count=quantidade,
+                                         offset=inicio_dados + descricao['offset']).reshape(descricao['shape'])
+        except (KeyError, TypeError) as e:
+            raise ValueError(f'Array {nome} mal descrito em {caminho}: {e!r}') from e
+    return Artefato(meta, arrays)
+
+
+def compilar_arquivo(caminho_intents, caminho_artefato=None):
+    """Etapa de build: compila as intents e grava o artefato. Retorna o caminho gravado."""
+    caminho_artefato = caminho_artefato or caminho_padrao(caminho_intents)
+    with open(caminho_intents, 'rb') as f:
+        salvar(compilar(f.read()), caminho_artefato)
+    return caminho_artefato
+
+
+def carregar_ou_compilar(caminho_intents, caminho_artefato=None):
+    """Carrega o artefato das intents, recompilando-o se não existir ou estiver desatualizado."""
+    caminho_artefato = caminho_artefato or caminho_padrao(caminho_intents)
+    with open(caminho_intents, 'rb') as f:
+        conteudo = f.read()
+    checksum = calcular_checksum(conteudo)
+
+    try:
+        artefato = carregar(caminho_artefato)
+        if artefato.meta.get('formato') == FORMATO and artefato.meta.get('checksum') == checksum:
+            return artefato
+    except (OSError, ValueError):
+        pass  # Ausente ou corrompido: compila de novo
+
+    artefato = compilar(conteudo)
+    try:
+        salvar(artefato, caminho_artefato)
+    except OSError:
+        return artefato  # Sem permissão de escrita: usa o resultado em memória
+    return carregar(caminho_artefato)
@@ -0,0 +1,424 @@
+"""Benchmarks da API e do chatbot sobre o banco local (sqlite_local.py).
+
+Cada cenário roda em um processo separado, para que o pico de memória (RSS) seja só dele:
+
+    python stock_flux_api/benchmark.py executar --estoque 1000 100000 --intencoes 10 1000 \\
+        --concorrencia 1 8 --saida resultado.json
+    python stock_flux_api/benchmark.py comparar antes.json depois.json
+
+Execute a partir da raiz do repositório (o chatbot lê stock_flux_api/medicamento.json).
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+# Rotas exercitadas no cenário da API: nome, método, URL e corpo (escritas idempotentes,
+# que regravam os valores gerados por sqlite_local.gerar_dados)
+ROTAS_API = [
+    ('GET', '/api/medicamentos', None),
+    ('GET', '/api/medicamentos?medicamento_nome=Paracetamol', None),
+    ('GET', '/api/medicamentos/id?nome_medicamento=Dipirona', None),
+    ('GET', '/api/status', None),
+    ('GET', '/api/fornecedores', None),
+    ('GET', '/api/materiais', None),
+    ('GET', '/api/categorias', None),
+    ('GET', '/api/motivos', None),
+    ('GET', '/api/cargos', None),
+    ('GET', '/api/departamentos', None),
+    ('GET', '/api/etapas_producao', None),
+    ('GET', '/api/estoque', None),
+    ('GET', '/api/estoque?medicamento_id=1', None),
+    ('GET', '/api/estoque?limit=1000', None),
+    ('GET', '/api/estoque/saldo', None),
+    ('GET', '/api/alertas/estoque_baixo', None),
+    ('GET', '/api/producao', None),
+    ('GET', '/api/producao?limit=1000', None),
+    ('GET', '/api/entradas_previstas', None),
+    ('GET', '/api/atrasos_producao', None),
+    ('GET', '/api/dashboard?medicamento_id=1', None),
+    ('GET', '/api/export/estoque?medicamento_id=1', None),
+    ('PUT', '/api/status', {'Id': 1, 'Descrição': 'Ativo', 'Motivo': 'Em linha'}),
+    ('PUT', '/api/fornecedores/bulk', [
+        {'Id': i, 'Nome': f'Fornecedor {i}', 'Telefone': f'11 9{i:04d}-{i:04d}', 'Email': f'contato{i}@fornecedor{i}.com.br'}
+        for i in range(1, 51)
+    ]),
+]
+
+SILABAS = ['ba', 'be', 'ci', 'da', 'do', 'fe', 'ga', 'la', 'li', 'ma', 'mi', 'na', 'no', 'pa', 'pi', 'ra',
+           'ri', 'sa', 'so', 'ta', 'te', 'to', 'va', 'xi', 'za', 'zo']
+
+ERROS_DIGITACAO = 0.2  # Fração das mensagens do chatbot com uma letra trocada
+LOTE_CHATBOT = 100  # Mensagens por chamada de /api/chatbot/bulk
+LINHAS_SERIALIZACAO = 100000  # Linhas de estoque na medição dos serializadores JSON
+
+
+# Preparação dos dados
+
+def preparar_banco(diretorio, estoque, semente):
+    """Gera (uma única vez) o banco SQLite com `estoque` movimentações."""
+    import sqlite_local
+
+    caminho = os.path.join(diretorio, f'estoque_{estoque}_s{semente}.db')
+    if not os.path.exists(caminho):
+        inicio = time.perf_counter()
+        gerar = caminho + '.tmp'
+        sqlite_local.gerar_dados(gerar, estoque=estoque, producao=max(1000, estoque // 10),
+                                 medicamentos=max(200, min(estoque // 1000, 5000)), semente=semente)
+        os.replace(gerar, caminho)
+        print(f'  banco {os.path.basename(caminho)} gerado em {time.perf_counter() - inicio:.1f}s', file=sys.stderr)
+    return caminho
+
+
+def _nome_sintetico(i):
+    nome = ''
+    i += 1
+    while i:
+        i, resto = divmod(i - 1, len(SILABAS))
+        nome = SILABAS[resto] + nome
+    return nome + 'ina'
+
+
+def preparar_intencoes(diretorio, quantidade, semente):
+    """Gera um arquivo de intents com `quantidade` medicamentos, no formato do medicamento.json.
+
+    Os padrões de cada intent seguem os do Paracetamol no arquivo original, com o nome trocado.
+    """
+    caminho = os.path.join(diretorio, f'intencoes_{quantidade}_s{semente}.json')
+    if os.path.exists(caminho):
+        return caminho
+
+    import sqlite_local
+    from catalogo_chatbot import modelos_padroes
+
+    modelos = modelos_padroes(os.path.join(DIRETORIO, 'medicamento.json'))
+
+    nomes = [nome.lower() for nome in sqlite_local.MEDICAMENTOS]
+    nomes += [_nome_sintetico(i) for i in range(max(0, quantidade - len(nomes)))]
+    intents = [{'tag': nome.capitalize(), 'patterns': [modelo.format(nome=nome) for modelo in modelos]}
+               for nome in nomes[:quantidade]]
+
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump({'intents': intents}, f, ensure_ascii=False)
+    return caminho
+
+
+def mensagens_chatbot(caminho_intents, quantidade, semente):
+    """Mensagens de teste: padrões das intents, parte delas com um erro de digitação."""
+    aleatorio = random.Random(semente)
+    with open(caminho_intents, encoding='utf-8') as f:
+        padroes = [padrao for intent in json.load(f)['intents'] for padrao in intent['patterns']]
+
+    mensagens = []
+    for _ in range(quantidade):
+        mensagem = aleatorio.choice(padroes)
+        if aleatorio.random() < ERROS_DIGITACAO and len(mensagem) > 3:
+            posicao = aleatorio.randrange(len(mensagem))
+            mensagem = mensagem[:posicao] + aleatorio.choice('abcdefghijklmnopqrstuvwxyz') + mensagem[posicao + 1:]
+        mensagens.append(mensagem)
+    return mensagens
+
+
+# Medição
+
+def percentil(valores_ordenados, p):
+    """Percentil pelo método nearest-rank."""
+    if not valores_ordenados:
+        return None
+    indice = max(0, math.ceil(p / 100 * len(valores_ordenados)) - 1)
+    return valores_ordenados[indice]
+
+
+def medir(chamar, requisicoes, concorrencia, aquecimento):
+    """Executa `chamar(i)` `requisicoes` vezes com `concorrencia` threads e resume as latências."""
+    for i in range(aquecimento):
+        chamar(i)
+
+    latencias = []
+    erros = 0
+    lock = threading.Lock()
+
+    def executar(i):
+        nonlocal erros
+        inicio = time.perf_counter()
+        ok = chamar(i)
+        duracao = time.perf_counter() - inicio
+        with lock:
+            latencias.append(duracao)
+            if ok is False:
+                erros += 1
+
+    inicio = time.perf_counter()
+    if concorrencia == 1:
+        for i in range(requisicoes):
+            executar(i)
+    else:
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            list(executor.map(executar, range(requisicoes)))
+    total = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        'requisicoes': requisicoes,
+        'erros': erros,
+        'throughput_rps': round(requisicoes / total, 3) if total else None,
+        'media_ms': round(sum(latencias) / len(latencias) * 1000, 3),
+        'p50_ms': round(percentil(latencias, 50) * 1000, 3),
+        'p95_ms': round(percentil(latencias, 95) * 1000, 3),
+        'p99_ms': round(percentil(latencias, 99) * 1000, 3),
+        'max_ms': round(latencias[-1] * 1000, 3),
+    }
+
+
+def rss_pico_mb():
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KiB e macOS em bytes
+    return round(pico / 1024 / 1024 if sys.platform == 'darwin' else pico / 1024, 1)
+
+
+def _cliente(app):
+    local = threading.local()
+
+    def cliente():
+        if not hasattr(local, 'cliente'):
+            local.cliente = app.test_client()
+        return local.cliente
+    return cliente
+
+
+def executar_cenario(cenario, opcoes):
+    """Roda um cenário no processo atual. Chamado pelo subprocesso de `executar`."""
+    filtro = re.compile(opcoes['rotas']) if opcoes.get('rotas') else None
+    resultados = {}
+    inicio = time.perf_counter()
+
+    if cenario['tipo'] == 'api':
+        os.environ['STOCKFLUX_SQLITE'] = cenario['banco']
+        import main
+        from consultas import listar
+        from modelos import estoque_model
+        cliente = _cliente(main.app)
+
+        for metodo, url, corpo in ROTAS_API:
+            nome = f'{metodo} {url}'
+            if filtro and not filtro.search(nome):
+                continue
+
+            def chamar(i, metodo=metodo, url=url, corpo=corpo):
+                resposta = cliente().open(url, method=metodo, json=corpo)
+                resposta.get_data()  # Consome o corpo (inclusive as respostas em streaming)
+                return resposta.status_code < 400
+
+            resultados[nome] = medir(chamar, opcoes['requisicoes'], cenario['concorrencia'], opcoes['aquecimento'])
+
+        # Caminho quente sem HTTP: execução, fetchall e montagem dos registros
+        nome = 'consultas.listar estoque'
+        if not filtro or filtro.search(nome):
+            resultados[nome] = medir(lambda i: bool(listar('estoque', {}, estoque_model)) or True,
+                                     opcoes['requisicoes'], cenario['concorrencia'], opcoes['aquecimento'])
+
+        # Montagem dos registros e corpo JSON de até LINHAS_SERIALIZACAO linhas com cada serializador
+        # (com o orjson as datas não são convertidas linha a linha)
+        import respostas
+        atual = respostas.SERIALIZADOR
+        for serializador in ('json', 'orjson') if respostas.orjson is not None else ('json',):
+            nome = f'listar + serializar estoque ({LINHAS_SERIALIZACAO} linhas, {serializador})'
+            if filtro and not filtro.search(nome):
+                continue
+            respostas.SERIALIZADOR = serializador
+            pagina = (None, LINHAS_SERIALIZACAO)
+            resultados[nome] = medir(lambda i: bool(respostas.serializar(listar('estoque', {}, estoque_model, pagina))),
+                                     opcoes['requisicoes'], cenario['concorrencia'], opcoes['aquecimento'])
+        respostas.SERIALIZADOR = atual
+    else:
+        import main
+        from chatbot import ChatBot
+        main.bot = ChatBot(cenario['intents'])
+        carga = time.perf_counter() - inicio
+        mensagens = mensagens_chatbot(cenario['intents'], opcoes['requisicoes'] + opcoes['aquecimento'], opcoes['semente'])
+        cliente = _cliente(main.app)
+
+        nome = 'POST /api/chatbot'
+        if not filtro or filtro.search(nome):
+            def chamar(i):
+                resposta = cliente().post('/api/chatbot', json={'message': mensagens[i % len(mensagens)]})
+                return resposta.status_code < 400
+            resultados[nome] = medir(chamar, opcoes['requisicoes'], cenario['concorrencia'], opcoes['aquecimento'])
+
+        nome = f'POST /api/chatbot/bulk ({LOTE_CHATBOT} mensagens)'
+        if not filtro or filtro.search(nome):
+            def chamar(i):
+                lote = [mensagens[(i * LOTE_CHATBOT + j) % len(mensagens)] for j in range(LOTE_CHATBOT)]
+                return cliente().post('/api/chatbot/bulk', json={'messages': lote}).status_code < 400
+            resultados[nome] = medir(chamar, opcoes['requisicoes'], cenario['concorrencia'], opcoes['aquecimento'])
+
+        nome = 'ChatBot.encontrar_intencao'
+        if not filtro or filtro.search(nome):
+            resultados[nome] = medir(lambda i: main.bot.encontrar_intencao(mensagens[i % len(mensagens)]) or True,
+                                     opcoes['requisicoes'], cenario['concorrencia'], opcoes['aquecimento'])
+
+        # Busca do chatbot (k=1, acima de 0.5) pelo índice invertido e exaustiva, sem a correção ortográfica
+        corrigidas = [main.bot.corrigir_ortografia(mensagem) for mensagem in mensagens]
+        for nome, buscar in (('ChatBot.buscar', main.bot.buscar), ('ChatBot.buscar_exaustivo', main.bot.buscar_exaustivo)):
+            if not filtro or filtro.search(nome):
+                resultados[nome] = medir(lambda i, buscar=buscar: buscar(corrigidas[i % len(corrigidas)], 1, 0.5) or True,
+                                         opcoes['requisicoes'], cenario['concorrencia'], opcoes['aquecimento'])
+        cenario = dict(cenario, carga_chatbot_s=round(carga, 3))
+
+    return dict(cenario, duracao_s=round(time.perf_counter() - inicio, 3), rss_pico_mb=rss_pico_mb(), resultados=resultados)
+
+
+def chave_cenario(cenario):
+    if cenario['tipo'] == 'api':
+        return f"api estoque={cenario['estoque']} concorrencia={cenario['concorrencia']}"
+    return f"chatbot intencoes={cenario['intencoes']} concorrencia={cenario['concorrencia']}"
+
+
+def executar(args):
+    os.makedirs(args.dados, exist_ok=True)
+    opcoes = {
+        'requisicoes': args.requisicoes,
+        'aquecimento': args.aquecimento,
+        'rotas': args.rotas,
+        'semente': args.semente,
+    }
+
+    cenarios = []
+    for estoque, concorrencia in itertools.product(args.estoque, args.concorrencia):
+        banco = preparar_banco(args.dados, estoque, args.semente)
+        cenarios.append({'tipo': 'api', 'estoque': estoque, 'concorrencia': concorrencia, 'banco': banco})
+    for intencoes, concorrencia in itertools.product(args.intencoes, args.concorrencia):
+        caminho = preparar_intencoes(args.dados, intencoes, args.semente)
+        cenarios.append({'tipo': 'chatbot', 'intencoes': intencoes, 'concorrencia': concorrencia, 'intents': caminho})
+
+    resultados = []
+    for cenario in cenarios:
+        print(f'{chave_cenario(cenario)} ...', file=sys.stderr)
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as arquivo:
+            saida = arquivo.name
+        try:
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '_cenario', json.dumps(cenario), json.dumps(opcoes), saida],
+                check=True,
+            )
+            with open(saida, encoding='utf-8') as f:
+                resultado = json.load(f)
+        finally:
+            os.remove(saida)
+        resultado.pop('banco', None)
+        resultado.pop('intents', None)
+        resultados.append(resultado)
+
+    relatorio = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'parametros': dict(opcoes, estoque=args.estoque, intencoes=args.intencoes, concorrencia=args.concorrencia),
+        'cenarios': resultados,
+    }
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+    else:
+        print(texto)
+
+
+def _variacao(antes, depois):
+    if not antes or depois is None:
+        return None
+    return round((depois - antes) / antes * 100, 1)
+
+
+def comparar(args):
+    """Compara dois relatórios; termina com código 1 se alguma métrica piorou mais que o limite."""
+    with open(args.antes, encoding='utf-8') as f:
+        antes = {chave_cenario(c): c for c in json.load(f)['cenarios']}
+    with open(args.depois, encoding='utf-8') as f:
+        depois = {chave_cenario(c): c for c in json.load(f)['cenarios']}
+
+    regressoes = []
+    linhas = []
+    for chave in sorted(antes.keys() & depois.keys()):
+        a, d = antes[chave], depois[chave]
+        linhas.append(f'\n{chave}  (RSS {a["rss_pico_mb"]} -> {d["rss_pico_mb"]} MB, {_variacao(a["rss_pico_mb"], d["rss_pico_mb"])}%)')
+        linhas.append(f'  {"rota":<55} {"rps":>8} {"p50":>8} {"p95":>8} {"p99":>8}')
+        for rota in sorted(a['resultados'].keys() & d['resultados'].keys()):
+            ra, rd = a['resultados'][rota], d['resultados'][rota]
+            variacoes = {
+                'throughput_rps': _variacao(ra['throughput_rps'], rd['throughput_rps']),
+                'p50_ms': _variacao(ra['p50_ms'], rd['p50_ms']),
+                'p95_ms': _variacao(ra['p95_ms'], rd['p95_ms']),
+                'p99_ms': _variacao(ra['p99_ms'], rd['p99_ms']),
+            }
+            linhas.append(f'  {rota:<55} ' + ' '.join(
+                f'{v:>+7.1f}%' if v is not None else f'{"-":>8}' for v in variacoes.values()))
+
+            # Throughput menor ou latência maior que o limite conta como regressão
+            if (variacoes['throughput_rps'] or 0) < -args.limite or (variacoes['p95_ms'] or 0) > args.limite:
+                regressoes.append(f'{chave} {rota}')
+
+    print('\n'.join(linhas))
+    if regressoes:
+        print(f'\n{len(regressoes)} regressão(ões) acima de {args.limite}%:')
+        for regressao in regressoes:
+            print(f'  {regressao}')
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks da API StockFlux e do chatbot')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    p_executar = subparsers.add_parser('executar', help='roda os cenários e grava o relatório JSON')
+    p_executar.add_argument('--estoque', type=int, nargs='+', default=[1000, 100000],
+                            help='tamanhos da tabela de estoque (um banco por tamanho)')
+    p_executar.add_argument('--intencoes', type=int, nargs='+', default=[10, 1000], help='quantidade de intents do chatbot')
+    p_executar.add_argument('--concorrencia', type=int, nargs='+', default=[1, 8], help='requisições simultâneas')
+    p_executar.add_argument('--requisicoes', type=int, default=50, help='requisições medidas por rota')
+    p_executar.add_argument('--aquecimento', type=int, default=2, help='requisições descartadas antes da medição')
+    p_executar.add_argument('--rotas', help='expressão regular para filtrar as rotas (ex.: "estoque|chatbot")')
+    p_executar.add_argument('--dados', default=os.path.join(tempfile.gettempdir(), 'stockflux_benchmark'),
+                            help='diretório dos bancos e intents gerados (reaproveitados entre execuções)')
+    p_executar.add_argument('--semente', type=int, default=42)
+    p_executar.add_argument('--saida', help='arquivo do relatório (padrão: stdout)')
+
+    p_comparar = subparsers.add_parser('comparar', help='compara dois relatórios')
+    p_comparar.add_argument('antes')
+    p_comparar.add_argument('depois')
+    p_comparar.add_argument('--limite', type=float, default=10.0, help='variação (%%) considerada regressão')
+
+    args = parser.parse_args()
+    if args.comando == 'executar':
+        executar(args)
+        return 0
+    return comparar(args)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 5 and sys.argv[1] == '_cenario':
+        # Subprocesso de um cenário: a saída do chatbot e da API não se mistura ao relatório
+        cenario, opcoes, saida = json.loads(sys.argv[2]), json.loads(sys.argv[3]), sys.argv[4]
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+            resultado = executar_cenario(cenario, opcoes)
+        with open(saida, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f)
+    else:
+        sys.exit(main())
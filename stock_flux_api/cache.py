@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request
+
+from respostas import RespostaPronta, serializar_flask
+
+# Tempo de vida (segundos) das respostas em cache por tabela
+CACHE_TTL = {
+    'status': 300,
+    'categorias': 3600,
+    'motivos': 3600,
+    'cargos': 3600,
+    'departamentos': 3600,
+    'etapas_producao': 3600,
+    'fornecedores': 300,
+    'materiais': 300,
+}
+
+CACHE_MAX_ENTRIES = 512
+
+
+class TTLCache:
+    """Cache LRU em memória com expiração por entrada."""
+
+    def __init__(self, maxsize=CACHE_MAX_ENTRIES, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, chave):
+        """Retorna (encontrado, valor). Entradas expiradas contam como ausentes."""
+        with self._lock:
+            entrada = self._dados.get(chave)
+            if entrada is None:
+                self.misses += 1
+                return False, None
+
+            expira_em, valor = entrada
+            if expira_em < time.monotonic():
+                del self._dados[chave]
+                self.misses += 1
+                return False, None
+
+            self._dados.move_to_end(chave)
+            self.hits += 1
+            return True, valor
+
+    def set(self, chave, valor, ttl=None):
+        expira_em = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._dados[chave] = (expira_em, valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.maxsize:
+                self._dados.popitem(last=False)  # Remove a entrada usada há mais tempo
+
+    def invalidate(self, tabela):
+        """Remove todas as entradas da tabela, independentemente dos filtros."""
+        with self._lock:
+            for chave in [c for c in self._dados if c[0] == tabela]:
+                del self._dados[chave]
+
+    def clear(self):
+        with self._lock:
+            self._dados.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._dados), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+
+lookup_cache = TTLCache()
+
+# Versão de cada tabela, incrementada pelas rotas de escrita (invalidate). Uma resposta só
+# entra no cache se a versão não mudou durante a consulta, assim uma leitura que começou
+# antes de uma escrita não guarda o conteúdo antigo depois da invalidação.
+_versoes = {}
+_versoes_lock = threading.Lock()
+
+
+def versao(tabela):
+    return _versoes.get(tabela, 0)
+
+
+def chave_cache(tabela, args):
+    """Chave de uma listagem: a tabela mais os filtros da URL, com todos os valores de cada parâmetro."""
+    if hasattr(args, 'multi_items'):  # QueryParams do Starlette (modo ASGI)
+        itens = args.multi_items()
+    else:  # MultiDict do werkzeug
+        itens = args.items(multi=True)
+    return (tabela, tuple(sorted(itens)))
+
+
+def cached(tabela):
+    """Decorador para GETs de tabelas de apoio: a chave é a tabela mais os filtros da URL.
+
+    Guarda a resposta já serializada e com a ETag (respostas.py), que a representação JSON
+    devolve como está, ou como 304 se o cliente já tiver o corpo.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            chave = chave_cache(tabela, request.args)
+            encontrado, pronta = lookup_cache.get(chave)
+            if encontrado:
+                return pronta
+
+            versao_consulta = versao(tabela)
+            valor = func(*args, **kwargs)
+            # Respostas de erro, como (corpo, 404), não são guardadas
+            if not isinstance(valor, list):
+                return valor
+            pronta = RespostaPronta(serializar_flask(valor))
+            if versao(tabela) == versao_consulta:
+                lookup_cache.set(chave, pronta, CACHE_TTL.get(tabela))
+            return pronta
+        return wrapper
+    return decorator
+
+
+def invalidate(*tabelas):
+    for tabela in tabelas:
+        with _versoes_lock:
+            _versoes[tabela] = versao(tabela) + 1
+        lookup_cache.invalidate(tabela)
@@ -0,0 +1,193 @@
+"""Intents do chatbot geradas a partir da tabela de medicamentos (get_medicamentos).
+
+Cada medicamento vira uma intent cujos padrões são os modelos de `modelos_padroes` com o
+nome do medicamento. A sincronização compara o catálogo com o da sincronização anterior
+e só vetoriza os medicamentos novos ou alterados (nome ou status, o que inclui os
+descontinuados); os que saíram da tabela saem do índice. A matriz (termo x padrão) é
+remontada a partir dos vetores já calculados e o `ChatBot` novo substitui o anterior de
+uma vez: quem já está respondendo termina com o índice antigo.
+"""
+import asyncio
+import json
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+
+from artefato_chatbot import CUTOFF_ORTOGRAFIA, montar
+from chatbot import CAMINHO_INTENTS, TOKEN, ChatBot
+from ortografia import CorretorOrtografico
+
+STATUS_DESCONTINUADO = 'Descontinuado'
+CAMPOS_MUDANCA = ('adicionados', 'alterados', 'descontinuados', 'removidos')
+
+logger = logging.getLogger('stock_flux_api.chatbot')
+
+
+def modelos_padroes(caminho_intents=CAMINHO_INTENTS, exemplo='paracetamol'):
+    """Modelos de padrão ('tem {nome}?') tirados dos padrões de uma intent do JSON."""
+    with open(caminho_intents, encoding='utf-8') as f:
+        intents = json.load(f)['intents']
+    return [padrao.lower().replace(exemplo, '{nome}') for intent in intents for padrao in intent['patterns']
+            if exemplo in padrao.lower()]
+
+
+class Intencao:
+    """Padrões de um medicamento já vetorizados (contagens normalizadas, L2).
+
+    Os termos são locais à intent; a montagem do índice os traduz para o vocabulário global.
+    """
+
+    def __init__(self, nome, status, modelos):
+        self.tag = nome
+        self.status = status
+        self.descontinuado = STATUS_DESCONTINUADO in status
+        self.respostas = [f"A fabricação de {nome} foi descontinuada. Esse produto não será mais comercializado."] \
+            if self.descontinuado else None
+        self.padroes = [modelo.format(nome=nome.lower()) for modelo in modelos]
+        self.palavras = set(" ".join(self.padroes).split())
+
+        termos, linhas, colunas, pesos = {}, [], [], []
+        for linha, padrao in enumerate(self.padroes):
+            contagens = {}
+            for token in TOKEN.findall(padrao):
+                contagens[token] = contagens.get(token, 0) + 1
+            norma = math.sqrt(sum(contagem * contagem for contagem in contagens.values()))
+            for token, contagem in contagens.items():
+                linhas.append(linha)
+                colunas.append(termos.setdefault(token, len(termos)))
+                pesos.append(contagem / norma)
+
+        self.termos = list(termos)
+        self.linhas = np.array(linhas, dtype=np.int64)
+        self.colunas = np.array(colunas, dtype=np.int64)
+        self.pesos = np.array(pesos, dtype=np.float64)
+
+
+def _inicios(tamanhos):
+    return np.cumsum(tamanhos, dtype=np.int64) - np.array(tamanhos, dtype=np.int64)
+
+
+def _juntar(arrays, dtype):
+    return np.concatenate(arrays) if arrays else np.empty(0, dtype=dtype)
+
+
+class CatalogoChatBot:
+    """Mantém o `ChatBot` (atributo `bot`) em dia com a tabela de medicamentos."""
+
+    def __init__(self, modelos=None, estoque=None):
+        self.modelos = modelos or modelos_padroes()
+        self.estoque = estoque  # Repassado a cada ChatBot montado (saldo_estoque.py)
+        self.bot = None
+        self.versao = 0
+        self._intencoes = {}  # Código do medicamento -> Intencao
+        self._corretor = (None, None)  # Palavras e corretor da última montagem
+        self._lock = threading.Lock()
+
+    def sincronizar(self, linhas):
+        """Aplica o catálogo atual (linhas de get_medicamentos) e troca o chatbot se algo mudou.
+
+        Retorna quantos medicamentos foram adicionados, alterados, descontinuados e removidos.
+        """
+        inicio = time.perf_counter()
+
+        # get_medicamentos traz uma linha por status do medicamento
+        catalogo = {}
+        for linha in linhas:
+            nome, status = catalogo.setdefault(linha['Código'], (linha['Nome'], set()))
+            status.add(linha['Status'])
+
+        with self._lock:
+            resumo = dict.fromkeys(CAMPOS_MUDANCA, 0)
+            for codigo in self._intencoes.keys() - catalogo.keys():
+                del self._intencoes[codigo]
+                resumo['removidos'] += 1
+
+            for codigo, (nome, status) in catalogo.items():
+                status = tuple(sorted(status, key=str))
+                atual = self._intencoes.get(codigo)
+                if atual is not None and atual.tag == nome and atual.status == status:
+                    continue
+                nova = Intencao(nome, status, self.modelos)
+                if atual is None:
+                    resumo['adicionados'] += 1
+                elif nova.descontinuado and not atual.descontinuado:
+                    resumo['descontinuados'] += 1
+                else:
+                    resumo['alterados'] += 1
+                self._intencoes[codigo] = nova
+
+            if any(resumo.values()) or self.bot is None:
+                # Troca atômica: a atribuição publica o índice novo já completo
+                self.bot = ChatBot(artefato=self._montar_artefato(), estoque=self.estoque)
+                self.versao += 1
+
+            resumo.update(versao=self.versao, medicamentos=len(self._intencoes), padroes=self.bot.total_padroes,
+                          tempo_ms=round((time.perf_counter() - inicio) * 1000, 3))
+        return resumo
+
+    def _montar_artefato(self):
+        """Junta os vetores das intents na matriz CSR (termo x padrão), sem vetorizar de novo."""
+        intencoes = [self._intencoes[codigo] for codigo in sorted(self._intencoes, key=str)]
+        termos_locais = [termo for intencao in intencoes for termo in intencao.termos]
+        vocabulario = sorted(set(termos_locais))
+        posicao = {termo: i for i, termo in enumerate(vocabulario)}
+        globais = np.array([posicao[termo] for termo in termos_locais], dtype=np.int64)
+
+        # Cada entrada (padrão, termo local) da intent é deslocada para as posições globais
+        entradas = np.array([len(intencao.pesos) for intencao in intencoes], dtype=np.int64)
+        deslocamento_termos = np.repeat(_inicios([len(intencao.termos) for intencao in intencoes]), entradas)
+        deslocamento_padroes = np.repeat(_inicios([len(intencao.padroes) for intencao in intencoes]), entradas)
+        termos = globais[_juntar([intencao.colunas for intencao in intencoes], np.int64) + deslocamento_termos]
+        padroes = _juntar([intencao.linhas for intencao in intencoes], np.int64) + deslocamento_padroes
+        pesos = _juntar([intencao.pesos for intencao in intencoes], np.float64)
+
+        tags_padroes = [intencao.tag for intencao in intencoes for _ in intencao.padroes]
+        respostas = {}
+        for intencao in intencoes:
+            respostas.setdefault(intencao.tag, intencao.respostas)
+
+        # Os padrões já estão em ordem crescente: a ordenação estável por termo dá a ordem do CSR
+        ordem = np.argsort(termos, kind='stable')
+        indptr = np.zeros(len(vocabulario) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(termos, minlength=len(vocabulario)), out=indptr[1:])
+
+        return montar(tags_padroes, respostas, vocabulario, indptr, padroes[ordem], pesos[ordem],
+                      self._obter_corretor(intencoes))
+
+    def _obter_corretor(self, intencoes):
+        # O índice de correção só é refeito quando o conjunto de palavras muda
+        palavras = frozenset().union(*(intencao.palavras for intencao in intencoes))
+        if palavras != self._corretor[0]:
+            self._corretor = (palavras, CorretorOrtografico(palavras, cutoff=CUTOFF_ORTOGRAFIA))
+        return self._corretor[1]
+
+    def iniciar_atualizacao(self, ler_linhas, intervalo):
+        """Sincroniza a cada `intervalo` segundos em uma thread em segundo plano."""
+        def atualizar():
+            while True:
+                time.sleep(intervalo)
+                try:
+                    resumo = self.sincronizar(ler_linhas())
+                    if any(resumo[campo] for campo in CAMPOS_MUDANCA):
+                        logger.info('Catálogo do chatbot atualizado: %s', json.dumps(resumo))
+                except Exception:
+                    logger.exception('Falha ao sincronizar o catálogo do chatbot')
+
+        threading.Thread(target=atualizar, name='catalogo-chatbot', daemon=True).start()
+
+    async def manter_atualizado_async(self, ler_linhas_async, intervalo):
+        """Versão para o event loop de `iniciar_atualizacao` (rodar como tarefa).
+
+        A leitura usa o driver assíncrono e a montagem do índice roda em uma thread.
+        """
+        while True:
+            await asyncio.sleep(intervalo)
+            try:
+                resumo = await asyncio.to_thread(self.sincronizar, await ler_linhas_async())
+                if any(resumo[campo] for campo in CAMPOS_MUDANCA):
+                    logger.info('Catálogo do chatbot atualizado: %s', json.dumps(resumo))
+            except Exception:
+                logger.exception('Falha ao sincronizar o catálogo do chatbot')
@@ -1,73 +1,242 @@
-import json
+import argparse
+import math
+import os
 import random
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import difflib  # Para correção ortográfica
+import re
+import time
+
+import numpy as np
+
+import rastreio_chatbot  # Rastreio amostrado (mensagem, correção, pontuações e tempos)
+
+from artefato_chatbot import carregar_ou_compilar, compilar_arquivo  # Intents pré-compiladas (artefato com mmap)
+from ortografia import CorretorOrtografico  # Para correção ortográfica
+
+# Relativo ao módulo, para funcionar com qualquer diretório de trabalho
+CAMINHO_INTENTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'medicamento.json')
+
+# Mesma tokenização do CountVectorizer usado na compilação (token_pattern padrão)
+TOKEN = re.compile(r"(?u)\b\w\w+\b")
+
+# Margem na poda do índice para absorver arredondamentos de ponto flutuante
+FOLGA_PODA = 1e-9
+
+# Acima dessa fração dos padrões como candidatos, acumular em um vetor denso sai mais barato
+FRACAO_DENSA = 0.1
 
 class ChatBot:
-    def __init__(self):
-        # Carregar intents e dados de medicamentos
-        with open('stock_flux_api/medicamento.json', encoding='utf-8') as json_data:
-            self.intents = json.load(json_data)
-
-        # Extrair padrões (patterns) e tags (medicamentos)
-        self.padroes = []
-        self.tags = []
-        for intent in self.intents['intents']:
-            for padrao in intent['patterns']:
-                self.padroes.append(padrao.lower())  # Padrões de frases
-                self.tags.append(intent['tag'])  # Tags correspondentes (nomes de medicamentos)
-
-        # Vetorizar os padrões (Bag of Words ou TF-IDF)
-        self.vetorizador = CountVectorizer().fit(self.padroes)
+    def __init__(self, caminho_intents=CAMINHO_INTENTS, caminho_artefato=None, artefato=None, estoque=None):
+        # Retrato do estoque em memória (saldo_estoque.py) para as respostas com quantidades
+        self.estoque = estoque
+
+        # Carregar o artefato compilado das intents (recompilado se o JSON mudou), a menos
+        # que ele já venha montado (catálogo gerado do banco, catalogo_chatbot.py)
+        if artefato is None:
+            artefato = carregar_ou_compilar(caminho_intents, caminho_artefato)
+
+        # Tag (medicamento) de cada padrão e respostas por tag
+        nomes_tags = artefato.textos('tags')
+        self.nomes_tags = nomes_tags
+        self.tag_padrao = artefato.arrays['tag_padrao']
+        self.tags = [nomes_tags[i] for i in self.tag_padrao.tolist()]
+        self.respostas = artefato.meta['respostas']
+        self.total_padroes = artefato.meta['padroes']
+
+        # Vocabulário e matriz (termo x padrão) dos padrões normalizados (L2), assim a
+        # similaridade de cosseno vira um produto escalar esparso
+        self.vocabulario = {termo: i for i, termo in enumerate(artefato.textos('termos'))}
+        self.matriz_indptr = artefato.arrays['matriz_indptr']
+        self.matriz_indices = artefato.arrays['matriz_indices']
+        self.matriz_dados = artefato.arrays['matriz_dados']
+
+        # Cada linha da matriz é a lista invertida de um termo (padrões em ordem crescente);
+        # o maior peso de cada termo limita a contribuição dele a qualquer padrão
+        if self.matriz_dados.size:
+            self.maximos = np.maximum.reduceat(self.matriz_dados, self.matriz_indptr[:-1])
+        else:
+            self.maximos = np.zeros(len(self.vocabulario))
+
+        # Índice de correção ortográfica sobre o vocabulário dos padrões
+        self.corretor = CorretorOrtografico.a_partir_do_indice(
+            artefato.textos('palavras'), artefato.meta['letras'], artefato.arrays['tamanhos'],
+            artefato.arrays['contagens'], cutoff=artefato.meta['cutoff'])
 
     def corrigir_ortografia(self, mensagem):
         """Corrige palavras na mensagem do usuário usando os padrões como referência."""
-        palavras_na_mensagem = mensagem.lower().split()
-        todas_palavras_padroes = set(" ".join(self.padroes).split())
-
-        palavras_corrigidas = []
-        for palavra in palavras_na_mensagem:
-            palavras_similares = difflib.get_close_matches(palavra, todas_palavras_padroes, n=1, cutoff=0.8)
-            if palavras_similares:
-                palavras_corrigidas.append(palavras_similares[0])  # Usa a palavra mais próxima
-            else:
-                palavras_corrigidas.append(palavra)  # Mantém a palavra original se não houver correspondência
-        return " ".join(palavras_corrigidas)
+        return self.corretor.corrigir(mensagem)
+
+    def vetorizar(self, mensagem):
+        """Termos da mensagem (índices em ordem crescente) e seus pesos normalizados (L2)."""
+        contagens = {}
+        for token in TOKEN.findall(mensagem.lower()):
+            termo = self.vocabulario.get(token)
+            if termo is not None:
+                contagens[termo] = contagens.get(termo, 0) + 1
+
+        termos = sorted(contagens)
+        soma = 0.0
+        for termo in termos:
+            soma += float(contagens[termo]) * float(contagens[termo])
+        if soma == 0.0:
+            return [], []
+        norma = math.sqrt(soma)
+        return termos, [contagens[termo] / norma for termo in termos]
+
+    def calcular_similaridades(self, mensagens_corrigidas):
+        """Retorna a matriz (mensagens x padrões) de similaridade de cosseno, pontuando todos os padrões."""
+        similaridades = np.zeros((len(mensagens_corrigidas), self.total_padroes))
+        for linha, mensagem in zip(similaridades, mensagens_corrigidas):
+            # Soma a contribuição de cada termo da mensagem aos padrões que o contêm
+            for termo, peso in zip(*self.vetorizar(mensagem)):
+                inicio, fim = self.matriz_indptr[termo], self.matriz_indptr[termo + 1]
+                linha[self.matriz_indices[inicio:fim]] += peso * self.matriz_dados[inicio:fim]
+        return similaridades
+
+    def _pontuar(self, candidatos, termos, pesos, inicios, fins):
+        """Similaridade de cosseno dos padrões candidatos (índices em ordem crescente).
+
+        Os termos são somados na mesma ordem de `calcular_similaridades`, então as
+        pontuações são idênticas às da busca exaustiva.
+        """
+        pontuacoes = np.zeros(len(candidatos))
+        for peso, inicio, fim in zip(pesos, inicios, fins):
+            lista = self.matriz_indices[inicio:fim]
+            posicoes = np.minimum(np.searchsorted(lista, candidatos), len(lista) - 1)
+            contem = lista[posicoes] == candidatos
+            pontuacoes += np.where(contem, peso * self.matriz_dados[inicio:fim][posicoes], 0.0)
+        return pontuacoes
+
+    def _melhores(self, candidatos, pontuacoes, k, minimo):
+        """As k melhores tags com pontuação acima de `minimo`, pelo melhor padrão de cada uma.
+
+        No empate vale o padrão de menor índice, como no `argmax` da busca exaustiva. Os
+        candidatos vêm em ordem crescente e as pontuações são percorridas da maior para a
+        menor, então em cada nível a primeira ocorrência de uma tag nova é a que vale.
+        """
+        melhores, vistas = [], set()
+        validos = pontuacoes > minimo
+        candidatos, pontuacoes = candidatos[validos], pontuacoes[validos]
+        while len(melhores) < k and pontuacoes.size:
+            nivel = pontuacoes.max()
+            no_nivel = pontuacoes == nivel
+            tags = self.tag_padrao[candidatos[no_nivel]]
+            # Em blocos: com muitos empates, basta o começo do nível para completar as k tags
+            for inicio in range(0, tags.size, 256):
+                for tag in tags[inicio:inicio + 256].tolist():
+                    if tag not in vistas and len(melhores) < k:
+                        vistas.add(tag)
+                        melhores.append((self.nomes_tags[tag], float(nivel)))
+                if len(melhores) == k:
+                    break
+            candidatos, pontuacoes = candidatos[~no_nivel], pontuacoes[~no_nivel]
+        return melhores
+
+    def buscar(self, mensagem_corrigida, k=5, minimo=0.0):
+        """Top-k intenções [(tag, pontuação)] da mensagem pelo índice invertido dos padrões.
+
+        Só são pontuados os padrões que compartilham um termo com a mensagem. Os padrões do
+        termo mais raro dão um primeiro limiar (a k-ésima melhor tag); os termos mais
+        frequentes cuja soma de contribuições máximas não alcança esse limiar não geram
+        candidatos, só completam a pontuação dos demais. O resultado é o mesmo de
+        `buscar_exaustivo`.
+        """
+        termos, pesos = self.vetorizar(mensagem_corrigida)
+        if not termos:
+            return []
+        termos = np.array(termos)
+        inicios, fins = self.matriz_indptr[termos], self.matriz_indptr[termos + 1]
+        tamanhos = fins - inicios
+
+        mais_raro = int(np.argmin(tamanhos))
+        candidatos = self.matriz_indices[inicios[mais_raro]:fins[mais_raro]]
+        pontuacoes = self._pontuar(candidatos, termos, pesos, inicios, fins)
+        melhores = self._melhores(candidatos, pontuacoes, k, minimo)
+        limiar = melhores[-1][1] if len(melhores) == k else minimo
+
+        # Um padrão só com termos não essenciais pontua no máximo a soma das contribuições
+        # máximas desses termos, e também no máximo a norma da mensagem restrita a eles
+        ordem = np.argsort(-tamanhos, kind='stable').tolist()
+        essenciais = []
+        soma_maximos = soma_quadrados = 0.0
+        for posicao, i in enumerate(ordem):
+            soma_maximos += pesos[i] * self.maximos[termos[i]]
+            soma_quadrados += pesos[i] * pesos[i]
+            if min(soma_maximos, math.sqrt(soma_quadrados)) + FOLGA_PODA >= limiar:
+                essenciais = ordem[posicao:]
+                break
+
+        novos = [self.matriz_indices[inicios[i]:fins[i]] for i in essenciais if i != mais_raro]
+        if not novos:
+            return melhores
+        if sum(len(lista) for lista in novos) >= FRACAO_DENSA * self.total_padroes:
+            return self.buscar_exaustivo(mensagem_corrigida, k, minimo)
+        candidatos = np.unique(np.concatenate([candidatos] + novos))
+        pontuacoes = self._pontuar(candidatos, termos, pesos, inicios, fins)
+        return self._melhores(candidatos, pontuacoes, k, minimo)
+
+    def buscar_exaustivo(self, mensagem_corrigida, k=5, minimo=0.0):
+        """Mesmo resultado de `buscar`, pontuando todos os padrões (referência para comparação)."""
+        pontuacoes = self.calcular_similaridades([mensagem_corrigida])[0]
+        return self._melhores(np.arange(self.total_padroes), pontuacoes, k, minimo)
 
     def encontrar_intencao(self, mensagem):
         """Encontra a intenção (medicamento) com base na similaridade de cosseno."""
         # Corrigir a ortografia da mensagem
+        inicio = time.perf_counter()
         mensagem_corrigida = self.corrigir_ortografia(mensagem)
-        print(f"Mensagem corrigida: {mensagem_corrigida}")
+        meio = time.perf_counter()
 
-        # Vetorizar a mensagem corrigida
-        vetor_mensagem = self.vetorizador.transform([mensagem_corrigida])
-        vetor_padroes = self.vetorizador.transform(self.padroes)
+        intencao = self._intencao(mensagem_corrigida)
+        if rastreio_chatbot.amostrar():
+            rastreio_chatbot.registrar(self, mensagem, mensagem_corrigida, intencao, meio - inicio, time.perf_counter() - meio)
+        return intencao
 
-        # Calcular a similaridade de cosseno entre a entrada do usuário e os padrões
-        similaridades = cosine_similarity(vetor_mensagem, vetor_padroes)
+    def _intencao(self, mensagem_corrigida):
+        # O padrão mais similar pelo índice; se a similaridade for alta o suficiente (ex: 0.5), consideramos um match
+        melhores = self.buscar(mensagem_corrigida, k=1, minimo=0.5)
+        if melhores:
+            return melhores[0][0]  # Retorna a tag do medicamento correspondente
+        return None  # Se nenhuma correspondência foi encontrada
 
-        # Encontrar o padrão mais similar
-        indice_melhor_correspondencia = similaridades.argmax()  # Índice do padrão mais próximo
-        pontuacao_melhor_correspondencia = similaridades[0, indice_melhor_correspondencia]  # Pontuação de similaridade
+    def encontrar_intencoes(self, mensagens):
+        """Versão em lote de `encontrar_intencao`, na ordem das mensagens.
 
-        # Se a similaridade for alta o suficiente (ex: 0.5), consideramos um match
-        if pontuacao_melhor_correspondencia > 0.5:
-            return self.tags[indice_melhor_correspondencia]  # Retorna a tag do medicamento correspondente
-        return None  # Se nenhuma correspondência foi encontrada
+        Cada mensagem distinta é corrigida uma única vez e cada texto corrigido distinto é
+        vetorizado e pontuado uma única vez (em replays de log as repetições são a maioria).
+        A pontuação é a do índice invertido, por mensagem: em lote, uma matriz densa
+        (mensagens x padrões) custaria mais que as buscas somadas.
+        """
+        corrigidas, intencoes = {}, {}
+        for mensagem in mensagens:
+            if mensagem not in corrigidas:
+                inicio = time.perf_counter()
+                corrigida = corrigidas[mensagem] = self.corrigir_ortografia(mensagem)
+                meio = time.perf_counter()
+                if corrigida not in intencoes:
+                    intencoes[corrigida] = self._intencao(corrigida)
+                if rastreio_chatbot.amostrar():
+                    rastreio_chatbot.registrar(self, mensagem, corrigida, intencoes[corrigida], meio - inicio,
+                                               time.perf_counter() - meio)
+        return [intencoes[corrigidas[mensagem]] for mensagem in mensagens]
 
     def obter_resposta(self, mensagem):
         """Retorna uma resposta com base no medicamento identificado."""
-        intencao = self.encontrar_intencao(mensagem)
+        return self._responder(self.encontrar_intencao(mensagem))
+
+    def obter_respostas(self, mensagens):
+        """Versão em lote de `obter_resposta`: as respostas vêm na ordem das mensagens."""
+        return [self._responder(intencao) for intencao in self.encontrar_intencoes(mensagens)]
+
+    def _responder(self, intencao):
         if intencao:
-            for dados_intencao in self.intents['intents']:
-                if dados_intencao['tag'] == intencao:
-                    # Corrigir a resposta para oxcarbazepina descontinuada
-                    if intencao == 'Oxcarbazepina':
-                        return random.choice(dados_intencao['responses'])  # Seleciona uma resposta aleatória da lista
-                    else:
-                        return f"O estoque de {intencao} está disponível."  # Resposta padrão para medicamentos disponíveis
+            # Intents com respostas próprias (ex.: oxcarbazepina descontinuada)
+            if self.respostas.get(intencao):
+                return random.choice(self.respostas[intencao])  # Seleciona uma resposta aleatória da lista
+            # Saldo e situação mantidos em memória (saldo_estoque.py), sem consulta ao banco
+            resposta = self.estoque.descrever(intencao) if self.estoque is not None else None
+            if resposta is not None:
+                return resposta
+            return f"O estoque de {intencao} está disponível."  # Resposta padrão (medicamento sem saldo carregado)
         return "Desculpe, não entendi sua pergunta."
 
     def teste_manual(self):
@@ -81,5 +250,14 @@ class ChatBot:
             print(f"Resposta do chatbot: {resposta} \n")
 
 if __name__ == "__main__":
-    bot = ChatBot()
-    bot.teste_manual()
+    parser = argparse.ArgumentParser(description='ChatBot de estoque de medicamentos')
+    parser.add_argument('--compilar', action='store_true', help='só gera o artefato compilado das intents')
+    parser.add_argument('--intents', default=CAMINHO_INTENTS)
+    parser.add_argument('--artefato', help='caminho do artefato (padrão: ao lado do JSON, .chatbot.bin)')
+    opcoes = parser.parse_args()
+
+    if opcoes.compilar:
+        print(f"Artefato gravado em {compilar_arquivo(opcoes.intents, opcoes.artefato)}")
+    else:
+        bot = ChatBot(opcoes.intents, opcoes.artefato)
+        bot.teste_manual()
@@ -0,0 +1,428 @@
+import time
+from datetime import datetime
+
+import oracledb
+from flask_restx import fields
+
+from database import db_connection, db_connection_async
+from metricas import registrar_execute, registrar_fetch
+from respostas import datas_nativas
+
+# Funções PL/SQL que retornam SYS_REFCURSOR (funcoes_get.sql): parâmetros da URL, na
+# ordem dos argumentos da função, nomes das colunas na resposta da API e quantas
+# linhas buscar por ida ao banco (arraysize/prefetchrows)
+CONSULTAS = {
+    'medicamentos': {
+        'funcao': 'get_medicamentos',
+        'parametros': ['categoria_id', 'motivo_id', 'status_id', 'medicamento_nome'],
+        'colunas': ['Categoria', 'Motivo', 'Nome', 'Código', 'Quantidade Minima', 'Localização', 'Status'],
+        'arraysize': 500,
+    },
+    'status': {
+        'funcao': 'get_status',
+        'parametros': ['status_id'],
+        'colunas': ['Id', 'Descrição', 'Motivo'],
+        'arraysize': 100,
+    },
+    'fornecedores': {
+        'funcao': 'get_fornecedores',
+        'parametros': ['fornecedor_id'],
+        'colunas': ['Id', 'Nome', 'Telefone', 'Email'],
+        'arraysize': 500,
+    },
+    'materiais': {
+        'funcao': 'get_materiais',
+        'parametros': ['material_id', 'fornecedor_id'],
+        'colunas': ['Id', 'Fornecedor', 'Descrição'],
+        'arraysize': 500,
+    },
+    'categorias': {
+        'funcao': 'get_categorias',
+        'parametros': ['categoria_id'],
+        'colunas': ['Id', 'Descrição'],
+        'arraysize': 100,
+    },
+    'motivos': {
+        'funcao': 'get_motivos',
+        'parametros': ['motivo_id'],
+        'colunas': ['Id', 'Descrição'],
+        'arraysize': 100,
+    },
+    'cargos': {
+        'funcao': 'get_cargos',
+        'parametros': ['cargo_id'],
+        'colunas': ['Id', 'Descrição'],
+        'arraysize': 100,
+    },
+    'departamentos': {
+        'funcao': 'get_departamentos',
+        'parametros': ['departamento_id'],
+        'colunas': ['Id', 'Descrição'],
+        'arraysize': 100,
+    },
+    'estoque': {
+        'funcao': 'get_estoque',
+        'funcao_pagina': 'get_estoque_pagina',
+        'parametros': ['estoque_id', 'medicamento_id', 'responsavel_id', 'tipo_movimentacao_id'],
+        'colunas': ['Id', 'Medicamento', 'Responsável', 'Tipo Movimentação', 'Quantidade', 'Data', 'Motivo'],
+        'arraysize': 1000,
+    },
+    'etapas_producao': {
+        'funcao': 'get_etapas_producao',
+        'parametros': ['etapa_id'],
+        'colunas': ['Id', 'Descrição', 'Prazo Estimado'],
+        'arraysize': 100,
+    },
+    'producao': {
+        'funcao': 'get_producao',
+        'funcao_pagina': 'get_producao_pagina',
+        'parametros': ['producao_id', 'medicamento_id', 'etapa_id'],
+        'colunas': ['Id', 'Medicamento', 'Etapa', 'Data Início', 'Data Fim Prevista', 'Data Fim Real'],
+        'arraysize': 1000,
+    },
+    'entradas_previstas': {
+        'funcao': 'get_entradas_previstas',
+        'parametros': ['entrada_prevista_id', 'material_id', 'medicamento_id'],
+        'colunas': ['Id', 'Material', 'Medicamento', 'Quantidade', 'Data Prevista'],
+        'arraysize': 1000,
+    },
+    'atrasos_producao': {
+        'funcao': 'get_atrasos_producao',
+        'parametros': ['atraso_id', 'producao_id', 'medicamento_id', 'etapa_id'],
+        'colunas': ['Id', 'Medicamento', 'Etapa', 'Dias de Atraso', 'Motivo'],
+        'arraysize': 1000,
+    },
+    # Internas, do saldo de estoque (saldo_estoque.py): fora de /api/export
+    'saldo_estoque': {
+        'funcao': 'get_saldo_estoque',
+        'parametros': [],
+        'colunas': ['Medicamento', 'Saldo', 'Ultimo Id', 'Sem Sinal'],
+        'arraysize': 1000,
+        'interna': True,
+    },
+    'movimentos_saldo': {
+        'funcao_pagina': 'get_movimentos_saldo',
+        'parametros': [],
+        'colunas': ['Id', 'Medicamento', 'Quantidade'],
+        'arraysize': 5000,
+        'interna': True,
+    },
+}
+
+
+# Comandos das rotas de escrita: SQL, binds montados a partir do registro enviado
+# e tabelas do cache que deixam de valer depois da escrita
+ESCRITAS = {
+    'status': {
+        'insert': ("""INSERT INTO rm93069.status (id_status, descricao, motivo)
+                        VALUES (:1, :2, :3)""",
+                   lambda r: (r['Id'], r['Descrição'], r['Motivo'])),
+        'update': ("""UPDATE rm93069.status
+                        SET descricao = :1, motivo = :2
+                        WHERE id_status = :3""",
+                   lambda r: (r['Descrição'], r['Motivo'], r['Id'])),
+        'delete': ("DELETE FROM rm93069.status WHERE id_status = :1",
+                   lambda r: (r['Id'],)),
+        'invalida': ('status',),
+    },
+    'fornecedores': {
+        'insert': ("""INSERT INTO rm93069.fornecedores (id_fornecedor, nome, telefone, email)
+                        VALUES (:1, :2, :3, :4)""",
+                   lambda r: (r['Id'], r['Nome'], r['Telefone'], r['Email'])),
+        'update': ("""UPDATE rm93069.fornecedores
+                        SET nome = :1, telefone = :2, email = :3
+                        WHERE id_fornecedor = :4""",
+                   lambda r: (r['Nome'], r['Telefone'], r['Email'], r['Id'])),
+        'delete': ("DELETE FROM rm93069.fornecedores WHERE id_fornecedor = :1",
+                   lambda r: (r['Id'],)),
+        'invalida': ('fornecedores', 'materiais'),
+    },
+    'materiais': {
+        'insert': ("""INSERT INTO rm93069.materiais (id_material, id_fornecedor, descricao)
+                        VALUES (:1, :2, :3)""",
+                   lambda r: (r['Id'], r['Id_Fornecedor'], r['Descricao'])),
+        'update': ("""UPDATE rm93069.materiais
+                        SET id_fornecedor = :1, descricao = :2
+                        WHERE id_material = :3""",
+                   lambda r: (r['Id_Fornecedor'], r['Descricao'], r['Id'])),
+        'delete': ("DELETE FROM rm93069.materiais WHERE id_material = :1",
+                   lambda r: (r['Id'],)),
+        'invalida': ('materiais',),
+    },
+}
+
+
+# Busca do id de um medicamento pelo nome (/api/medicamentos/id)
+SQL_ID_MEDICAMENTO = """
+                    SELECT id_medicamento
+                    FROM rm93069.medicamento
+                    WHERE nome = :nome_medicamento
+                """
+
+
+PAGINA_LIMITE_PADRAO = 100
+PAGINA_LIMITE_MAXIMO = 1000
+
+BULK_BATCH_PADRAO = 500
+BULK_BATCH_MAXIMO = 5000
+
+# Mensagens aceitas por chamada de /api/chatbot/bulk
+CHATBOT_LOTE_MAXIMO = 10000
+
+TIPOS_TEXTO = (oracledb.DB_TYPE_VARCHAR, oracledb.DB_TYPE_CHAR, oracledb.DB_TYPE_NVARCHAR, oracledb.DB_TYPE_NCHAR, oracledb.DB_TYPE_LONG)
+
+
+def exportavel(tabela):
+    """True para as tabelas de /api/export: as consultas do CONSULTAS, menos as internas."""
+    return tabela in CONSULTAS and not CONSULTAS[tabela].get('interna')
+
+
+def funcao_consulta(tabela, pagina=None):
+    """Nome da função PL/SQL executada para a tabela (a versão paginada quando há `pagina`)."""
+    return CONSULTAS[tabela]['funcao_pagina' if pagina is not None else 'funcao']
+
+
+def binds_consulta(tabela, args, pagina=None):
+    """Valores enviados à função, pelo nome do parâmetro da URL (usado no log de requisições lentas)."""
+    binds = {parametro: args.get(parametro) for parametro in CONSULTAS[tabela]['parametros']}
+    if pagina is not None:
+        binds['after_id'], binds['limit'] = pagina
+    return binds
+
+
+def preparar_ref_cursor(connection, tabela, args, pagina=None, arraysize=None):
+    """Monta a chamada da função PL/SQL da tabela com os filtros de `args`.
+
+    `pagina` é um par (after_id, limit) para as tabelas com `funcao_pagina`.
+    Retorna (query, params, cursor de resultado); serve para conexões síncronas e assíncronas.
+    """
+    consulta = CONSULTAS[tabela]
+    valores = [args.get(parametro) for parametro in consulta['parametros']]
+    funcao = funcao_consulta(tabela, pagina)
+    arraysize = arraysize or consulta['arraysize']
+
+    if pagina is not None:
+        valores.extend(pagina)
+        arraysize = min(arraysize, pagina[1])
+
+    binds = [f":p{i}" for i in range(len(valores))]
+    query = f"""
+        BEGIN
+            :ref_cursor := {funcao}({', '.join(binds)});
+        END;
+    """
+
+    # O cursor de resultado é criado antes da execução para que o prefetch já use o tamanho ajustado
+    ref_cursor = connection.cursor()
+    ref_cursor.arraysize = arraysize
+    ref_cursor.prefetchrows = arraysize
+
+    params = {"ref_cursor": ref_cursor}
+    for i, valor in enumerate(valores):
+        params[f"p{i}"] = valor
+
+    return query, params, ref_cursor
+
+
+def abrir_ref_cursor(cursor, tabela, args, pagina=None, arraysize=None):
+    """Executa a função PL/SQL da tabela e retorna o cursor de resultado."""
+    query, params, ref_cursor = preparar_ref_cursor(cursor.connection, tabela, args, pagina, arraysize)
+    inicio = time.perf_counter()
+    cursor.execute(query, params)
+    registrar_execute(funcao_consulta(tabela, pagina), time.perf_counter() - inicio, binds_consulta(tabela, args, pagina))
+    return ref_cursor
+
+
+def _conversor(campo, coluna):
+    """Conversão que o marshal do flask-restx aplicaria ao valor, ou None se o valor já sai pronto."""
+    if isinstance(campo, fields.DateTime):
+        # Com o orjson a data segue como datetime e vira ISO 8601 na serialização (respostas.py)
+        return None if datas_nativas() else datetime.isoformat
+    if isinstance(campo, fields.Integer):
+        if coluna.type_code is oracledb.DB_TYPE_NUMBER and coluna.scale == 0:
+            return None
+        return int
+    if isinstance(campo, fields.String):
+        if coluna.type_code in TIPOS_TEXTO:
+            return None
+        return str
+    return None
+
+
+def criar_rowfactory(ref_cursor, colunas, modelo=None):
+    """Monta cada linha já como o registro final da API, em uma única passada.
+
+    Com o `modelo`, os valores saem no mesmo formato que o marshal produziria (datas em ISO 8601,
+    inteiros e textos), usando os metadados das colunas para pular conversões desnecessárias.
+    """
+    conversoes = []
+    if modelo is not None:
+        for nome, coluna in zip(colunas, ref_cursor.description):
+            conversor = _conversor(modelo[nome], coluna)
+            if conversor is not None:
+                conversoes.append((nome, conversor))
+
+    if not conversoes:
+        return lambda *row: dict(zip(colunas, row))
+
+    def rowfactory(*row):
+        registro = dict(zip(colunas, row))
+        for nome, conversor in conversoes:
+            valor = registro[nome]
+            if valor is not None:
+                registro[nome] = conversor(valor)
+        return registro
+
+    return rowfactory
+
+
+def listar(tabela, args, modelo, pagina=None):
+    """Executa a consulta da tabela e retorna a lista de registros prontos para a resposta."""
+    with db_connection() as connection, connection.cursor() as cursor:
+        ref_cursor = abrir_ref_cursor(cursor, tabela, args, pagina)
+        ref_cursor.rowfactory = criar_rowfactory(ref_cursor, CONSULTAS[tabela]['colunas'], modelo)
+        inicio = time.perf_counter()
+        itens = ref_cursor.fetchall()
+        registrar_fetch(funcao_consulta(tabela, pagina), time.perf_counter() - inicio, len(itens))
+        return itens
+
+
+async def listar_async(tabela, args, modelo, pagina=None):
+    """Versão assíncrona de `listar`, para o modo ASGI."""
+    async with db_connection_async() as connection:
+        query, params, ref_cursor = preparar_ref_cursor(connection, tabela, args, pagina)
+        funcao = funcao_consulta(tabela, pagina)
+
+        inicio = time.perf_counter()
+        await connection.cursor().execute(query, params)
+        registrar_execute(funcao, time.perf_counter() - inicio, binds_consulta(tabela, args, pagina))
+
+        ref_cursor.rowfactory = criar_rowfactory(ref_cursor, CONSULTAS[tabela]['colunas'], modelo)
+        inicio = time.perf_counter()
+        itens = await ref_cursor.fetchall()
+        registrar_fetch(funcao, time.perf_counter() - inicio, len(itens))
+        return itens
+
+
+def resposta_medicamentos(medicamentos):
+    """Resposta de /api/medicamentos: a lista, ou o comunicado se houver um medicamento descontinuado."""
+    if not medicamentos:
+        return {"error": "Nenhum medicamento encontrado"}, 404
+
+    for medicamento in medicamentos:
+        # Verifica se o medicamento foi descontinuado (por exemplo, pelo status)
+        if medicamento["Status"] == 'Descontinuado':
+            nome = medicamento["Nome"]  # Nome do medicamento
+            dosagem = medicamento["Quantidade Minima"]  # Quantidade mínima (adaptar se necessário)
+            fabricante = "Fabricante"  # Você pode obter essa informação de outra tabela, se necessário
+            data_discontinuacao = "Data aqui"  # Obtenha essa informação de uma coluna se disponível
+
+            # Função para gerar o comunicado
+            def gerar_comunicado(nome, dosagem, fabricante, data_discontinuacao):
+                comunicado = f"""
+                    Comunicado sobre a descontinuação definitiva da fabricação/importação do medicamento {nome} {dosagem} mg
+                    
+                    São Paulo, {data_discontinuacao} — Em compromisso com a transparência junto aos pacientes e profissionais de saúde, a {fabricante} informa que o medicamento {nome}, na dosagem de {dosagem} mg será descontinuado definitivamente. Este produto não será mais comercializado pela {fabricante}.
+
+                    Destacamos que a descontinuação se refere à dosagem de {dosagem} mg, sem impactar outras apresentações do medicamento, que estão sendo comercializadas normalmente.
+
+                    Orientamos que pacientes e médicos conversem sobre a melhor conduta para a continuidade do tratamento.
+                    
+                    A Agência Nacional de Vigilância Sanitária (ANVISA) foi comunicada sobre essa situação conforme requerido na legislação vigente.
+
+                    Para mais informações, estamos à disposição por meio do Serviço de Atendimento ao Consumidor pelo telefone 0800-XXX-XXXX ou através do site {fabricante}/fale-conosco.
+
+                    Atenciosamente,
+
+                    {fabricante}
+                    """
+                return comunicado
+
+            comunicado = gerar_comunicado(nome, dosagem, fabricante, data_discontinuacao)
+
+            # Retornar o comunicado como resposta
+            return {"comunicado": comunicado}, 200
+
+    return medicamentos
+
+
+# Validação dos parâmetros, compartilhada pelas rotas Flask e ASGI (ValueError vira 400)
+
+def ler_paginacao(args):
+    """Retorna (limit, after_id). Sem nenhum dos dois em `args`, limit é None (listagem completa)."""
+    limit = args.get('limit')
+    after_id = args.get('after_id')
+
+    if limit is None and after_id is None:
+        return None, None
+
+    try:
+        limit = int(limit) if limit is not None else PAGINA_LIMITE_PADRAO
+        after_id = int(after_id) if after_id is not None else None
+    except ValueError:
+        raise ValueError('Os parâmetros limit e after_id devem ser números inteiros.')
+
+    if limit < 1:
+        raise ValueError('O parâmetro limit deve ser maior que zero.')
+
+    return min(limit, PAGINA_LIMITE_MAXIMO), after_id
+
+
+def proximo_cursor(itens, limit):
+    """Id a ser enviado como after_id na próxima página, ou None se não há mais linhas."""
+    if limit is not None and len(itens) == limit:
+        return str(itens[-1]['Id'])
+    return None
+
+
+def ler_batch_size(args):
+    try:
+        batch_size = int(args.get('batch_size', BULK_BATCH_PADRAO))
+    except ValueError:
+        raise ValueError('O parâmetro batch_size deve ser um número inteiro.')
+    return max(1, min(batch_size, BULK_BATCH_MAXIMO))
+
+
+def montar_linhas(tabela, operacao, registros):
+    """Retorna (sql, binds de cada registro) para ESCRITAS[tabela][operacao]."""
+    if not isinstance(registros, list) or not registros:
+        raise ValueError('O corpo da requisição deve ser uma lista de registros.')
+
+    sql, montar_linha = ESCRITAS[tabela][operacao]
+    linhas = []
+    for indice, registro in enumerate(registros):
+        try:
+            linhas.append(montar_linha(registro))
+        except (KeyError, TypeError) as e:
+            raise ValueError(f'Registro {indice} inválido: campo {e} ausente.')
+    return sql, linhas
+
+
+def resultado_lote(total, afetadas, erros, status_sucesso):
+    resultado = {
+        'processados': total - len(erros),
+        'afetados': afetadas,
+        'erros': [{'indice': indice, 'erro': mensagem} for indice, mensagem in erros],
+    }
+    # 207 indica que parte dos registros falhou e os demais foram aplicados
+    return resultado, 207 if erros else status_sucesso
+
+
+def ler_mensagens_lote(corpo):
+    """Valida o corpo de /api/chatbot/bulk e retorna a lista de mensagens."""
+    mensagens = corpo.get('messages') if isinstance(corpo, dict) else None
+    if not isinstance(mensagens, list) or not all(isinstance(mensagem, str) for mensagem in mensagens):
+        raise ValueError('Informe as mensagens em "messages", como uma lista de textos.')
+    if len(mensagens) > CHATBOT_LOTE_MAXIMO:
+        raise ValueError(f'No máximo {CHATBOT_LOTE_MAXIMO} mensagens por chamada.')
+    return mensagens
+
+
+def resposta_lote_chatbot(respostas, segundos):
+    """Respostas na ordem das mensagens, com o tempo de processamento e a vazão do lote."""
+    return {
+        'responses': respostas,
+        'total': len(respostas),
+        'tempo_ms': round(segundos * 1000, 3),
+        'mensagens_por_segundo': round(len(respostas) / segundos, 1) if segundos > 0 else None,
+    }
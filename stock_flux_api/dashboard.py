@@ -0,0 +1,77 @@
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from consultas import listar, listar_async
+from modelos import (
+    medicamento_model,
+    estoque_model,
+    producao_model,
+    entradas_previstas_model,
+    atrasos_producao_model,
+)
+
+# Seções do dashboard: cada uma é a mesma listagem da rota /api/<tabela>
+SECOES_DASHBOARD = {
+    'medicamentos': medicamento_model,
+    'estoque': estoque_model,
+    'producao': producao_model,
+    'entradas_previstas': entradas_previstas_model,
+    'atrasos_producao': atrasos_producao_model,
+}
+
+def _ms(inicio):
+    return round((time.perf_counter() - inicio) * 1000, 3)
+
+
+def _carregar_secao(tabela, args):
+    inicio = time.perf_counter()
+    itens = listar(tabela, args, SECOES_DASHBOARD[tabela])
+    return itens, _ms(inicio)
+
+
+def montar_dashboard(args):
+    """Executa as consultas do dashboard em paralelo e junta os resultados em uma resposta.
+
+    O tempo total fica limitado pela consulta mais lenta, e não pela soma de todas.
+    `tempos_ms` traz o tempo de cada seção e o total.
+    """
+    inicio = time.perf_counter()
+    # Uma thread por seção em um executor da própria requisição: um executor do módulo, com uma
+    # thread por seção, enfileiraria os dashboards simultâneos uns atrás dos outros. O limite de
+    # consultas simultâneas continua sendo o do pool de conexões.
+    with ThreadPoolExecutor(max_workers=len(SECOES_DASHBOARD), thread_name_prefix='dashboard') as executor:
+        # Cada seção roda com uma cópia do contexto da requisição, para somar na mesma medição (metricas.py)
+        futuros = {
+            tabela: executor.submit(contextvars.copy_context().run, _carregar_secao, tabela, args)
+            for tabela in SECOES_DASHBOARD
+        }
+
+        resposta, tempos = {}, {}
+        for tabela, futuro in futuros.items():
+            resposta[tabela], tempos[tabela] = futuro.result()
+
+    tempos['total'] = _ms(inicio)
+    resposta['tempos_ms'] = tempos
+    return resposta
+
+
+async def _carregar_secao_async(tabela, args):
+    inicio = time.perf_counter()
+    itens = await listar_async(tabela, args, SECOES_DASHBOARD[tabela])
+    return itens, _ms(inicio)
+
+
+async def montar_dashboard_async(args):
+    """Versão assíncrona de `montar_dashboard`, com as consultas concorrentes no event loop."""
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*(_carregar_secao_async(tabela, args) for tabela in SECOES_DASHBOARD))
+
+    resposta, tempos = {}, {}
+    for tabela, (itens, tempo) in zip(SECOES_DASHBOARD, resultados):
+        resposta[tabela], tempos[tabela] = itens, tempo
+
+    tempos['total'] = _ms(inicio)
+    resposta['tempos_ms'] = tempos
+    return resposta
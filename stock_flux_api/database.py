@@ -0,0 +1,284 @@
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+import oracledb
+
+from metricas import registrar_espera, registrar_execute, rotulo_sql
+
+# Configuração padrão do pool, pode ser sobrescrita pela chave "pool" do credentials.json
+POOL_CONFIG_PADRAO = {
+    'min': 2,               # Conexões abertas na criação do pool
+    'max': 10,              # Limite de conexões simultâneas
+    'increment': 1,         # Quantas conexões abrir quando o pool precisar crescer
+    'ping_interval': 60,    # Segundos ociosos antes de testar a conexão ao reutilizá-la
+    'wait_timeout': 5000,   # Tempo máximo (ms) esperando uma conexão livre
+}
+
+_pool = None
+_pool_async = None
+_pool_lock = threading.Lock()
+
+# Estatísticas de espera para obter uma conexão do pool
+_stats_lock = threading.Lock()
+_stats = {
+    'acquires': 0,
+    'timeouts': 0,
+    'wait_total_ms': 0.0,
+    'wait_max_ms': 0.0,
+}
+
+
+def load_credentials(path='credentials.json'):
+    # STOCKFLUX_SQLITE aponta para um banco local (sqlite_local.py) e dispensa o credentials.json
+    arquivo_sqlite = os.environ.get('STOCKFLUX_SQLITE')
+    if arquivo_sqlite:
+        return {'backend': 'sqlite', 'sqlite': arquivo_sqlite}
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def _config_pool(credentials):
+    config = dict(POOL_CONFIG_PADRAO)
+    config.update(credentials.get('pool', {}))
+    return config
+
+
+def _parametros_pool(credentials):
+    config = _config_pool(credentials)
+
+    return dict(
+        user=credentials['user'],
+        password=credentials['password'],
+        dsn=credentials['dsn'],
+        min=config['min'],
+        max=config['max'],
+        increment=config['increment'],
+        ping_interval=config['ping_interval'],
+        getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+        wait_timeout=config['wait_timeout'],
+    )
+
+
+def _criar_pool_oracle(credentials):
+    return oracledb.create_pool(**_parametros_pool(credentials))
+
+
+def _criar_pool_sqlite(credentials):
+    import sqlite_local  # Só carregado quando o backend local é usado
+    return sqlite_local.criar_pool(credentials['sqlite'], **_config_pool(credentials))
+
+
+# Backends de dados, escolhidos pela chave "backend" do credentials.json (padrão oracle).
+# Cada um cria um pool com a interface do oracledb.ConnectionPool usada pela API.
+BACKENDS = {
+    'oracle': _criar_pool_oracle,
+    'sqlite': _criar_pool_sqlite,
+}
+
+
+def _criar_pool_async_oracle(credentials):
+    return oracledb.create_pool_async(**_parametros_pool(credentials))
+
+
+def _criar_pool_async_sqlite(credentials):
+    import sqlite_local
+    return sqlite_local.criar_pool_async(credentials['sqlite'], **_config_pool(credentials))
+
+
+# Os mesmos backends no modo ASGI, com a interface do pool asyncio do oracledb
+BACKENDS_ASYNC = {
+    'oracle': _criar_pool_async_oracle,
+    'sqlite': _criar_pool_async_sqlite,
+}
+
+
+def init_pool(credentials=None):
+    """Cria o pool de sessões do processo. Chamadas repetidas reaproveitam o pool existente."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            return _pool
+
+        if credentials is None:
+            credentials = load_credentials()
+
+        backend = credentials.get('backend', 'oracle')
+        if backend not in BACKENDS:
+            raise ValueError(f'Backend de dados desconhecido: {backend}')
+
+        _pool = BACKENDS[backend](credentials)
+        return _pool
+
+
+def init_pool_async(credentials=None):
+    """Cria o pool assíncrono usado pelo modo ASGI. Chamadas repetidas reaproveitam o pool existente."""
+    global _pool_async
+    with _pool_lock:
+        if _pool_async is not None:
+            return _pool_async
+
+        if credentials is None:
+            credentials = load_credentials()
+
+        backend = credentials.get('backend', 'oracle')
+        if backend not in BACKENDS_ASYNC:
+            raise ValueError(f'Backend de dados desconhecido: {backend}')
+
+        _pool_async = BACKENDS_ASYNC[backend](credentials)
+        return _pool_async
+
+
+def get_pool():
+    if _pool is None:
+        return init_pool()
+    return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close(force=True)
+        _pool = None
+
+
+async def close_pool_async():
+    global _pool_async
+    if _pool_async is not None:
+        await _pool_async.close(force=True)
+    _pool_async = None
+
+
+def _registrar_espera(inicio):
+    espera = time.perf_counter() - inicio
+    registrar_espera(espera)  # Espera atribuída à requisição atual
+    espera_ms = espera * 1000
+    with _stats_lock:
+        _stats['acquires'] += 1
+        _stats['wait_total_ms'] += espera_ms
+        _stats['wait_max_ms'] = max(_stats['wait_max_ms'], espera_ms)
+
+
+def _registrar_timeout():
+    with _stats_lock:
+        _stats['timeouts'] += 1
+
+
+@contextmanager
+def db_connection():
+    """Obtém uma conexão do pool e a devolve ao final do bloco `with`."""
+    pool = get_pool()
+
+    inicio = time.perf_counter()
+    try:
+        connection = pool.acquire()
+    except oracledb.Error:
+        _registrar_timeout()
+        raise
+    _registrar_espera(inicio)
+
+    try:
+        yield connection
+    finally:
+        # Transações não confirmadas são desfeitas pelo pool na devolução
+        pool.release(connection)
+
+
+@asynccontextmanager
+async def db_connection_async():
+    """Versão assíncrona de `db_connection`, sobre o pool do modo ASGI."""
+    pool = _pool_async if _pool_async is not None else init_pool_async()
+
+    inicio = time.perf_counter()
+    try:
+        connection = await pool.acquire()
+    except oracledb.Error:
+        _registrar_timeout()
+        raise
+    _registrar_espera(inicio)
+
+    try:
+        yield connection
+    finally:
+        await pool.release(connection)
+
+
+def executar_em_lote(sql, linhas, batch_size):
+    """Executa o DML para todas as linhas com executemany, em lotes, numa única transação.
+
+    Linhas com erro não interrompem o lote (batcherrors); as demais são confirmadas no final.
+    Retorna (linhas afetadas, [(índice da linha, mensagem de erro)]).
+    """
+    afetadas = 0
+    erros = []
+
+    with db_connection() as connection, connection.cursor() as cursor:
+        for inicio in range(0, len(linhas), batch_size):
+            lote = linhas[inicio:inicio + batch_size]
+            comeco = time.perf_counter()
+            cursor.executemany(sql, lote, batcherrors=True)
+            registrar_execute(rotulo_sql(sql), time.perf_counter() - comeco, {'linhas': len(lote)})
+            afetadas += cursor.rowcount
+            for erro in cursor.getbatcherrors():
+                erros.append((inicio + erro.offset, erro.message))
+
+        connection.commit()  # Confirma a transação
+
+    return afetadas, erros
+
+
+async def executar_em_lote_async(sql, linhas, batch_size):
+    """Versão assíncrona de `executar_em_lote`."""
+    afetadas = 0
+    erros = []
+
+    async with db_connection_async() as connection:
+        cursor = connection.cursor()
+        for inicio in range(0, len(linhas), batch_size):
+            lote = linhas[inicio:inicio + batch_size]
+            comeco = time.perf_counter()
+            await cursor.executemany(sql, lote, batcherrors=True)
+            registrar_execute(rotulo_sql(sql), time.perf_counter() - comeco, {'linhas': len(lote)})
+            afetadas += cursor.rowcount
+            for erro in cursor.getbatcherrors():
+                erros.append((inicio + erro.offset, erro.message))
+
+        await connection.commit()  # Confirma a transação
+
+    return afetadas, erros
+
+
+def pool_stats():
+    """Retorna um resumo do estado do pool e do tempo de espera por conexões."""
+    with _stats_lock:
+        stats = dict(_stats)
+
+    acquires = stats['acquires']
+    resumo = {
+        'acquires': acquires,
+        'timeouts': stats['timeouts'],
+        'wait_avg_ms': round(stats['wait_total_ms'] / acquires, 3) if acquires else 0.0,
+        'wait_max_ms': round(stats['wait_max_ms'], 3),
+        'wait_total_ms': round(stats['wait_total_ms'], 3),
+    }
+
+    pool = _pool if _pool is not None else _pool_async
+    if pool is None:
+        resumo.update({'initialized': False})
+        return resumo
+
+    resumo.update({
+        'initialized': True,
+        'busy': pool.busy,
+        'open': pool.opened,
+        'min': pool.min,
+        'max': pool.max,
+        'increment': pool.increment,
+        'ping_interval': pool.ping_interval,
+        'wait_timeout': pool.wait_timeout,
+    })
+    return resumo
@@ -0,0 +1,41 @@
+from consultas import CONSULTAS, abrir_ref_cursor, criar_rowfactory, preparar_ref_cursor
+from database import db_connection, db_connection_async
+from respostas import serializar_linhas
+
+# Linhas trazidas do Oracle por ida ao banco durante a exportação
+EXPORT_ARRAYSIZE = 5000
+
+
+def gerar_ndjson(tabela, args, arraysize=EXPORT_ARRAYSIZE):
+    """Gera o resultado da consulta como NDJSON, um lote de `arraysize` linhas por vez.
+
+    A conexão fica com o gerador até o fim da resposta (ou até o cliente desconectar),
+    então a memória usada não depende do tamanho da tabela.
+    """
+    colunas = CONSULTAS[tabela]['colunas']
+
+    with db_connection() as connection, connection.cursor() as cursor:
+        resultado = abrir_ref_cursor(cursor, tabela, args, arraysize=arraysize)
+        resultado.rowfactory = criar_rowfactory(resultado, colunas)
+
+        while True:
+            rows = resultado.fetchmany()
+            if not rows:
+                break
+            yield serializar_linhas(rows)
+
+
+async def gerar_ndjson_async(tabela, args, arraysize=EXPORT_ARRAYSIZE):
+    """Versão assíncrona de `gerar_ndjson`, para o modo ASGI."""
+    colunas = CONSULTAS[tabela]['colunas']
+
+    async with db_connection_async() as connection:
+        query, params, resultado = preparar_ref_cursor(connection, tabela, args, arraysize=arraysize)
+        await connection.cursor().execute(query, params)
+        resultado.rowfactory = criar_rowfactory(resultado, colunas)
+
+        while True:
+            rows = await resultado.fetchmany()
+            if not rows:
+                break
+            yield serializar_linhas(rows)
@@ -0,0 +1,34 @@
+"""Criação do chatbot, comum aos modos Flask (main.py) e ASGI (main_async.py).
+
+Sem STOCKFLUX_CHATBOT_CATALOGO o chatbot usa as intents do medicamento.json (artefato
+compilado, chatbot.py). Com a variável, as intents são geradas da tabela de medicamentos
+(catalogo_chatbot.py) e o catálogo troca o chatbot a cada sincronização com mudanças.
+O chatbot.py e o numpy só são importados na criação; cada modo guarda o resultado e lê
+o catálogo com o seu driver.
+"""
+import os
+
+# Intents geradas da tabela de medicamentos em vez do medicamento.json: ligado quando
+# STOCKFLUX_CHATBOT_CATALOGO tem o intervalo de atualização em segundos
+# (0: só na criação e pela rota /admin/chatbot/catalogo)
+INTERVALO_CATALOGO = float(os.environ['STOCKFLUX_CHATBOT_CATALOGO']) if os.environ.get('STOCKFLUX_CHATBOT_CATALOGO') else None
+
+# Resposta de /admin/chatbot/catalogo com o catálogo desligado
+MENSAGEM_CATALOGO_DESLIGADO = 'Catálogo do chatbot desligado (defina STOCKFLUX_CHATBOT_CATALOGO).'
+
+
+def criar_bot(estoque):
+    """Chatbot das intents do medicamento.json."""
+    from chatbot import ChatBot
+    return ChatBot(estoque=estoque)
+
+
+def criar_catalogo(estoque, linhas):
+    """Catálogo já sincronizado com as linhas de get_medicamentos; o chatbot fica em `catalogo.bot`.
+
+    A atualização periódica fica com quem chama (`iniciar_atualizacao` ou `manter_atualizado_async`).
+    """
+    from catalogo_chatbot import CatalogoChatBot
+    catalogo = CatalogoChatBot(estoque=estoque)
+    catalogo.sincronizar(linhas)
+    return catalogo
@@ -139,6 +139,33 @@ BEGIN
     RETURN rc;
 END;
 /
+CREATE OR REPLACE FUNCTION get_estoque_pagina(
+    p_estoque_id IN NUMBER DEFAULT NULL,
+    p_medicamento_id IN NUMBER DEFAULT NULL,
+    p_responsavel_id IN NUMBER DEFAULT NULL,
+    p_tipo_movimentacao_id IN NUMBER DEFAULT NULL,
+    p_after_id IN NUMBER DEFAULT NULL,
+    p_limit IN NUMBER DEFAULT 100
+)
+RETURN SYS_REFCURSOR IS
+    rc SYS_REFCURSOR;
+BEGIN
+    OPEN rc FOR
+    SELECT id_estoque, m.nome, r.nome, tm.descricao, quantidade, data, motivo
+    FROM rm93069.estoque e
+    JOIN rm93069.tipo_movimentacoes tm ON e.id_tipo_movimentacao = tm.id_tipo_movimentacao
+    JOIN rm93069.responsaveis r ON e.id_responsavel = r.id_responsavel
+    JOIN rm93069.medicamentos m ON e.id_medicamento = m.id_medicamento
+    WHERE (p_estoque_id IS NULL OR e.id_estoque = p_estoque_id)
+    AND (p_medicamento_id IS NULL OR m.id_medicamento = p_medicamento_id)
+    AND (p_responsavel_id IS NULL OR r.id_responsavel = p_responsavel_id)
+    AND (p_tipo_movimentacao_id IS NULL OR tm.id_tipo_movimentacao = p_tipo_movimentacao_id)
+    AND (p_after_id IS NULL OR e.id_estoque > p_after_id)
+    ORDER BY e.id_estoque
+    FETCH FIRST p_limit ROWS ONLY;
+    RETURN rc;
+END;
+/
 CREATE OR REPLACE FUNCTION get_etapas_producao(
     p_etapa_id IN NUMBER DEFAULT NULL
 )
@@ -171,6 +198,30 @@ BEGIN
     RETURN rc;
 END;
 /
+CREATE OR REPLACE FUNCTION get_producao_pagina(
+    p_producao_id IN NUMBER DEFAULT NULL,
+    p_medicamento_id IN NUMBER DEFAULT NULL,
+    p_etapa_id IN NUMBER DEFAULT NULL,
+    p_after_id IN NUMBER DEFAULT NULL,
+    p_limit IN NUMBER DEFAULT 100
+)
+RETURN SYS_REFCURSOR IS
+    rc SYS_REFCURSOR;
+BEGIN
+    OPEN rc FOR
+    SELECT id_producao, m.nome, ep.descricao, data_inicio, data_fim_prevista, data_fim_real
+    FROM rm93069.producao p
+    JOIN rm93069.medicamentos m ON p.id_medicamento = m.id_medicamento
+    JOIN rm93069.etapas_producao ep ON p.id_etapa = ep.id_etapa
+    WHERE (p_producao_id IS NULL OR p.id_producao = p_producao_id)
+    AND (p_medicamento_id IS NULL OR m.id_medicamento = p_medicamento_id)
+    AND (p_etapa_id IS NULL OR ep.id_etapa = p_etapa_id)
+    AND (p_after_id IS NULL OR p.id_producao > p_after_id)
+    ORDER BY p.id_producao
+    FETCH FIRST p_limit ROWS ONLY;
+    RETURN rc;
+END;
+/
 CREATE OR REPLACE FUNCTION get_atrasos_producao(
     p_atraso_id IN NUMBER DEFAULT NULL,
     p_producao_id IN NUMBER DEFAULT NULL,
@@ -193,3 +244,52 @@ BEGIN
     RETURN rc;
 END;
 /
+-- Saldo de estoque (saldo_estoque.py). A quantidade entra com o sinal do tipo de movimentação:
+-- 1 Entrada e 4 Devolução somam e 2 Saída subtrai, sempre pelo valor absoluto; 3 Ajuste leva o
+-- sinal na própria quantidade. Tipos fora do CASE ficam com quantidade NULL, contados em
+-- "sem_sinal", e a API recusa a carga até o tipo ser incluído aqui.
+CREATE OR REPLACE FUNCTION get_saldo_estoque
+RETURN SYS_REFCURSOR IS
+    rc SYS_REFCURSOR;
+BEGIN
+    OPEN rc FOR
+    SELECT m.nome, SUM(e.quantidade_saldo), MAX(e.id_estoque), COUNT(*) - COUNT(e.quantidade_saldo)
+    FROM (
+        SELECT id_estoque, id_medicamento,
+               CASE id_tipo_movimentacao
+                   WHEN 1 THEN ABS(NVL(quantidade, 0))
+                   WHEN 4 THEN ABS(NVL(quantidade, 0))
+                   WHEN 2 THEN -ABS(NVL(quantidade, 0))
+                   WHEN 3 THEN NVL(quantidade, 0)
+               END AS quantidade_saldo
+        FROM rm93069.estoque
+    ) e
+    JOIN rm93069.medicamentos m ON e.id_medicamento = m.id_medicamento
+    GROUP BY m.id_medicamento, m.nome;
+    RETURN rc;
+END;
+/
+-- Movimentos de Id maior que p_after_id com a quantidade já com sinal (o mesmo CASE de get_saldo_estoque)
+CREATE OR REPLACE FUNCTION get_movimentos_saldo(
+    p_after_id IN NUMBER DEFAULT NULL,
+    p_limit IN NUMBER DEFAULT 5000
+)
+RETURN SYS_REFCURSOR IS
+    rc SYS_REFCURSOR;
+BEGIN
+    OPEN rc FOR
+    SELECT e.id_estoque, m.nome,
+           CASE e.id_tipo_movimentacao
+               WHEN 1 THEN ABS(NVL(e.quantidade, 0))
+               WHEN 4 THEN ABS(NVL(e.quantidade, 0))
+               WHEN 2 THEN -ABS(NVL(e.quantidade, 0))
+               WHEN 3 THEN NVL(e.quantidade, 0)
+           END
+    FROM rm93069.estoque e
+    JOIN rm93069.medicamentos m ON e.id_medicamento = m.id_medicamento
+    WHERE (p_after_id IS NULL OR e.id_estoque > p_after_id)
+    ORDER BY e.id_estoque
+    FETCH FIRST p_limit ROWS ONLY;
+    RETURN rc;
+END;
+/
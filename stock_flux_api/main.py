@@ -1,126 +1,196 @@
-from flask import Flask, request
+import argparse
+import threading
+import time
+
+from flask import Flask, Response, make_response, request
 from flask_restx import Api, Resource, fields
 from flask_cors import CORS
-import oracledb
-import json
-from chatbot import ChatBot  # Importa a classe ChatBot
+from database import db_connection, executar_em_lote, init_pool, pool_stats
+from cache import cached, invalidate, lookup_cache
+from respostas import RespostaPronta, preparar_resposta, serializar_flask
+from consultas import (
+    ESCRITAS,
+    SQL_ID_MEDICAMENTO,
+    exportavel,
+    ler_batch_size,
+    ler_mensagens_lote,
+    ler_paginacao,
+    listar,
+    montar_linhas,
+    proximo_cursor,
+    resposta_lote_chatbot,
+    resposta_medicamentos,
+    resultado_lote,
+)
+from dashboard import montar_dashboard
+from exportacao import gerar_ndjson
+from saldo_estoque import ESPERA_CARGA, SaldosEstoque, ler_estoque, ler_movimentos_novos
+from alertas_estoque import AlertasEstoqueBaixo
+from fabrica_chatbot import INTERVALO_CATALOGO, MENSAGEM_CATALOGO_DESLIGADO, criar_bot, criar_catalogo
+import metricas
+from modelos import (
+    MODELOS,
+    medicamento_model,
+    status_model,
+    fornecedores_model,
+    materiais_model,
+    categorias_model,
+    motivos_model,
+    cargos_model,
+    departamentos_model,
+    estoque_model,
+    etapas_producao_model,
+    producao_model,
+    entradas_previstas_model,
+    atrasos_producao_model,
+    saldo_estoque_model,
+    alerta_estoque_model,
+)
 
 app = Flask(__name__)
 api = Api(app, version='1.0', title='API StockFlux',
           description='Uma API para gerenciar os dados do dashboard',
           doc='/docs'  # URL para o Swagger UI
           )
-CORS(app)
+CORS(app, expose_headers=['X-Next-Cursor', 'ETag'])  # Permite ao dashboard ler o cursor da próxima página e a ETag
 
 ns = api.namespace('api', description='Operações relacionadas às tabelas')
 
 api.add_namespace(ns)
 
-# Instancia o chatbot
-bot = ChatBot()
-
-medicamento_model = api.model('Medicamento', {
-    'Categoria': fields.String(required=True, description='Categoria do medicamento'),
-    'Motivo': fields.String(required=False, description='Motivo do medicamento'),
-    'Nome': fields.String(required=True, description='Nome do medicamento'),
-    'Código': fields.String(required=True, description='Código do medicamento'),
-    'Quantidade Minima': fields.Integer(required=True, description='Quantidade mínima do medicamento'),
-    'Localização': fields.String(required=True, description='Localização do medicamento'),
-    'Status': fields.String(required=True, description='Status do medicamento')
-})
-
-status_model = api.model('Status',{
-    'Id': fields.Integer(required=True, description='Id do status'),
-    'Descrição': fields.String(required=True, description='Descrição do status'),
-    'Motivo': fields.String(required=True, description='Motivo do status'),
-})
-
-fornecedores_model = api.model('Fornecedores',{
-    "Id": fields.Integer(required=True, description='Id do fornecedor'),
-    "Nome": fields.String(required=True, description='Nome do fornecedor'),
-    "Telefone": fields.String(required=True, description='Telefone do fornecedor'),
-    "Email": fields.String(required=True, description='Email do fornecedor'),
-})
-
-materiais_model = api.model('Materiais',{
-    "Id": fields.Integer(required=True, description='Id do material'),
-    "Fornecedor": fields.String(required=True, description='fornecedor do material'),
-    "Descrição": fields.String(required=True, description='Descrição do material'),
-})
-
-categorias_model = api.model('Categorias',{
-    "Id": fields.Integer(required=True, description='Id da categoria'),
-    "Descrição": fields.String(required=True, description='Descrição da categoria'),
-})
-
-motivos_model = api.model('Motivos',{
-    "Id": fields.Integer(required=True, description='Id do motivo'),
-    "Descrição": fields.String(required=True, description='Descrição do motivo'),
-})
-
-cargos_model = api.model('Cargos',{
-    "Id": fields.Integer(required=True, description='Id do cargo'),
-    "Descrição": fields.String(required=True, description='Descrição do cargo'),
-})
-
-departamentos_model = api.model('Departamentos',{
-    "Id": fields.Integer(required=True, description='Id do departamento'),
-    "Descrição": fields.String(required=True, description='Descrição do departamento'),
-})
-
-estoque_model = api.model('Estoque',{
-    "Id": fields.Integer(required=True, description='Id do estoque'),
-    "Medicamento": fields.String(required=True, description='Medicamento do estoque'),
-    "Responsável": fields.String(required=True, description='Responsável do estoque'),
-    "Tipo Movimentação": fields.String(required=True, description='Tipo de Movimentação do estoque'),
-    "Quantidade": fields.Integer(required=True, description='Quantidade do estoque'),
-    "Data": fields.DateTime(required=True, description='Data do estoque'),
-    "Motivo": fields.String(required=True, description='Motivo do estoque'),
-})
-
-etapas_producao_model = api.model('Etapas_Producao',{
-    "Id": fields.Integer(required=True, description='Id da etapa da produção'),
-    "Descrição": fields.String(required=True, description='Descrição da etapa da produção'),
-    "Prazo Estimado": fields.Integer(required=True, description='Prazo Estimado da etapa da produção'),
-})
-
-producao_model = api.model('Producao',{
-    "Id": fields.Integer(required=True, description='Id da produção'),
-    "Medicamento": fields.String(required=True, description='Medicamento da produção'),
-    "Etapa": fields.String(required=True, description='Etapa da produção'),
-    "Data Início": fields.DateTime(required=True, description='Data Início da produção'),
-    "Data Fim Prevista": fields.DateTime(required=True, description='Data Fim Prevista da produção'),
-    "Data Fim Real": fields.DateTime(required=True, description='Data Fim Real da produção'),
-})
-
-entradas_previstas_model = api.model('EntradasPrevistas',{
-    "Id": fields.Integer(required=True, description='Id da entrada prevista'),
-    "Material": fields.String(required=True, description='Material da entrada prevista'),
-    "Medicamento": fields.String(required=True, description='Descrição da entrada prevista'),
-    "Quantidade": fields.Integer(required=True, description='Quantidade da entrada prevista'),
-    "Data Prevista": fields.DateTime(required=True, description='Data Prevista da entrada prevista'),
-})
-
-atrasos_producao_model = api.model('AtrasosProducao',{
-    "Id": fields.Integer(required=True, description='Id do atraso'),
-    "Medicamento": fields.String(required=True, description='Medicamento da produção em atraso'),
-    "Etapa": fields.String(required=True, description='etapa da produção em atraso'),
-    "Dias de Atraso": fields.Integer(required=True, description='Dias de Atraso'),
-    "Motivo": fields.String(required=True, description='Motivo do atraso'),
-})
+# Registra os modelos compartilhados (modelos.py) na documentação Swagger
+for modelo in MODELOS:
+    ns.add_model(modelo.name, modelo)
+
+admin_ns = api.namespace('admin', description='Operações administrativas da API')
+
+# Instrumentação por rota (metricas.py): tempo total, banco, linhas, serialização e espera do pool
+@app.before_request
+def iniciar_medicao():
+    rota = request.url_rule.rule if request.url_rule else 'nao_encontrada'
+    metricas.iniciar(rota, request.method)
+
+@app.after_request
+def finalizar_medicao(response):
+    # O corpo só é interpretado se a requisição for lenta e entrar no log
+    metricas.finalizar(response.status_code, request.args, lambda: request.get_json(silent=True))
+    return response
+
+@api.representation('application/json')
+def output_json_medido(data, code, headers=None):
+    # Respostas do cache (cache.py) já chegam serializadas, com a ETag e as versões comprimidas
+    inicio = time.perf_counter()
+    pronta = data if isinstance(data, RespostaPronta) else RespostaPronta(serializar_flask(data))
+
+    # ETag e 304 nos GETs e compressão negociada pelo Accept-Encoding (respostas.py)
+    code, corpo, headers = preparar_resposta(pronta, request.method, code, headers,
+                                             request.headers.get('If-None-Match'),
+                                             request.headers.get('Accept-Encoding'))
+    metricas.registrar_serializacao(time.perf_counter() - inicio)
+
+    response = make_response(corpo, code)
+    response.headers.extend(headers)
+    return response
+
+# O chatbot é criado na primeira mensagem (ou pelo aquecimento em segundo plano), assim
+# o chatbot.py e o numpy só são carregados por quem atende /api/chatbot
+bot = None
+_bot_lock = threading.Lock()
+
+# Saldo de estoque por medicamento (saldo_estoque.py), usado nas respostas do chatbot e em
+# /api/estoque/saldo; atualizado em segundo plano a partir do primeiro uso
+saldos_estoque = SaldosEstoque()
+
+# Medicamentos abaixo da quantidade mínima, reavaliados a cada mudança dos saldos
+alertas_estoque = AlertasEstoqueBaixo(saldos_estoque)
+
+def iniciar_saldos():
+    saldos_estoque.iniciar_atualizacao(ler_estoque, ler_movimentos_novos)
+
+def aguardar_saldos():
+    """Garante que os saldos estão em atualização e espera a primeira carga (503 se demorar)."""
+    iniciar_saldos()
+    if not saldos_estoque.carregado.wait(ESPERA_CARGA):
+        ns.abort(503, 'Os saldos de estoque ainda estão sendo carregados.')
+
+# Intents do medicamento.json ou, com STOCKFLUX_CHATBOT_CATALOGO, da tabela de medicamentos
+# (fabrica_chatbot.py, a mesma criação do modo ASGI)
+catalogo = None
+
+def ler_catalogo():
+    return listar('medicamentos', {}, medicamento_model)
+
+def obter_catalogo():
+    global catalogo
+    if catalogo is None:
+        with _bot_lock:
+            if catalogo is None:
+                novo = criar_catalogo(saldos_estoque, ler_catalogo())
+                if INTERVALO_CATALOGO:
+                    novo.iniciar_atualizacao(ler_catalogo, INTERVALO_CATALOGO)
+                catalogo = novo
+    return catalogo
+
+def obter_bot():
+    global bot
+    if INTERVALO_CATALOGO is not None:
+        # O catálogo troca o `bot` a cada sincronização com mudanças
+        return obter_catalogo().bot
+    if bot is None:
+        with _bot_lock:
+            if bot is None:
+                bot = criar_bot(saldos_estoque)
+    return bot
+
+def aquecer_chatbot():
+    """Carrega o chatbot em uma thread, sem atrasar o início das rotas de dados."""
+    threading.Thread(target=obter_bot, name='aquecimento-chatbot', daemon=True).start()
+
+def iniciar_app():
+    """Abre o pool e aquece o chatbot antes da primeira requisição.
+
+    Chamado na subida do servidor, pelo `python main.py` e pelo wsgi.py dos servidores WSGI:
+    um credentials.json inválido impede a API de subir, em vez de virar 500 na primeira rota.
+    Os saldos de estoque só começam a ser carregados no primeiro uso (rotas de saldo e chatbot),
+    então workers que não atendem essas rotas não leem o estoque.
+    """
+    init_pool()  # Carrega as credenciais e abre o pool uma única vez
+    aquecer_chatbot()
 
 chat_message_model = ns.model('ChatMessage', {
     'message': fields.String(required=True, description='A mensagem do usuário')
 })
 
-def load_credentials():
-    with open('credentials.json') as f:
-        return json.load(f)
+chat_lote_model = ns.model('ChatLote', {
+    'messages': fields.List(fields.String, required=True, description='As mensagens, respondidas na mesma ordem')
+})
 
-def get_db_connection():
-    credentials = load_credentials()
-    connection = oracledb.connect(user=credentials['user'], password=credentials['password'], dsn=credentials['dsn'])
-    return connection
+def parse_paginacao():
+    """Lê `limit` e `after_id` da URL. Sem nenhum dos dois, a listagem é completa (limit None)."""
+    try:
+        return ler_paginacao(request.args)
+    except ValueError as e:
+        ns.abort(400, str(e))
+
+def pagina(itens, limit):
+    """Anexa o cabeçalho X-Next-Cursor quando a página veio cheia e pode haver mais linhas."""
+    cursor = proximo_cursor(itens, limit)
+    if cursor is not None:
+        return itens, 200, {'X-Next-Cursor': cursor}
+    return itens
+
+def aplicar_em_lote(tabela, operacao, status_sucesso=200):
+    """Aplica o DML de ESCRITAS[tabela][operacao] a cada registro da lista enviada no corpo."""
+    try:
+        batch_size = ler_batch_size(request.args)
+        sql, linhas = montar_linhas(tabela, operacao, ns.payload)
+    except ValueError as e:
+        ns.abort(400, str(e))
+
+    afetadas, erros = executar_em_lote(sql, linhas, batch_size)
+    invalidate(*ESCRITAS[tabela]['invalida'])
+
+    return resultado_lote(len(linhas), afetadas, erros, status_sucesso)
 
 # Medicamentos
 @ns.route('/medicamentos/id')
@@ -136,18 +206,9 @@ class MedicamentoIDResource(Resource):
 
         try:
             # Conectar ao banco de dados com context manager
-            with get_db_connection() as connection:
-                cursor = connection.cursor()
-
-                # Definir a query SQL para buscar o id_medicamento
-                query = """
-                    SELECT id_medicamento
-                    FROM rm93069.medicamento
-                    WHERE nome = :nome_medicamento
-                """
-
+            with db_connection() as connection, connection.cursor() as cursor:
                 # Executar a query com o nome do medicamento como parâmetro
-                cursor.execute(query, {"nome_medicamento": nome_medicamento})
+                cursor.execute(SQL_ID_MEDICAMENTO, {"nome_medicamento": nome_medicamento})
 
                 # Obter o resultado da consulta
                 row = cursor.fetchone()
@@ -170,149 +231,34 @@ class MedicamentoIDResource(Resource):
 @ns.route('/medicamentos')
 class MedicamentoResource(Resource):
     @ns.doc('list_medicamentos')
-    @ns.marshal_list_with(medicamento_model)
+    @ns.response(200, 'Success', [medicamento_model])
     def get(self):
-        categoria = request.args.get('categoria_id')
-        motivo = request.args.get('motivo_id')
-        status = request.args.get('status_id')
-        medicamento = request.args.get('medicamento_nome')
-
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        # Preparar a consulta para chamar a função e retornar o SYS_REFCURSOR
-        query = """
-            BEGIN
-                :ref_cursor := get_medicamentos(:categoria, :motivo, :status, :medicamento);
-            END;
-        """
-    
-        # Criação de um cursor de referência para armazenar o resultado
-        ref_cursor = cursor.var(oracledb.CURSOR)
-
-        # Executar a consulta passando os parâmetros necessários
-        cursor.execute(query, {
-            "ref_cursor": ref_cursor,
-            "categoria": categoria,
-            "motivo": motivo,
-            "status": status,
-            "medicamento": medicamento
-        })
-
-        # Obter os resultados do cursor retornado
-        rows = ref_cursor.getvalue().fetchall()
-
-        if not rows:
-            return {"error": "Nenhum medicamento encontrado"}, 404
-
-        medicamentos = []
-        for row in rows:
-            medicamento = {
-                "Categoria": row[0],
-                "Motivo": row[1],
-                "Nome": row[2],
-                "Código": row[3],
-                "Quantidade Minima": row[4],
-                "Localização": row[5],
-                "Status": row[6],
-            }
-            medicamentos.append(medicamento)
-
-            # Verifica se o medicamento foi descontinuado (por exemplo, pelo status)
-            if row[6] == 'Descontinuado':  # Suponha que 'Status' esteja na posição 6
-                nome = row[2]  # Nome do medicamento
-                dosagem = row[4]  # Quantidade mínima (adaptar se necessário)
-                fabricante = "Fabricante"  # Você pode obter essa informação de outra tabela, se necessário
-                data_discontinuacao = "Data aqui"  # Obtenha essa informação de uma coluna se disponível
-
-                # Função para gerar o comunicado
-                def gerar_comunicado(nome, dosagem, fabricante, data_discontinuacao):
-                    comunicado = f"""
-                    Comunicado sobre a descontinuação definitiva da fabricação/importação do medicamento {nome} {dosagem} mg
-                    
-                    São Paulo, {data_discontinuacao} — Em compromisso com a transparência junto aos pacientes e profissionais de saúde, a {fabricante} informa que o medicamento {nome}, na dosagem de {dosagem} mg será descontinuado definitivamente. Este produto não será mais comercializado pela {fabricante}.
-
-                    Destacamos que a descontinuação se refere à dosagem de {dosagem} mg, sem impactar outras apresentações do medicamento, que estão sendo comercializadas normalmente.
-
-                    Orientamos que pacientes e médicos conversem sobre a melhor conduta para a continuidade do tratamento.
-                    
-                    A Agência Nacional de Vigilância Sanitária (ANVISA) foi comunicada sobre essa situação conforme requerido na legislação vigente.
-
-                    Para mais informações, estamos à disposição por meio do Serviço de Atendimento ao Consumidor pelo telefone 0800-XXX-XXXX ou através do site {fabricante}/fale-conosco.
-
-                    Atenciosamente,
-
-                    {fabricante}
-                    """
-                    return comunicado
-
-                comunicado = gerar_comunicado(nome, dosagem, fabricante, data_discontinuacao)
-                cursor.close()
-                connection.close()
-
-                # Retornar o comunicado como resposta
-                return {"comunicado": comunicado}, 200
-
-        # Fechar o cursor e a conexão se não for encontrado nenhum medicamento descontinuado
-        cursor.close()
-        connection.close()
-        return medicamentos
+        medicamentos = listar('medicamentos', request.args, medicamento_model)
+
+        return resposta_medicamentos(medicamentos)
 
 
 # Status
 @ns.route('/status')
 class StatusResource(Resource):
     @ns.doc('list_status')
-    @ns.marshal_list_with(status_model)
+    @ns.response(200, 'Success', [status_model])
+    @cached('status')
     def get(self):
-        status = request.args.get('status_id')
-
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        query = """
-            BEGIN
-                :ref_cursor := get_status(:status);
-            END;
-        """
-
-        ref_cursor = cursor.var(oracledb.CURSOR)
-
-        cursor.execute(query, {
-            "ref_cursor": ref_cursor,
-            "status": status,
-        })
-
-        rows = ref_cursor.getvalue().fetchall()
-
-        status_list = []
-        for row in rows:
-            status_item = {
-                "Id": row[0],
-                "Descrição": row[1],
-                "Motivo": row[2],
-            }
-            status_list.append(status_item)
-
-        cursor.close()
-        connection.close()
-        return status_list
+        return listar('status', request.args, status_model)
 
     @ns.doc('create_status')
     @ns.expect(status_model)
     def post(self):
         data = ns.payload  # Captura os dados enviados no corpo da requisição
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        sql_insert = """INSERT INTO rm93069.status (id_status, descricao, motivo) 
-                            VALUES (:1, :2, :3)"""
-        cursor.execute(sql_insert, (data['Id'], data['Descrição'], data['Motivo']))
+        with db_connection() as connection, connection.cursor() as cursor:
+            sql_insert = """INSERT INTO rm93069.status (id_status, descricao, motivo) 
+                                VALUES (:1, :2, :3)"""
+            cursor.execute(sql_insert, (data['Id'], data['Descrição'], data['Motivo']))
 
-        connection.commit()  # Confirma a transação
+            connection.commit()  # Confirma a transação
 
-        cursor.close()
-        connection.close()
+        invalidate('status')
 
         return {'message': 'Status inserido com sucesso!'}, 201
 
@@ -320,97 +266,69 @@ class StatusResource(Resource):
     @ns.expect(status_model)
     def put(self):
         data = ns.payload  # Captura os dados enviados no corpo da requisição
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        sql_update = """UPDATE rm93069.status
-                            SET descricao = :1, motivo = :2 
-                            WHERE id_status = :3"""
-        cursor.execute(sql_update, (data['Descrição'], data['Motivo'], data['Id']))
+        with db_connection() as connection, connection.cursor() as cursor:
+            sql_update = """UPDATE rm93069.status
+                                SET descricao = :1, motivo = :2 
+                                WHERE id_status = :3"""
+            cursor.execute(sql_update, (data['Descrição'], data['Motivo'], data['Id']))
 
-        connection.commit()  # Confirma a transação
+            connection.commit()  # Confirma a transação
 
-        cursor.close()
-        connection.close()
+        invalidate('status')
 
         return {'message': 'Status atualizado com sucesso!'}
 
     @ns.doc('delete_status')
     def delete(self):
         data = ns.payload  # Captura os dados enviados no corpo da requisição
-        connection = get_db_connection()
-        cursor = connection.cursor()
+        with db_connection() as connection, connection.cursor() as cursor:
+            sql_delete = "DELETE FROM rm93069.status WHERE id_status = :1"
+            cursor.execute(sql_delete, (data['Id'],))
 
-        sql_delete = "DELETE FROM rm93069.status WHERE id_status = :1"
-        cursor.execute(sql_delete, (data['Id'],))
+            connection.commit()  # Confirma a transação
 
-        connection.commit()  # Confirma a transação
-
-        cursor.close()
-        connection.close()
+        invalidate('status')
 
         return {'message': 'Status deletado com sucesso!'}
 
+# Status em lote
+@ns.route('/status/bulk')
+class StatusBulkResource(Resource):
+    @ns.doc('create_status_bulk', params={'batch_size': 'Registros por executemany'})
+    @ns.expect([status_model])
+    def post(self):
+        return aplicar_em_lote('status', 'insert', status_sucesso=201)
+
+    @ns.doc('update_status_bulk', params={'batch_size': 'Registros por executemany'})
+    @ns.expect([status_model])
+    def put(self):
+        return aplicar_em_lote('status', 'update')
+
+    @ns.doc('delete_status_bulk', params={'batch_size': 'Registros por executemany'})
+    def delete(self):
+        return aplicar_em_lote('status', 'delete')
+
 # Fornecedores
 @ns.route('/fornecedores')
 class FornecedorResource(Resource):
     @ns.doc('list_fornecedores')
-    @ns.marshal_list_with(fornecedores_model)
+    @ns.response(200, 'Success', [fornecedores_model])
+    @cached('fornecedores')
     def get(self):
-        fornecedor = request.args.get('fornecedor_id')
-
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        query = """
-            BEGIN
-                :ref_cursor := get_fornecedores(:fornecedor);
-            END;
-        """
-
-        # Criação da variável para armazenar o cursor de referência
-        ref_cursor = cursor.var(oracledb.CURSOR)
-
-        cursor.execute(query, {
-            "ref_cursor": ref_cursor,
-            "fornecedor": fornecedor,
-        })
-
-        # Agora, usamos o cursor da variável ref_cursor
-        result_cursor = ref_cursor.getvalue()
-
-        # Fetchall no cursor resultante da execução da função PL/SQL
-        rows = result_cursor.fetchall()
-
-        fornecedores = []
-        for row in rows:
-            fornecedor = {
-                "Id": row[0],
-                "Nome": row[1],
-                "Telefone": row[2],
-                "Email": row[3],
-            }
-            fornecedores.append(fornecedor)
-
-        cursor.close()
-        connection.close()
-        return fornecedores
+        return listar('fornecedores', request.args, fornecedores_model)
 
     @ns.doc('create_fornecedores')
     @ns.expect(fornecedores_model)
     def post(self):
         data = ns.payload  # Captura os dados enviados no corpo da requisição
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        sql_insert = """INSERT INTO rm93069.fornecedores (id_fornecedor, nome, telefone, email) 
-                            VALUES (:1, :2, :3, :4)"""
-        cursor.execute(sql_insert, (data['Id'], data['Nome'], data['Telefone'], data['Email']))
+        with db_connection() as connection, connection.cursor() as cursor:
+            sql_insert = """INSERT INTO rm93069.fornecedores (id_fornecedor, nome, telefone, email) 
+                                VALUES (:1, :2, :3, :4)"""
+            cursor.execute(sql_insert, (data['Id'], data['Nome'], data['Telefone'], data['Email']))
 
-        connection.commit()  # Confirma a transação
+            connection.commit()  # Confirma a transação
 
-        cursor.close()
-        connection.close()
+        invalidate('fornecedores', 'materiais')
 
         return {'message': 'Status inserido com sucesso!'}, 201
 
@@ -418,95 +336,69 @@ class FornecedorResource(Resource):
     @ns.expect(fornecedores_model)
     def put(self):
         data = ns.payload  # Captura os dados enviados no corpo da requisição
-        connection = get_db_connection()
-        cursor = connection.cursor()
+        with db_connection() as connection, connection.cursor() as cursor:
+            sql_update = """UPDATE rm93069.fornecedores
+                                SET nome = :1, telefone = :2,  email = :3
+                                WHERE id_fornecedor = :4"""
+            cursor.execute(sql_update, (data['Nome'], data['Telefone'], data['Email'], data['Id']))
 
-        sql_update = """UPDATE rm93069.fornecedores
-                            SET nome = :1, telefone = :2,  email = :3
-                            WHERE id_fornecedor = :4"""
-        cursor.execute(sql_update, (data['Nome'], data['Telefone'], data['Email'], data['Id']))
+            connection.commit()  # Confirma a transação
 
-        connection.commit()  # Confirma a transação
-
-        cursor.close()
-        connection.close()
+        invalidate('fornecedores', 'materiais')
 
         return {'message': 'Status atualizado com sucesso!'}
 
     @ns.doc('delete_fornecedores')
     def delete(self):
         data = ns.payload  # Captura os dados enviados no corpo da requisição
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        sql_delete = "DELETE FROM rm93069.fornecedores WHERE id_fornecedor = :1"
-        cursor.execute(sql_delete, (data['Id'],))
+        with db_connection() as connection, connection.cursor() as cursor:
+            sql_delete = "DELETE FROM rm93069.fornecedores WHERE id_fornecedor = :1"
+            cursor.execute(sql_delete, (data['Id'],))
 
-        connection.commit()  # Confirma a transação
+            connection.commit()  # Confirma a transação
 
-        cursor.close()
-        connection.close()
+        invalidate('fornecedores', 'materiais')
 
         return {'message': 'Status deletado com sucesso!'}
 
+# Fornecedores em lote
+@ns.route('/fornecedores/bulk')
+class FornecedorBulkResource(Resource):
+    @ns.doc('create_fornecedores_bulk', params={'batch_size': 'Registros por executemany'})
+    @ns.expect([fornecedores_model])
+    def post(self):
+        return aplicar_em_lote('fornecedores', 'insert', status_sucesso=201)
+
+    @ns.doc('update_fornecedores_bulk', params={'batch_size': 'Registros por executemany'})
+    @ns.expect([fornecedores_model])
+    def put(self):
+        return aplicar_em_lote('fornecedores', 'update')
+
+    @ns.doc('delete_fornecedores_bulk', params={'batch_size': 'Registros por executemany'})
+    def delete(self):
+        return aplicar_em_lote('fornecedores', 'delete')
+
 # Materiais
 @ns.route('/materiais')
 class MaterialResource(Resource):
     @ns.doc('list_materiais')
-    @ns.marshal_list_with(materiais_model)
+    @ns.response(200, 'Success', [materiais_model])
+    @cached('materiais')
     def get(self):
-        fornecedor = request.args.get('fornecedor_id')
-        material = request.args.get('material_id')
-
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        query = """
-            BEGIN
-                :ref_cursor := get_materiais(:material, :fornecedor);
-            END;
-        """
-
-        ref_cursor = cursor.var(oracledb.CURSOR)
-
-        cursor.execute(query, {
-            "ref_cursor": ref_cursor,
-            "material": material,
-            "fornecedor": fornecedor,
-        })
-
-        result_cursor = ref_cursor.getvalue()
-
-        rows = result_cursor.fetchall()
-
-        materiais = []
-        for row in rows:
-            material = {
-                "Id": row[0],
-                "Fornecedor": row[1],
-                "Descrição": row[2],
-            }
-            materiais.append(material)
-
-        cursor.close()
-        connection.close()
-        return materiais
+        return listar('materiais', request.args, materiais_model)
 
     @ns.doc('create_materiais')
     @ns.expect(materiais_model)
     def post(self):
         data = ns.payload  # Captura os dados enviados no corpo da requisição
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        sql_insert = """INSERT INTO rm93069.materiais (id_material, id_fornecedor, descricao) 
-                                VALUES (:1, :2, :3)"""
-        cursor.execute(sql_insert, (data['Id'], data['Id_Fornecedor'], data['Descricao']))
+        with db_connection() as connection, connection.cursor() as cursor:
+            sql_insert = """INSERT INTO rm93069.materiais (id_material, id_fornecedor, descricao) 
+                                    VALUES (:1, :2, :3)"""
+            cursor.execute(sql_insert, (data['Id'], data['Id_Fornecedor'], data['Descricao']))
 
-        connection.commit()  # Confirma a transação
+            connection.commit()  # Confirma a transação
 
-        cursor.close()
-        connection.close()
+        invalidate('materiais')
 
         return {'message': 'Status inserido com sucesso!'}, 201
 
@@ -514,435 +406,264 @@ class MaterialResource(Resource):
     @ns.expect(materiais_model)
     def put(self):
         data = ns.payload  # Captura os dados enviados no corpo da requisição
-        connection = get_db_connection()
-        cursor = connection.cursor()
+        with db_connection() as connection, connection.cursor() as cursor:
+            sql_update = """UPDATE rm93069.materiais
+                                    SET id_fornecedor = :2,  descricao = :3
+                                    WHERE id_material = :1"""
+            cursor.execute(sql_update, (data['Id'], data['Id_Fornecedor'], data['Descricao'],))
 
-        sql_update = """UPDATE rm93069.materiais
-                                SET id_fornecedor = :2,  descricao = :3
-                                WHERE id_material = :1"""
-        cursor.execute(sql_update, (data['Id'], data['Id_Fornecedor'], data['Descricao'],))
+            connection.commit()  # Confirma a transação
 
-        connection.commit()  # Confirma a transação
-
-        cursor.close()
-        connection.close()
+        invalidate('materiais')
 
         return {'message': 'Status atualizado com sucesso!'}
 
     @ns.doc('delete_materiais')
     def delete(self):
         data = ns.payload  # Captura os dados enviados no corpo da requisição
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        sql_delete = "DELETE FROM rm93069.materiais WHERE id_material = :1"
-        cursor.execute(sql_delete, (data['Id'],))
+        with db_connection() as connection, connection.cursor() as cursor:
+            sql_delete = "DELETE FROM rm93069.materiais WHERE id_material = :1"
+            cursor.execute(sql_delete, (data['Id'],))
 
-        connection.commit()  # Confirma a transação
+            connection.commit()  # Confirma a transação
 
-        cursor.close()
-        connection.close()
+        invalidate('materiais')
 
         return {'message': 'Status deletado com sucesso!'}
 
+# Materiais em lote
+@ns.route('/materiais/bulk')
+class MaterialBulkResource(Resource):
+    @ns.doc('create_materiais_bulk', params={'batch_size': 'Registros por executemany'})
+    @ns.expect([materiais_model])
+    def post(self):
+        return aplicar_em_lote('materiais', 'insert', status_sucesso=201)
+
+    @ns.doc('update_materiais_bulk', params={'batch_size': 'Registros por executemany'})
+    @ns.expect([materiais_model])
+    def put(self):
+        return aplicar_em_lote('materiais', 'update')
+
+    @ns.doc('delete_materiais_bulk', params={'batch_size': 'Registros por executemany'})
+    def delete(self):
+        return aplicar_em_lote('materiais', 'delete')
+
 # Categorias
 @ns.route('/categorias')
 class CategoriaResource(Resource):
     @ns.doc('list_categoria')
-    @ns.marshal_list_with(categorias_model)
+    @ns.response(200, 'Success', [categorias_model])
+    @cached('categorias')
     def get(self):
-        categoria = request.args.get('categoria_id')
-
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        query = """
-            BEGIN
-                :ref_cursor := get_categorias(:categoria);
-            END;
-        """
-
-        ref_cursor = cursor.var(oracledb.CURSOR)
-
-        cursor.execute(query, {
-            "ref_cursor": ref_cursor,
-            "categoria": categoria,
-        })
-
-        result_cursor = ref_cursor.getvalue()
-
-        rows = result_cursor.fetchall()
-
-        categorias = []
-        for row in rows:
-            categoria = {
-                "Id": row[0],
-                "Descrição": row[1],
-            }
-            categorias.append(categoria)
-
-        cursor.close()
-        connection.close()
-        return categorias
+        return listar('categorias', request.args, categorias_model)
 
 # Motivos
 @ns.route('/motivos')
 class MotivoResource(Resource):
     @ns.doc('list_motivo')
-    @ns.marshal_list_with(motivos_model)
+    @ns.response(200, 'Success', [motivos_model])
+    @cached('motivos')
     def get(self):
-        motivo = request.args.get('motivo_id')
-
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        query = """
-            BEGIN
-                :ref_cursor := get_motivos(:motivo);
-            END;
-        """
-
-        ref_cursor = cursor.var(oracledb.CURSOR)
-
-        cursor.execute(query, {
-            "ref_cursor": ref_cursor,
-            "motivo": motivo,
-        })
-
-        result_cursor = ref_cursor.getvalue()
-
-        rows = result_cursor.fetchall()
-
-        motivos = []
-        for row in rows:
-            motivo = {
-                "Id": row[0],
-                "Descrição": row[1],
-            }
-            motivos.append(motivo)
-
-        cursor.close()
-        connection.close()
-        return motivos
+        return listar('motivos', request.args, motivos_model)
 
 # Cargos
 @ns.route('/cargos')
 class CargoResource(Resource):
     @ns.doc('list_cargo')
-    @ns.marshal_list_with(cargos_model)
+    @ns.response(200, 'Success', [cargos_model])
+    @cached('cargos')
     def get(self):
-        cargo = request.args.get('cargo_id')
-
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        query = """
-            BEGIN
-                :ref_cursor := get_cargos(:cargo);
-            END;
-        """
-
-        ref_cursor = cursor.var(oracledb.CURSOR)
-
-        cursor.execute(query, {
-            "ref_cursor": ref_cursor,
-            "cargo": cargo,
-        })
-
-        rows = ref_cursor.getvalue().fetchall()
-
-        cargos = []
-        for row in rows:
-            cargo = {
-                "Id": row[0],
-                "Descrição": row[1],
-            }
-            cargos.append(cargo)
-
-        cursor.close()
-        connection.close()
-        return cargos
+        return listar('cargos', request.args, cargos_model)
 
 # Departamentos
 @ns.route('/departamentos')
 class DepartamentoResource(Resource):
     @ns.doc('list_departamento')
-    @ns.marshal_list_with(departamentos_model)
+    @ns.response(200, 'Success', [departamentos_model])
+    @cached('departamentos')
     def get(self):
-        departamento = request.args.get('departamento_id')
-
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        query = """
-            BEGIN
-                :ref_cursor := get_departamentos(:departamento);
-            END;
-        """
-
-        ref_cursor = cursor.var(oracledb.CURSOR)
-
-        cursor.execute(query, {
-            "ref_cursor": ref_cursor,
-            "departamento": departamento,
-        })
-
-        rows = ref_cursor.getvalue().fetchall()
-
-        departamentos = []
-        for row in rows:
-            departamento = {
-                "Id": row[0],
-                "Descrição": row[1],
-            }
-            departamentos.append(departamento)
-
-        cursor.close()
-        connection.close()
-        return departamentos
+        return listar('departamentos', request.args, departamentos_model)
 
 # Estoque
 @ns.route('/estoque')
 class EstoqueResource(Resource):
     @ns.doc('list_estoque')
-    @ns.marshal_list_with(estoque_model)
+    @ns.response(200, 'Success', [estoque_model])
+    def get(self):
+        limit, after_id = parse_paginacao()
+
+        # Com limit/after_id usa a função paginada, que busca só as linhas de id maior que after_id
+        pagina_atual = (after_id, limit) if limit is not None else None
+        estoque = listar('estoque', request.args, estoque_model, pagina_atual)
+
+        return pagina(estoque, limit)
+
+@ns.route('/estoque/saldo')
+class SaldoEstoqueResource(Resource):
+    @ns.doc('list_saldo_estoque')
+    @ns.response(200, 'Success', [saldo_estoque_model])
     def get(self):
-        estoque = request.args.get('estoque_id')
-        medicamento = request.args.get('medicamento_id')
-        responsavel = request.args.get('responsavel_id')
-        tipo_movimentacao = request.args.get('tipo_movimentacao_id')
-
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        query = """
-            BEGIN
-                :ref_cursor := get_estoque(:estoque, :medicamento, :responsavel, :tipo_movimentacao);
-            END;
-        """
-
-        ref_cursor = cursor.var(oracledb.CURSOR)
-
-        cursor.execute(query, {
-            "ref_cursor": ref_cursor,
-            "estoque": estoque,
-            "medicamento": medicamento,
-            "responsavel": responsavel,
-            "tipo_movimentacao": tipo_movimentacao,
-        })
-
-        rows = ref_cursor.getvalue().fetchall()
-
-        estoque = []
-        for row in rows:
-            item = {
-                "Id": row[0],
-                "Medicamento": row[1],
-                "Responsável": row[2],
-                "Tipo Movimentação": row[3],
-                "Quantidade": row[4],
-                "Data": row[5],
-                "Motivo": row[6],
-            }
-            estoque.append(item)
-
-        cursor.close()
-        connection.close()
-        
-        return estoque
+        # Saldos mantidos em memória: O(medicamentos), sem percorrer os movimentos
+        aguardar_saldos()
+        return saldos_estoque.listar()
+
+# Alertas
+@ns.route('/alertas/estoque_baixo')
+class AlertasEstoqueBaixoResource(Resource):
+    @ns.doc('list_alertas_estoque_baixo')
+    @ns.response(200, 'Success', [alerta_estoque_model])
+    def get(self):
+        # Lista já ordenada (mais críticos primeiro), remontada só quando os alertas mudam
+        aguardar_saldos()
+        return alertas_estoque.alertas
 
 # Etapas Produção
 @ns.route('/etapas_producao')
 class EtapasProducaoResource(Resource):
     @ns.doc('list_etapas_producao')
-    @ns.marshal_list_with(etapas_producao_model)
+    @ns.response(200, 'Success', [etapas_producao_model])
+    @cached('etapas_producao')
     def get(self):
-        etapa = request.args.get('etapa_id')
-
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        query = """
-            BEGIN
-                :ref_cursor := get_etapas_producao(:etapa);
-            END;
-        """
-
-        ref_cursor = cursor.var(oracledb.CURSOR)
-
-        cursor.execute(query, {
-            "ref_cursor": ref_cursor,
-            "etapa": etapa,
-        })
-
-        rows = ref_cursor.getvalue().fetchall()
-
-        etapas_producao = []
-        for row in rows:
-            etapa = {
-                "Id": row[0],
-                "Descrição": row[1],
-                "Prazo Estimado": row[2],
-            }
-            etapas_producao.append(etapa)
-
-        cursor.close()
-        connection.close()
-        return etapas_producao
+        return listar('etapas_producao', request.args, etapas_producao_model)
 
 # Produção
 @ns.route('/producao')
 class ProducaoResource(Resource):
     @ns.doc('list_producao')
-    @ns.marshal_list_with(producao_model)
+    @ns.response(200, 'Success', [producao_model])
     def get(self):
-        producao = request.args.get('producao_id')
-        medicamento = request.args.get('medicamento_id')
-        etapa = request.args.get('etapa_id')
-
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        query = """
-            BEGIN
-                :ref_cursor := get_producao(:producao, :medicamento, :etapa);
-            END;
-        """
-
-        ref_cursor = cursor.var(oracledb.CURSOR)
-
-        cursor.execute(query, {
-            "ref_cursor": ref_cursor,
-            "producao": producao,
-            "medicamento": medicamento,
-            "etapa": etapa,
-        })
-
-        rows = ref_cursor.getvalue().fetchall()
-
-        producao = []
-        for row in rows:
-            producao_item = {
-                "Id": row[0],
-                "Medicamento": row[1],
-                "Etapa": row[2],
-                "Data Início": row[3],
-                "Data Fim Prevista": row[4],
-                "Data Fim Real": row[5],
-            }
-            producao.append(producao_item)
-
-        cursor.close()
-        connection.close()
-        return producao
+        limit, after_id = parse_paginacao()
+
+        # Com limit/after_id usa a função paginada, que busca só as linhas de id maior que after_id
+        pagina_atual = (after_id, limit) if limit is not None else None
+        producao = listar('producao', request.args, producao_model, pagina_atual)
+
+        return pagina(producao, limit)
 
 # Entradas Previstas
 @ns.route('/entradas_previstas')
 class EntradasPrevistasResource(Resource):
     @ns.doc('list_entradas_previstas')
-    @ns.marshal_list_with(entradas_previstas_model)
+    @ns.response(200, 'Success', [entradas_previstas_model])
     def get(self):
-        entrada_prevista = request.args.get('entrada_prevista_id')
-        material = request.args.get('material_id')
-        medicamento = request.args.get('medicamento_id')
-
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        query = """
-            BEGIN
-                :ref_cursor := get_entradas_previstas(:entrada_prevista, :material, :medicamento);
-            END;
-        """
-
-        ref_cursor = cursor.var(oracledb.CURSOR)
-
-        cursor.execute(query, {
-            "ref_cursor": ref_cursor,
-            "entrada_prevista": entrada_prevista,
-            "material": material,
-            "medicamento": medicamento,
-        })
-
-        rows = ref_cursor.getvalue().fetchall()
-
-        entradas_previstas = []
-        for row in rows:
-            entrada = {
-                "Id": row[0],
-                "Material": row[1],
-                "Medicamento": row[2],
-                "Quantidade": row[3],
-                "Data Prevista": row[4],
-            }
-            entradas_previstas.append(entrada)
-
-        cursor.close()
-        connection.close()
-        return entradas_previstas
+        return listar('entradas_previstas', request.args, entradas_previstas_model)
 
 # Atrasos Produção
 @ns.route('/atrasos_producao')
 class AtrasosProducaoResource(Resource):
     @ns.doc('list_atrasos_produção')
-    @ns.marshal_list_with(atrasos_producao_model)
+    @ns.response(200, 'Success', [atrasos_producao_model])
     def get(self):
-        atraso = request.args.get('atraso_id')
-        producao = request.args.get('producao_id')
-        medicamento = request.args.get('medicamento_id')
-        etapa = request.args.get('etapa_id')
-
-        connection = get_db_connection()
-        cursor = connection.cursor()
-
-        query = """
-            BEGIN
-                :ref_cursor := get_atrasos_producao(:atraso, :producao, :medicamento, :etapa);
-            END;
-        """
-
-        ref_cursor = cursor.var(oracledb.CURSOR)
-
-        cursor.execute(query, {
-            "ref_cursor": ref_cursor,
-            "atraso": atraso,
-            "producao": producao,
-            "medicamento": medicamento,
-            "etapa": etapa,
-        })
-
-        rows = ref_cursor.getvalue().fetchall()
-
-        atrasos_producao = []
-        for row in rows:
-            atraso = {
-                "Id": row[0],
-                "Medicamento": row[1],
-                "Etapa": row[2],
-                "Dias de Atraso": row[3],
-                "Motivo": row[4],
-            }
-            atrasos_producao.append(atraso)
-
-        cursor.close()
-        connection.close()
-        return atrasos_producao
+        return listar('atrasos_producao', request.args, atrasos_producao_model)
     
+# Exportação
+@ns.route('/export/<string:tabela>')
+class ExportResource(Resource):
+    @ns.doc('export_tabela')
+    def get(self, tabela):
+        if not exportavel(tabela):
+            ns.abort(404, f'Tabela {tabela} não disponível para exportação.')
+
+        # Aceita os mesmos filtros da rota de listagem e envia as linhas conforme chegam do banco
+        return Response(gerar_ndjson(tabela, request.args.to_dict()), mimetype='application/x-ndjson')
+
+# Dashboard
+@ns.route('/dashboard')
+class DashboardResource(Resource):
+    @ns.doc('get_dashboard', params={'medicamento_id': 'Filtra todas as seções pelo medicamento'})
+    def get(self):
+        # Medicamentos, estoque, produção, entradas previstas e atrasos em uma única chamada,
+        # com as consultas executadas em paralelo
+        return montar_dashboard(request.args.to_dict())
+
 # ChatBot
 @ns.route('/chatbot')
 class ChatBotResource(Resource):
     @ns.doc('chat')
     @ns.expect(chat_message_model)  # Utilize o modelo definido
     def post(self):
-        data = request.json
-        user_message = data.get("message")
+        data = request.get_json(silent=True) or {}
+        user_message = data.get("message") if isinstance(data, dict) else None
+        if not isinstance(user_message, str):
+            ns.abort(400, 'Informe a mensagem em "message".')
+
+        iniciar_saldos()  # As respostas sobre estoque usam os saldos em memória
+        # Obtenha a resposta do chatbot utilizando o método `obter_resposta`
+        bot_response = obter_bot().obter_resposta(user_message)
 
-        # Obtenha a resposta do chatbot utilizando o método `get_response`
-        bot_response = bot.get_response(user_message)
-        
         return {"response": bot_response}
 
+@ns.route('/chatbot/bulk')
+class ChatBotLoteResource(Resource):
+    @ns.doc('chat_bulk')
+    @ns.expect(chat_lote_model)
+    def post(self):
+        data = request.get_json(silent=True) or {}
+        try:
+            mensagens = ler_mensagens_lote(data)
+        except ValueError as e:
+            ns.abort(400, str(e))
+
+        iniciar_saldos()
+        inicio = time.perf_counter()
+        respostas = obter_bot().obter_respostas(mensagens)
+        return resposta_lote_chatbot(respostas, time.perf_counter() - inicio)
+
+# Administração
+@admin_ns.route('/pool')
+class PoolResource(Resource):
+    @admin_ns.doc('pool_stats')
+    def get(self):
+        # Conexões ocupadas/abertas e tempo de espera para obter uma conexão
+        return pool_stats()
+
+@admin_ns.route('/cache')
+class CacheResource(Resource):
+    @admin_ns.doc('cache_stats')
+    def get(self):
+        return lookup_cache.stats()
+
+    @admin_ns.doc('cache_clear')
+    def delete(self):
+        lookup_cache.clear()
+        return {'message': 'Cache limpo com sucesso!'}
+
+@admin_ns.route('/metrics')
+class MetricsResource(Resource):
+    @admin_ns.doc('metrics')
+    def get(self):
+        # Histogramas no formato texto do Prometheus
+        return Response(metricas.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@admin_ns.route('/chatbot/catalogo')
+class CatalogoChatBotResource(Resource):
+    @admin_ns.doc('chatbot_catalogo')
+    def post(self):
+        # Sincroniza agora as intents do chatbot com a tabela de medicamentos
+        if INTERVALO_CATALOGO is None:
+            admin_ns.abort(404, MENSAGEM_CATALOGO_DESLIGADO)
+        return obter_catalogo().sincronizar(ler_catalogo())
+
+@admin_ns.route('/chatbot/rastreio')
+class RastreioChatBotResource(Resource):
+    @admin_ns.doc('chatbot_rastreio')
+    def get(self):
+        # Amostragem atual, eventos na fila e descartados (fila cheia)
+        import rastreio_chatbot
+        return rastreio_chatbot.estatisticas()
+
 if __name__ == '__main__':
-    app.run(debug=True)
+    parser = argparse.ArgumentParser(description='API StockFlux')
+    parser.add_argument('--modo', choices=['flask', 'async'], default='flask',
+                        help='flask (padrão) ou async (ASGI com o driver asyncio do oracledb)')
+    parser.add_argument('--porta', type=int, default=5000)
+    opcoes = parser.parse_args()
+
+    if opcoes.modo == 'async':
+        import uvicorn
+        uvicorn.run('main_async:app', port=opcoes.porta)
+    else:
+        iniciar_app()
+        app.run(debug=True, port=opcoes.porta)
 
 # http://localhost:5000/docs
@@ -0,0 +1,508 @@
+"""Modo ASGI da API StockFlux.
+
+Expõe as rotas /api/* e /admin/* de `main.py` com os mesmos status, corpos e cabeçalhos
+(tests/test_contrato.py compara as duas APIs), sobre o driver asyncio do oracledb ou o pool
+assíncrono do sqlite_local.py. As consultas, validações e comandos de escrita são os mesmos
+do modo Flask (consultas.py); só o transporte muda. O que continua diferente (Swagger, 404
+de URL desconhecida, sugestão "did you mean" do flask-restx e CORS) está no README. Execute com:
+
+    python main.py --modo async
+"""
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import QueryParams
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from werkzeug.datastructures import MultiDict
+
+from cache import CACHE_TTL, chave_cache, invalidate, lookup_cache, versao
+from consultas import (
+    CONSULTAS,
+    ESCRITAS,
+    SQL_ID_MEDICAMENTO,
+    exportavel,
+    ler_batch_size,
+    ler_mensagens_lote,
+    ler_paginacao,
+    listar_async,
+    montar_linhas,
+    proximo_cursor,
+    resposta_lote_chatbot,
+    resposta_medicamentos,
+    resultado_lote,
+)
+from database import close_pool_async, db_connection_async, executar_em_lote_async, init_pool_async, pool_stats
+from dashboard import montar_dashboard_async
+from exportacao import gerar_ndjson_async
+from respostas import RespostaPronta, preparar_resposta, serializar
+from saldo_estoque import ESPERA_CARGA, SaldosEstoque, ler_estoque_async, ler_movimentos_novos_async
+from alertas_estoque import AlertasEstoqueBaixo
+from fabrica_chatbot import INTERVALO_CATALOGO, MENSAGEM_CATALOGO_DESLIGADO, criar_bot, criar_catalogo
+import metricas
+from modelos import (
+    medicamento_model,
+    status_model,
+    fornecedores_model,
+    materiais_model,
+    categorias_model,
+    motivos_model,
+    cargos_model,
+    departamentos_model,
+    estoque_model,
+    etapas_producao_model,
+    producao_model,
+    entradas_previstas_model,
+    atrasos_producao_model,
+)
+
+# Modelo de resposta de cada rota de listagem (o mesmo do @ns.marshal_list_with do modo Flask)
+MODELOS_LISTAGEM = {
+    'medicamentos': medicamento_model,
+    'status': status_model,
+    'fornecedores': fornecedores_model,
+    'materiais': materiais_model,
+    'categorias': categorias_model,
+    'motivos': motivos_model,
+    'cargos': cargos_model,
+    'departamentos': departamentos_model,
+    'estoque': estoque_model,
+    'etapas_producao': etapas_producao_model,
+    'producao': producao_model,
+    'entradas_previstas': entradas_previstas_model,
+    'atrasos_producao': atrasos_producao_model,
+}
+
+# Mensagens e status das rotas individuais de escrita, iguais às do modo Flask
+MENSAGENS_ESCRITA = {
+    'insert': ('Status inserido com sucesso!', 201),
+    'update': ('Status atualizado com sucesso!', 200),
+    'delete': ('Status deletado com sucesso!', 200),
+}
+
+METODOS_ESCRITA = {'POST': 'insert', 'PUT': 'update', 'DELETE': 'delete'}
+
+# Recusas do request.get_json() do werkzeug, usado pelo `ns.payload` das escritas do modo Flask
+MENSAGEM_SEM_JSON = "Did not attempt to load JSON data because the request Content-Type was not 'application/json'."
+MENSAGEM_JSON_INVALIDO = 'The browser (or proxy) sent a request that this server could not understand.'
+
+_bot = None
+_catalogo = None
+_bot_lock = asyncio.Lock()  # Uma única criação do chatbot, mesmo com várias primeiras mensagens ao mesmo tempo
+_saldos_estoque = SaldosEstoque()
+_alertas_estoque = AlertasEstoqueBaixo(_saldos_estoque)
+_tarefas = {}  # Tarefas em segundo plano por nome (o event loop só guarda referências fracas)
+
+logger = logging.getLogger('stock_flux_api.asgi')
+
+
+class RespostaJSON(JSONResponse):
+    # Mesmo corpo que o flask-restx gera (json.dumps padrão + quebra de linha)
+    def render(self, content):
+        return serializar(content)
+
+
+def responder(resultado, request):
+    """Converte o retorno no estilo flask-restx (corpo, status, cabeçalhos) em resposta.
+
+    Como na representação JSON do modo Flask, GETs com sucesso levam a ETag (304 se o
+    cliente já tem o corpo) e corpos grandes são comprimidos conforme o Accept-Encoding.
+    """
+    if not isinstance(resultado, tuple):
+        resultado = (resultado,)
+    conteudo, status, cabecalhos = resultado + (200, None)[len(resultado) - 1:]
+
+    inicio = time.perf_counter()
+    pronta = conteudo if isinstance(conteudo, RespostaPronta) else RespostaPronta(serializar(conteudo))
+    status, corpo, cabecalhos = preparar_resposta(pronta, request.method, status, cabecalhos,
+                                                  request.headers.get('if-none-match'),
+                                                  request.headers.get('accept-encoding'))
+    metricas.registrar_serializacao(time.perf_counter() - inicio)
+    if status == 304:
+        return Response(status_code=304, headers=cabecalhos)
+    return Response(corpo, status, cabecalhos, media_type='application/json')
+
+
+def erro(status, mensagem):
+    return RespostaJSON({'message': mensagem}, status)
+
+
+def erro_interno(request, causa):
+    """500 com o corpo que o flask-restx devolve para exceções não tratadas; a causa vai só para o log."""
+    logger.error('Exception on %s [%s]: %s', request.url.path, request.method, causa)
+    return erro(500, 'Internal Server Error')
+
+
+async def excecao_nao_tratada(request, exc):
+    # O ServerErrorMiddleware envia esta resposta e repassa a exceção ao servidor, que a registra
+    return erro(500, 'Internal Server Error')
+
+
+def parametros(request):
+    """Query string no MultiDict do werkzeug, o mesmo tipo do request.args do modo Flask.
+
+    Com um parâmetro repetido, `get` devolve o primeiro valor, como no Flask (o QueryParams
+    do Starlette fica com o último).
+    """
+    return MultiDict(request.query_params.multi_items())
+
+
+async def ler_corpo(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+async def ler_payload(request):
+    """Corpo das rotas de escrita, como o `ns.payload` do modo Flask: (corpo, None) ou (None, erro).
+
+    Content-Type que não é JSON responde 415 e JSON malformado, 400.
+    """
+    tipo = request.headers.get('content-type', '').partition(';')[0].strip().lower()
+    if tipo != 'application/json' and not (tipo.startswith('application/') and tipo.endswith('+json')):
+        return None, erro(415, MENSAGEM_SEM_JSON)
+    try:
+        return await request.json(), None
+    except ValueError:
+        return None, erro(400, MENSAGEM_JSON_INVALIDO)
+
+
+# Listagens
+def rota_listagem(tabela):
+    modelo = MODELOS_LISTAGEM[tabela]
+    pagina_disponivel = 'funcao_pagina' in CONSULTAS[tabela]
+
+    async def listagem(request):
+        args = parametros(request)
+
+        chave = None
+        if tabela in CACHE_TTL:
+            chave = chave_cache(tabela, args)
+            encontrado, pronta = lookup_cache.get(chave)
+            if encontrado:
+                return responder(pronta, request)
+            versao_consulta = versao(tabela)
+
+        limit = after_id = None
+        if pagina_disponivel:
+            try:
+                limit, after_id = ler_paginacao(args)
+            except ValueError as e:
+                return erro(400, str(e))
+
+        pagina_atual = (after_id, limit) if limit is not None else None
+        itens = await listar_async(tabela, args, modelo, pagina_atual)
+
+        if tabela == 'medicamentos':
+            return responder(resposta_medicamentos(itens), request)
+
+        if chave is not None:
+            # Guardada já serializada e com a ETag, como no cache do modo Flask
+            pronta = RespostaPronta(serializar(itens))
+            if versao(tabela) == versao_consulta:
+                lookup_cache.set(chave, pronta, CACHE_TTL[tabela])
+            return responder(pronta, request)
+
+        cursor = proximo_cursor(itens, limit)
+        return responder((itens, 200, {'X-Next-Cursor': cursor}) if cursor else itens, request)
+
+    return listagem
+
+
+async def medicamento_id(request):
+    nome_medicamento = parametros(request).get('nome_medicamento')
+
+    if not nome_medicamento or nome_medicamento.strip() == '':
+        return responder(({'error': 'O nome do medicamento é obrigatório e deve ser uma string válida.'}, 400), request)
+
+    try:
+        async with db_connection_async() as connection:
+            cursor = connection.cursor()
+            await cursor.execute(SQL_ID_MEDICAMENTO, {"nome_medicamento": nome_medicamento})
+            row = await cursor.fetchone()
+    except Exception as e:
+        return responder(({'error': f'Ocorreu um erro ao processar a solicitação: {str(e)}'}, 500), request)
+
+    if row:
+        return responder(({"id_medicamento": row[0]}, 200), request)
+    return responder(({"error": "Medicamento não encontrado"}, 404), request)
+
+
+# Escritas
+def rota_escrita(tabela):
+    async def escrita(request):
+        operacao = METODOS_ESCRITA[request.method]
+        registro, recusa = await ler_payload(request)
+        if recusa is not None:
+            return recusa
+
+        # Mesmo contrato das rotas individuais do modo Flask, que não validam o corpo: registro
+        # incompleto ou rejeitado pelo banco responde 500 e nada é invalidado. PUT e DELETE
+        # sem linha correspondente respondem 200, como lá.
+        try:
+            sql, linhas = montar_linhas(tabela, operacao, [registro])
+        except ValueError as e:
+            return erro_interno(request, e)
+
+        _, erros = await executar_em_lote_async(sql, linhas, 1)
+        if erros:
+            return erro_interno(request, erros[0][1])
+        invalidate(*ESCRITAS[tabela]['invalida'])
+
+        mensagem, status = MENSAGENS_ESCRITA[operacao]
+        return responder(({'message': mensagem}, status), request)
+
+    return escrita
+
+
+def rota_lote(tabela):
+    async def lote(request):
+        operacao = METODOS_ESCRITA[request.method]
+
+        try:
+            batch_size = ler_batch_size(parametros(request))
+        except ValueError as e:
+            return erro(400, str(e))
+        registros, recusa = await ler_payload(request)
+        if recusa is not None:
+            return recusa
+        try:
+            sql, linhas = montar_linhas(tabela, operacao, registros)
+        except ValueError as e:
+            return erro(400, str(e))
+
+        afetadas, erros = await executar_em_lote_async(sql, linhas, batch_size)
+        invalidate(*ESCRITAS[tabela]['invalida'])
+
+        status_sucesso = 201 if operacao == 'insert' else 200
+        return responder(resultado_lote(len(linhas), afetadas, erros, status_sucesso), request)
+
+    return lote
+
+
+# Exportação
+async def exportar(request):
+    tabela = request.path_params['tabela']
+    if not exportavel(tabela):
+        return erro(404, f'Tabela {tabela} não disponível para exportação.')
+
+    return StreamingResponse(gerar_ndjson_async(tabela, parametros(request)), media_type='application/x-ndjson')
+
+
+# Dashboard
+async def dashboard(request):
+    return responder(await montar_dashboard_async(parametros(request)), request)
+
+
+# Saldo de estoque
+def iniciar_saldos():
+    # Uma única tarefa, criada no primeiro uso, mantém os saldos usados pelo chatbot e por /api/estoque/saldo
+    if 'saldos' not in _tarefas:
+        _tarefas['saldos'] = asyncio.create_task(
+            _saldos_estoque.manter_atualizado_async(ler_estoque_async, ler_movimentos_novos_async))
+
+
+async def aguardar_saldos():
+    """True quando a primeira carga dos saldos terminou (espera até ESPERA_CARGA segundos)."""
+    iniciar_saldos()
+    return _saldos_estoque.carregado.is_set() or await run_in_threadpool(_saldos_estoque.carregado.wait, ESPERA_CARGA)
+
+
+async def saldo_estoque(request):
+    if not await aguardar_saldos():
+        return erro(503, 'Os saldos de estoque ainda estão sendo carregados.')
+    return responder(_saldos_estoque.listar(), request)
+
+
+async def alertas_estoque_baixo(request):
+    if not await aguardar_saldos():
+        return erro(503, 'Os saldos de estoque ainda estão sendo carregados.')
+    return responder(_alertas_estoque.alertas, request)
+
+
+# ChatBot
+async def ler_catalogo():
+    return await listar_async('medicamentos', {}, medicamento_model)
+
+
+async def obter_catalogo():
+    global _catalogo
+    if _catalogo is None:
+        async with _bot_lock:
+            if _catalogo is None:
+                novo = await run_in_threadpool(criar_catalogo, _saldos_estoque, await ler_catalogo())
+                if INTERVALO_CATALOGO:
+                    _tarefas['catalogo'] = asyncio.create_task(
+                        novo.manter_atualizado_async(ler_catalogo, INTERVALO_CATALOGO))
+                _catalogo = novo
+    return _catalogo
+
+
+async def obter_bot():
+    # Mesma criação do modo Flask (fabrica_chatbot.py): o modelo é carregado na primeira
+    # mensagem e a classificação roda fora do event loop
+    global _bot
+    if INTERVALO_CATALOGO is not None:
+        # O catálogo troca o `bot` a cada sincronização com mudanças
+        return (await obter_catalogo()).bot
+    if _bot is None:
+        async with _bot_lock:
+            if _bot is None:
+                _bot = await run_in_threadpool(criar_bot, _saldos_estoque)
+    return _bot
+
+
+async def chatbot(request):
+    data = await ler_corpo(request) or {}
+    user_message = data.get("message") if isinstance(data, dict) else None
+    if not isinstance(user_message, str):
+        return erro(400, 'Informe a mensagem em "message".')
+
+    iniciar_saldos()  # As respostas sobre estoque usam os saldos em memória
+    bot = await obter_bot()
+    bot_response = await run_in_threadpool(bot.obter_resposta, user_message)
+    return responder({"response": bot_response}, request)
+
+
+async def chatbot_lote(request):
+    try:
+        mensagens = ler_mensagens_lote(await ler_corpo(request) or {})
+    except ValueError as e:
+        return erro(400, str(e))
+
+    iniciar_saldos()
+    bot = await obter_bot()
+    inicio = time.perf_counter()
+    respostas = await run_in_threadpool(bot.obter_respostas, mensagens)
+    return responder(resposta_lote_chatbot(respostas, time.perf_counter() - inicio), request)
+
+
+# Administração
+async def admin_pool(request):
+    return responder(pool_stats(), request)
+
+
+async def admin_cache(request):
+    if request.method == 'DELETE':
+        lookup_cache.clear()
+        return responder({'message': 'Cache limpo com sucesso!'}, request)
+    return responder(lookup_cache.stats(), request)
+
+
+async def admin_chatbot_catalogo(request):
+    # Sincroniza agora as intents do chatbot com a tabela de medicamentos
+    if INTERVALO_CATALOGO is None:
+        return erro(404, MENSAGEM_CATALOGO_DESLIGADO)
+    catalogo = await obter_catalogo()
+    return responder(await run_in_threadpool(catalogo.sincronizar, await ler_catalogo()), request)
+
+
+async def admin_chatbot_rastreio(request):
+    # Amostragem atual, eventos na fila e descartados (fila cheia)
+    import rastreio_chatbot
+    return responder(rastreio_chatbot.estatisticas(), request)
+
+
+async def admin_metrics(request):
+    # Histogramas no formato texto do Prometheus
+    return Response(metricas.exportar(), headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+
+def _json_ou_none(corpo):
+    try:
+        return json.loads(corpo)
+    except ValueError:
+        return None
+
+
+class MedicaoMiddleware:
+    """Instrumentação por rota (metricas.py), como os hooks before/after_request do modo Flask.
+
+    As consultas feitas durante a requisição, inclusive nas threads do threadpool, somam na
+    medição do contexto atual. O corpo é guardado como chegou e só é interpretado se a
+    requisição for lenta e entrar no log.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        metricas.iniciar('nao_encontrada', scope['method'])
+        partes = []
+        status = 500  # Sem resposta enviada, a exceção vira 500 no ServerErrorMiddleware
+
+        async def receber():
+            mensagem = await receive()
+            if mensagem['type'] == 'http.request':
+                partes.append(mensagem.get('body', b''))
+            return mensagem
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem['type'] == 'http.response.start':
+                status = mensagem['status']
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receber, enviar)
+        finally:
+            # O roteador deixa a rota encontrada no scope
+            if scope.get('route') is not None:
+                metricas.definir_rota(scope['route'].path)
+            args = dict(QueryParams(scope.get('query_string', b'')))
+            metricas.finalizar(status, args, lambda: _json_ou_none(b''.join(partes)))
+
+
+@asynccontextmanager
+async def lifespan(app):
+    init_pool_async()  # Carrega as credenciais e abre o pool uma única vez; os saldos, no primeiro uso
+    try:
+        yield
+    finally:
+        for tarefa in _tarefas.values():
+            tarefa.cancel()
+        _tarefas.clear()
+        await close_pool_async()
+
+
+routes = [Route(f'/api/{tabela}', rota_listagem(tabela), methods=['GET']) for tabela in MODELOS_LISTAGEM]
+routes += [
+    Route('/api/medicamentos/id', medicamento_id, methods=['GET']),
+    Route('/api/estoque/saldo', saldo_estoque, methods=['GET']),
+    Route('/api/alertas/estoque_baixo', alertas_estoque_baixo, methods=['GET']),
+    Route('/api/dashboard', dashboard, methods=['GET']),
+    Route('/api/export/{tabela:str}', exportar, methods=['GET']),
+    Route('/api/chatbot', chatbot, methods=['POST']),
+    Route('/api/chatbot/bulk', chatbot_lote, methods=['POST']),
+    Route('/admin/pool', admin_pool, methods=['GET']),
+    Route('/admin/cache', admin_cache, methods=['GET', 'DELETE']),
+    Route('/admin/metrics', admin_metrics, methods=['GET']),
+    Route('/admin/chatbot/catalogo', admin_chatbot_catalogo, methods=['POST']),
+    Route('/admin/chatbot/rastreio', admin_chatbot_rastreio, methods=['GET']),
+]
+for tabela in ESCRITAS:
+    routes.append(Route(f'/api/{tabela}', rota_escrita(tabela), methods=['POST', 'PUT', 'DELETE']))
+    routes.append(Route(f'/api/{tabela}/bulk', rota_lote(tabela), methods=['POST', 'PUT', 'DELETE']))
+
+app = Starlette(
+    routes=routes,
+    middleware=[
+        Middleware(MedicaoMiddleware),
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'],
+                   expose_headers=['X-Next-Cursor', 'ETag']),
+    ],
+    exception_handlers={Exception: excecao_nao_tratada},
+    lifespan=lifespan,
+)
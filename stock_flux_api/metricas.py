@@ -0,0 +1,215 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+# Limites dos buckets dos histogramas (segundos e número de linhas)
+BUCKETS_TEMPO = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_LINHAS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+# Log de requisições lentas: desligado, a menos que STOCKFLUX_SLOW_REQUEST_MS tenha o limite em ms
+LIMITE_LENTO_MS = float(os.environ['STOCKFLUX_SLOW_REQUEST_MS']) if os.environ.get('STOCKFLUX_SLOW_REQUEST_MS') else None
+
+# Campos cujo valor não vai para o log (comparação por trecho do nome, sem diferenciar maiúsculas)
+CAMPOS_SENSIVEIS = ('senha', 'password', 'token', 'email', 'telefone', 'cpf')
+
+logger = logging.getLogger('stock_flux_api.lento')
+
+
+class Histograma:
+    """Histograma cumulativo no formato de exposição do Prometheus, por combinação de rótulos."""
+
+    def __init__(self, nome, descricao, limites):
+        self.nome = nome
+        self.descricao = descricao
+        self.limites = limites
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, rotulos, valor):
+        chave = tuple(rotulos.items())
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = {'buckets': [0] * len(self.limites), 'soma': 0.0, 'total': 0}
+            for i, limite in enumerate(self.limites):
+                if valor <= limite:
+                    serie['buckets'][i] += 1
+            serie['soma'] += valor
+            serie['total'] += 1
+
+    def exportar(self):
+        linhas = [f'# HELP {self.nome} {self.descricao}', f'# TYPE {self.nome} histogram']
+        with self._lock:
+            for chave, serie in sorted(self._series.items()):
+                rotulos = ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in chave)
+                prefixo = rotulos + ',' if rotulos else ''
+                for limite, contagem in zip(self.limites, serie['buckets']):
+                    linhas.append(f'{self.nome}_bucket{{{prefixo}le="{limite}"}} {contagem}')
+                linhas.append(f'{self.nome}_bucket{{{prefixo}le="+Inf"}} {serie["total"]}')
+                linhas.append(f'{self.nome}_sum{{{rotulos}}} {serie["soma"]}')
+                linhas.append(f'{self.nome}_count{{{rotulos}}} {serie["total"]}')
+        return linhas
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Por rota (rótulos route e method)
+requisicao = Histograma('stockflux_request_seconds', 'Tempo total da requisição.', BUCKETS_TEMPO)
+requisicao_execute = Histograma('stockflux_request_db_execute_seconds', 'Tempo em cursor.execute por requisição.', BUCKETS_TEMPO)
+requisicao_fetch = Histograma('stockflux_request_db_fetch_seconds', 'Tempo de fetch das linhas por requisição.', BUCKETS_TEMPO)
+requisicao_linhas = Histograma('stockflux_request_rows', 'Linhas lidas do banco por requisição.', BUCKETS_LINHAS)
+requisicao_serializacao = Histograma('stockflux_request_serialization_seconds', 'Tempo de serialização da resposta.', BUCKETS_TEMPO)
+requisicao_espera = Histograma('stockflux_request_pool_wait_seconds', 'Espera por conexões do pool por requisição.', BUCKETS_TEMPO)
+
+# Por função PL/SQL ou comando (rótulo funcao)
+consulta_execute = Histograma('stockflux_db_execute_seconds', 'Tempo de cada cursor.execute.', BUCKETS_TEMPO)
+consulta_fetch = Histograma('stockflux_db_fetch_seconds', 'Tempo de fetch de cada consulta.', BUCKETS_TEMPO)
+consulta_linhas = Histograma('stockflux_db_rows', 'Linhas retornadas por consulta.', BUCKETS_LINHAS)
+
+HISTOGRAMAS = [
+    requisicao, requisicao_execute, requisicao_fetch, requisicao_linhas, requisicao_serializacao, requisicao_espera,
+    consulta_execute, consulta_fetch, consulta_linhas,
+]
+
+
+class Medicao:
+    """Tempos acumulados de uma requisição. Pode receber registros de várias threads (dashboard)."""
+
+    def __init__(self, rota, metodo):
+        self.rota = rota
+        self.metodo = metodo
+        self.inicio = time.perf_counter()
+        self.execute = 0.0
+        self.fetch = 0.0
+        self.espera = 0.0
+        self.serializacao = 0.0
+        self.linhas = 0
+        self.consultas = []
+        self._lock = threading.Lock()
+
+    def somar(self, campo, valor):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + valor)
+
+
+_medicao_atual = ContextVar('medicao_atual', default=None)
+
+
+def iniciar(rota, metodo):
+    _medicao_atual.set(Medicao(rota, metodo))
+
+
+def definir_rota(rota):
+    """Troca a rota da medição atual, quando ela só é conhecida depois do roteamento (modo ASGI)."""
+    medicao = _medicao_atual.get()
+    if medicao is not None:
+        medicao.rota = rota
+
+
+def registrar_execute(funcao, segundos, binds=None):
+    consulta_execute.observar({'funcao': funcao}, segundos)
+    medicao = _medicao_atual.get()
+    if medicao is not None:
+        medicao.somar('execute', segundos)
+        with medicao._lock:
+            medicao.consultas.append({'funcao': funcao, 'ms': round(segundos * 1000, 3), 'binds': binds})
+
+
+def registrar_fetch(funcao, segundos, linhas):
+    consulta_fetch.observar({'funcao': funcao}, segundos)
+    consulta_linhas.observar({'funcao': funcao}, linhas)
+    medicao = _medicao_atual.get()
+    if medicao is not None:
+        medicao.somar('fetch', segundos)
+        medicao.somar('linhas', linhas)
+
+
+def registrar_espera(segundos):
+    medicao = _medicao_atual.get()
+    if medicao is not None:
+        medicao.somar('espera', segundos)
+
+
+def registrar_serializacao(segundos):
+    medicao = _medicao_atual.get()
+    if medicao is not None:
+        medicao.somar('serializacao', segundos)
+
+
+def finalizar(status, args=None, ler_corpo=None):
+    """Fecha a medição da requisição atual, alimenta os histogramas e, se lenta, grava o log.
+
+    `ler_corpo` devolve o corpo JSON da requisição; só é chamado quando o log é gravado.
+    """
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        return
+    _medicao_atual.set(None)
+
+    total = time.perf_counter() - medicao.inicio
+    rotulos = {'route': medicao.rota, 'method': medicao.metodo}
+    requisicao.observar(rotulos, total)
+    requisicao_execute.observar(rotulos, medicao.execute)
+    requisicao_fetch.observar(rotulos, medicao.fetch)
+    requisicao_linhas.observar(rotulos, medicao.linhas)
+    requisicao_serializacao.observar(rotulos, medicao.serializacao)
+    requisicao_espera.observar(rotulos, medicao.espera)
+
+    if LIMITE_LENTO_MS is not None and total * 1000 >= LIMITE_LENTO_MS:
+        corpo = ler_corpo() if ler_corpo is not None else None
+        logger.warning('Requisição lenta: %s', json.dumps({
+            'rota': medicao.rota,
+            'metodo': medicao.metodo,
+            'status': status,
+            'total_ms': round(total * 1000, 3),
+            'execute_ms': round(medicao.execute * 1000, 3),
+            'fetch_ms': round(medicao.fetch * 1000, 3),
+            'serializacao_ms': round(medicao.serializacao * 1000, 3),
+            'espera_pool_ms': round(medicao.espera * 1000, 3),
+            'linhas': medicao.linhas,
+            'args': redigir(dict(args or {})),
+            'corpo': redigir(corpo) if isinstance(corpo, dict) else _resumo_corpo(corpo),
+            'consultas': [dict(c, binds=redigir(c['binds'])) for c in medicao.consultas],
+        }, default=str, ensure_ascii=False))
+
+
+def _resumo_corpo(corpo):
+    # Corpos em lote não vão para o log, só a quantidade de registros
+    if isinstance(corpo, list):
+        return {'registros': len(corpo)}
+    return None
+
+
+def redigir(valores):
+    """Copia o valor para o log trocando o dos campos sensíveis por '***', também nos dicionários aninhados.
+
+    Listas e tuplas (binds posicionais de DML, listas no corpo) não têm nome de campo para
+    comparar, então só a quantidade de itens vai para o log.
+    """
+    if isinstance(valores, dict):
+        return {
+            chave: '***' if any(campo in str(chave).lower() for campo in CAMPOS_SENSIVEIS) else redigir(valor)
+            for chave, valor in valores.items()
+        }
+    if isinstance(valores, (list, tuple)):
+        return {'itens': len(valores)}
+    return valores
+
+
+def rotulo_sql(sql):
+    """Rótulo curto de um comando DML, por exemplo 'INSERT INTO rm93069.status'."""
+    palavras = sql.split()
+    return ' '.join(palavras[:3] if palavras[0].upper() in ('INSERT', 'DELETE') else palavras[:2])
+
+
+def exportar():
+    """Todos os histogramas no formato texto do Prometheus."""
+    linhas = []
+    for histograma in HISTOGRAMAS:
+        linhas.extend(histograma.exportar())
+    return '\n'.join(linhas) + '\n'
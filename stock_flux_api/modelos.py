@@ -0,0 +1,125 @@
+from flask_restx import Model, fields
+
+# Modelos de resposta compartilhados pela API Flask e pelo modo assíncrono
+medicamento_model = Model('Medicamento', {
+    'Categoria': fields.String(required=True, description='Categoria do medicamento'),
+    'Motivo': fields.String(required=False, description='Motivo do medicamento'),
+    'Nome': fields.String(required=True, description='Nome do medicamento'),
+    'Código': fields.String(required=True, description='Código do medicamento'),
+    'Quantidade Minima': fields.Integer(required=True, description='Quantidade mínima do medicamento'),
+    'Localização': fields.String(required=True, description='Localização do medicamento'),
+    'Status': fields.String(required=True, description='Status do medicamento')
+})
+
+status_model = Model('Status',{
+    'Id': fields.Integer(required=True, description='Id do status'),
+    'Descrição': fields.String(required=True, description='Descrição do status'),
+    'Motivo': fields.String(required=True, description='Motivo do status'),
+})
+
+fornecedores_model = Model('Fornecedores',{
+    "Id": fields.Integer(required=True, description='Id do fornecedor'),
+    "Nome": fields.String(required=True, description='Nome do fornecedor'),
+    "Telefone": fields.String(required=True, description='Telefone do fornecedor'),
+    "Email": fields.String(required=True, description='Email do fornecedor'),
+})
+
+materiais_model = Model('Materiais',{
+    "Id": fields.Integer(required=True, description='Id do material'),
+    "Fornecedor": fields.String(required=True, description='fornecedor do material'),
+    "Descrição": fields.String(required=True, description='Descrição do material'),
+})
+
+categorias_model = Model('Categorias',{
+    "Id": fields.Integer(required=True, description='Id da categoria'),
+    "Descrição": fields.String(required=True, description='Descrição da categoria'),
+})
+
+motivos_model = Model('Motivos',{
+    "Id": fields.Integer(required=True, description='Id do motivo'),
+    "Descrição": fields.String(required=True, description='Descrição do motivo'),
+})
+
+cargos_model = Model('Cargos',{
+    "Id": fields.Integer(required=True, description='Id do cargo'),
+    "Descrição": fields.String(required=True, description='Descrição do cargo'),
+})
+
+departamentos_model = Model('Departamentos',{
+    "Id": fields.Integer(required=True, description='Id do departamento'),
+    "Descrição": fields.String(required=True, description='Descrição do departamento'),
+})
+
+estoque_model = Model('Estoque',{
+    "Id": fields.Integer(required=True, description='Id do estoque'),
+    "Medicamento": fields.String(required=True, description='Medicamento do estoque'),
+    "Responsável": fields.String(required=True, description='Responsável do estoque'),
+    "Tipo Movimentação": fields.String(required=True, description='Tipo de Movimentação do estoque'),
+    "Quantidade": fields.Integer(required=True, description='Quantidade do estoque'),
+    "Data": fields.DateTime(required=True, description='Data do estoque'),
+    "Motivo": fields.String(required=True, description='Motivo do estoque'),
+})
+
+etapas_producao_model = Model('Etapas_Producao',{
+    "Id": fields.Integer(required=True, description='Id da etapa da produção'),
+    "Descrição": fields.String(required=True, description='Descrição da etapa da produção'),
+    "Prazo Estimado": fields.Integer(required=True, description='Prazo Estimado da etapa da produção'),
+})
+
+producao_model = Model('Producao',{
+    "Id": fields.Integer(required=True, description='Id da produção'),
+    "Medicamento": fields.String(required=True, description='Medicamento da produção'),
+    "Etapa": fields.String(required=True, description='Etapa da produção'),
+    "Data Início": fields.DateTime(required=True, description='Data Início da produção'),
+    "Data Fim Prevista": fields.DateTime(required=True, description='Data Fim Prevista da produção'),
+    "Data Fim Real": fields.DateTime(required=True, description='Data Fim Real da produção'),
+})
+
+entradas_previstas_model = Model('EntradasPrevistas',{
+    "Id": fields.Integer(required=True, description='Id da entrada prevista'),
+    "Material": fields.String(required=True, description='Material da entrada prevista'),
+    "Medicamento": fields.String(required=True, description='Descrição da entrada prevista'),
+    "Quantidade": fields.Integer(required=True, description='Quantidade da entrada prevista'),
+    "Data Prevista": fields.DateTime(required=True, description='Data Prevista da entrada prevista'),
+})
+
+atrasos_producao_model = Model('AtrasosProducao',{
+    "Id": fields.Integer(required=True, description='Id do atraso'),
+    "Medicamento": fields.String(required=True, description='Medicamento da produção em atraso'),
+    "Etapa": fields.String(required=True, description='etapa da produção em atraso'),
+    "Dias de Atraso": fields.Integer(required=True, description='Dias de Atraso'),
+    "Motivo": fields.String(required=True, description='Motivo do atraso'),
+})
+
+saldo_estoque_model = Model('SaldoEstoque',{
+    "Medicamento": fields.String(required=True, description='Nome do medicamento'),
+    "Saldo": fields.Integer(required=True, description='Quantidade em estoque (soma dos movimentos)'),
+    "Quantidade Minima": fields.Integer(required=True, description='Quantidade mínima do medicamento'),
+    "Status": fields.List(fields.String, required=True, description='Status do medicamento'),
+})
+
+alerta_estoque_model = Model('AlertaEstoque',{
+    "Medicamento": fields.String(required=True, description='Nome do medicamento'),
+    "Saldo": fields.Integer(required=True, description='Quantidade em estoque'),
+    "Quantidade Minima": fields.Integer(required=True, description='Quantidade mínima do medicamento'),
+    "Falta": fields.Integer(required=True, description='Unidades que faltam para o mínimo'),
+    "Desde": fields.DateTime(required=True, description='Quando o saldo ficou abaixo do mínimo'),
+})
+
+MODELOS = [
+    medicamento_model,
+    status_model,
+    fornecedores_model,
+    materiais_model,
+    categorias_model,
+    motivos_model,
+    cargos_model,
+    departamentos_model,
+    estoque_model,
+    etapas_producao_model,
+    producao_model,
+    entradas_previstas_model,
+    atrasos_producao_model,
+    saldo_estoque_model,
+    alerta_estoque_model,
+]
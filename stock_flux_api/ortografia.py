@@ -0,0 +1,97 @@
+from collections import Counter
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+import numpy as np
+
+
+class CorretorOrtografico:
+    """Correção ortográfica equivalente a `difflib.get_close_matches(palavra, vocabulario, n=1, cutoff)`.
+
+    O vocabulário é indexado uma única vez como uma matriz (palavra x letra) de contagens.
+    Para cada palavra, os limites do difflib (tamanho e letras em comum) são calculados de
+    uma vez para todo o vocabulário e só os candidatos que ainda podem atingir o corte
+    passam pelo SequenceMatcher. As palavras já corrigidas ficam em um cache LRU.
+    """
+
+    def __init__(self, vocabulario, cutoff=0.8, tamanho_cache=4096):
+        self.cutoff = cutoff
+        self.palavras = sorted(set(vocabulario))
+        self.vocabulario = frozenset(self.palavras)
+
+        # Contagens calculadas de uma vez sobre os códigos de todas as letras do vocabulário
+        codigos = np.frombuffer(''.join(self.palavras).encode('utf-32-le'), dtype=np.uint32)
+        codigos_letras, colunas = np.unique(codigos, return_inverse=True)
+        letras = [chr(codigo) for codigo in codigos_letras.tolist()]
+        self.indice_letras = {letra: i for i, letra in enumerate(letras)}
+
+        tamanhos = np.array([len(palavra) for palavra in self.palavras], dtype=np.int64)
+        linhas = np.repeat(np.arange(len(self.palavras)), tamanhos)
+        self.tamanhos = tamanhos.astype(np.float64)
+        self.contagens = np.bincount(linhas * len(letras) + colunas, minlength=len(self.palavras) * len(letras)) \
+            .reshape(len(self.palavras), len(letras)).astype(np.int32)
+
+        self.corrigir_palavra = lru_cache(maxsize=tamanho_cache)(self._corrigir_palavra)
+
+    @classmethod
+    def a_partir_do_indice(cls, palavras, letras, tamanhos, contagens, cutoff=0.8, tamanho_cache=4096):
+        """Recria o corretor a partir de um índice já calculado (ver `indice`), sem reprocessar o vocabulário."""
+        corretor = cls.__new__(cls)
+        corretor.cutoff = cutoff
+        corretor.palavras = palavras
+        corretor.vocabulario = frozenset(palavras)
+        corretor.indice_letras = {letra: i for i, letra in enumerate(letras)}
+        corretor.tamanhos = tamanhos
+        corretor.contagens = contagens
+        corretor.corrigir_palavra = lru_cache(maxsize=tamanho_cache)(corretor._corrigir_palavra)
+        return corretor
+
+    def indice(self):
+        """Retorna (palavras, letras, tamanhos, contagens), o suficiente para `a_partir_do_indice`."""
+        letras = sorted(self.indice_letras, key=self.indice_letras.get)
+        return self.palavras, letras, self.tamanhos, self.contagens
+
+    def _limites(self, palavra):
+        """Limites superiores da razão do difflib para cada palavra do vocabulário."""
+        total = self.tamanhos + len(palavra)
+
+        # real_quick_ratio: 2 * min(la, lb) / (la + lb)
+        limite_tamanho = 2.0 * np.minimum(self.tamanhos, len(palavra)) / total
+
+        # quick_ratio: 2 * letras em comum (sem ordem) / (la + lb)
+        colunas, quantidades = [], []
+        for letra, quantidade in Counter(palavra).items():
+            if letra in self.indice_letras:
+                colunas.append(self.indice_letras[letra])
+                quantidades.append(quantidade)
+        comuns = np.minimum(self.contagens[:, colunas], quantidades).sum(axis=1)
+        limite_letras = 2.0 * comuns / total
+
+        return np.where(limite_tamanho >= self.cutoff, limite_letras, 0.0)
+
+    def _corrigir_palavra(self, palavra):
+        # Uma palavra do vocabulário tem razão 1.0 com ela mesma e nenhuma outra pode empatar
+        if palavra in self.vocabulario or not self.palavras:
+            return palavra
+
+        limites = self._limites(palavra)
+        indices = np.flatnonzero(limites >= self.cutoff)
+
+        # Avalia os candidatos do maior limite para o menor e para quando nenhum
+        # dos restantes puder superar a melhor razão encontrada
+        candidatos = sorted(((limites[i], self.palavras[i]) for i in indices), reverse=True)
+        matcher = SequenceMatcher()
+        matcher.set_seq2(palavra)
+        melhor = None
+        for limite, candidato in candidatos:
+            if melhor is not None and limite < melhor[0]:
+                break
+            matcher.set_seq1(candidato)
+            razao = matcher.ratio()
+            if razao >= self.cutoff and (melhor is None or (razao, candidato) > melhor):
+                melhor = (razao, candidato)
+
+        return melhor[1] if melhor else palavra
+
+    def corrigir(self, mensagem):
+        return " ".join(self.corrigir_palavra(palavra) for palavra in mensagem.lower().split())
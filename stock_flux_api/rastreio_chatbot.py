@@ -0,0 +1,107 @@
+"""Rastreio amostrado do chatbot, para analisar classificações erradas.
+
+Cada evento traz a mensagem original e a corrigida, a tag escolhida, as k melhores
+pontuações e os tempos de correção e de pontuação. Na requisição só se decide se a
+mensagem entra na amostra e o evento vai para uma fila; uma thread em segundo plano
+calcula as k melhores pontuações e grava o evento como JSON no logger
+'stock_flux_api.chatbot.rastreio'. Com a fila cheia o evento é descartado (e contado),
+então o rastreio nunca segura uma resposta.
+"""
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+
+# Fração das mensagens rastreadas (ex.: 0.01); desligado, a menos que STOCKFLUX_CHATBOT_TRACE tenha o valor
+AMOSTRA = float(os.environ['STOCKFLUX_CHATBOT_TRACE']) if os.environ.get('STOCKFLUX_CHATBOT_TRACE') else 0.0
+
+# Máximo de eventos por segundo (STOCKFLUX_CHATBOT_TRACE_MAX_S); sem limite se não definido
+MAXIMO_POR_SEGUNDO = int(os.environ['STOCKFLUX_CHATBOT_TRACE_MAX_S']) if os.environ.get('STOCKFLUX_CHATBOT_TRACE_MAX_S') else None
+
+TOP_K = 5
+TAMANHO_FILA = 10000
+
+logger = logging.getLogger('stock_flux_api.chatbot.rastreio')
+
+_fila = queue.Queue(maxsize=TAMANHO_FILA)
+_lock = threading.Lock()
+_janela = [0, 0]  # Segundo atual e eventos aceitos nele
+_thread = None
+_descartados = 0
+
+
+def configurar(amostra, maximo_por_segundo=None):
+    """Muda a amostragem em execução (0 desliga)."""
+    global AMOSTRA, MAXIMO_POR_SEGUNDO
+    AMOSTRA, MAXIMO_POR_SEGUNDO = amostra, maximo_por_segundo
+
+
+def amostrar():
+    """Decide se a mensagem atual será rastreada (amostra e limite por segundo)."""
+    if AMOSTRA <= 0 or (AMOSTRA < 1 and random.random() >= AMOSTRA):
+        return False
+    if MAXIMO_POR_SEGUNDO is None:
+        return True
+    segundo = int(time.monotonic())
+    with _lock:
+        if _janela[0] != segundo:
+            _janela[:] = [segundo, 0]
+        if _janela[1] >= MAXIMO_POR_SEGUNDO:
+            return False
+        _janela[1] += 1
+    return True
+
+
+def registrar(bot, mensagem, mensagem_corrigida, tag, segundos_correcao, segundos_pontuacao):
+    """Coloca o evento na fila; as k melhores pontuações são calculadas na thread de gravação."""
+    global _descartados
+    _iniciar()
+    evento = {
+        'momento': datetime.now().isoformat(timespec='milliseconds'),
+        'mensagem': mensagem,
+        'corrigida': mensagem_corrigida,
+        'tag': tag,
+        'correcao_ms': round(segundos_correcao * 1000, 3),
+        'pontuacao_ms': round(segundos_pontuacao * 1000, 3),
+    }
+    try:
+        _fila.put_nowait((bot, evento))
+    except queue.Full:
+        with _lock:
+            _descartados += 1
+
+
+def estatisticas():
+    """Configuração atual, eventos aguardando gravação e eventos descartados."""
+    return {'amostra': AMOSTRA, 'maximo_por_segundo': MAXIMO_POR_SEGUNDO, 'na_fila': _fila.qsize(),
+            'descartados': _descartados}
+
+
+def _iniciar():
+    global _thread
+    if _thread is not None:
+        return
+    with _lock:
+        if _thread is None:
+            # Sem configuração de logging na aplicação, os eventos vão para o stderr
+            if logger.level == logging.NOTSET:
+                logger.setLevel(logging.INFO)
+            if not logger.hasHandlers():
+                logger.addHandler(logging.StreamHandler())
+            _thread = threading.Thread(target=_gravar, name='rastreio-chatbot', daemon=True)
+            _thread.start()
+
+
+def _gravar():
+    while True:
+        bot, evento = _fila.get()
+        try:
+            evento['top_k'] = [{'tag': tag, 'pontuacao': round(pontuacao, 6)}
+                               for tag, pontuacao in bot.buscar(evento['corrigida'], TOP_K)]
+            logger.info(json.dumps(evento, ensure_ascii=False))
+        except Exception:
+            logger.exception('Falha ao gravar o rastreio do chatbot')
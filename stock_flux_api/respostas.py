@@ -0,0 +1,184 @@
+"""Corpo JSON das respostas, ETag forte, GET condicional e compressão, comuns às APIs Flask e ASGI.
+
+O corpo é gerado pelo orjson quando o pacote está instalado (ou pelo json da biblioteca
+padrão, com STOCKFLUX_JSON=json). O orjson escreve direto em bytes e converte os
+datetime para ISO 8601 sozinho, no mesmo formato de `datetime.isoformat`, então as
+listagens deixam as datas como vieram do Oracle (ver `consultas._conversor`).
+
+A ETag é o hash (BLAKE2b) do corpo exato da resposta, então muda sempre que o conteúdo
+muda, qualquer que seja a origem da mudança. O cliente que já tem o corpo envia a ETag em
+If-None-Match e recebe 304, sem corpo.
+
+Corpos a partir de `COMPRESSAO_MIN_BYTES` são comprimidos com brotli (se o pacote estiver
+instalado) ou gzip, conforme o Accept-Encoding. A versão comprimida tem ETag própria
+(sufixo `-br`/`-gzip`), já que os bytes enviados são outros.
+
+As listagens em cache (cache.py) guardam a resposta já serializada, com a ETag e as
+versões comprimidas (`RespostaPronta`): nelas o 304, e também o 200, sai sem consultar o
+Oracle, sem serializar e sem comprimir de novo.
+"""
+import gzip
+import hashlib
+import json
+import os
+from datetime import date, datetime
+
+from flask import current_app
+
+try:
+    import brotli
+except ImportError:  # Opcional: sem o pacote, só gzip
+    brotli = None
+
+try:
+    import orjson
+except ImportError:  # Opcional: sem o pacote, json da biblioteca padrão
+    orjson = None
+
+# Serializador dos corpos JSON: 'orjson' (padrão, se instalado) ou 'json'
+SERIALIZADOR = os.environ.get('STOCKFLUX_JSON') or ('orjson' if orjson is not None else 'json')
+if SERIALIZADOR not in ('orjson', 'json') or (SERIALIZADOR == 'orjson' and orjson is None):
+    raise ValueError(f'STOCKFLUX_JSON inválido ou indisponível: {SERIALIZADOR}')
+
+# Tamanho mínimo (bytes) do corpo para comprimir; 0 desliga a compressão
+COMPRESSAO_MIN_BYTES = int(os.environ.get('STOCKFLUX_COMPRESSAO_MIN_BYTES') or 1024)
+
+# Níveis para respostas geradas a cada requisição: bem mais rápidos que o máximo e com
+# quase a mesma taxa (o JSON repete as chaves em toda linha)
+NIVEL_GZIP = 3
+QUALIDADE_BROTLI = 4
+
+# Codificações suportadas, na ordem de preferência do servidor
+CODIFICACOES = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def _comprimir(corpo, codificacao):
+    if codificacao == 'br':
+        return brotli.compress(corpo, quality=QUALIDADE_BROTLI)
+    return gzip.compress(corpo, compresslevel=NIVEL_GZIP, mtime=0)
+
+
+class RespostaPronta:
+    """Corpo JSON já serializado de uma resposta; ETag e versões comprimidas são calculadas uma única vez."""
+
+    __slots__ = ('corpo', '_etag', '_comprimidos')
+
+    def __init__(self, corpo):
+        self.corpo = corpo
+        self._etag = None
+        self._comprimidos = {}
+
+    @property
+    def etag(self):
+        if self._etag is None:
+            self._etag = calcular_etag(self.corpo)
+        return self._etag
+
+    def comprimido(self, codificacao):
+        corpo = self._comprimidos.get(codificacao)
+        if corpo is None:
+            corpo = self._comprimidos[codificacao] = _comprimir(self.corpo, codificacao)
+        return corpo
+
+
+def datas_nativas():
+    """True se o serializador escreve os datetime em ISO 8601 sem conversão prévia (orjson)."""
+    return SERIALIZADOR == 'orjson'
+
+
+def serializar(dados, **opcoes):
+    """Corpo JSON como o flask-restx gera (JSON + quebra de linha), em bytes.
+
+    Com o orjson, das opções do json.dumps valem `indent` (sempre 2 espaços) e `sort_keys`.
+    """
+    if SERIALIZADOR == 'orjson':
+        opcao = orjson.OPT_APPEND_NEWLINE
+        if opcoes.get('indent'):
+            opcao |= orjson.OPT_INDENT_2
+        if opcoes.get('sort_keys'):
+            opcao |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(dados, option=opcao)
+    return (json.dumps(dados, **opcoes) + "\n").encode('utf-8')
+
+
+def _iso(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    raise TypeError(f'Tipo não serializável: {type(valor).__name__}')
+
+
+def serializar_linhas(linhas):
+    """NDJSON (um objeto por linha) das linhas cruas, com as datas em ISO 8601."""
+    if SERIALIZADOR == 'orjson':
+        return b''.join(orjson.dumps(linha, option=orjson.OPT_APPEND_NEWLINE) for linha in linhas)
+    return ''.join(json.dumps(linha, default=_iso) + '\n' for linha in linhas).encode('utf-8')
+
+
+def serializar_flask(dados):
+    """Mesmo corpo do `output_json` do flask-restx: opções de RESTX_JSON e indentação no modo debug."""
+    opcoes = dict(current_app.config.get('RESTX_JSON', {}))
+    if current_app.debug:
+        opcoes.setdefault('indent', 4)
+    return serializar(dados, **opcoes)
+
+
+def calcular_etag(corpo):
+    return '"' + hashlib.blake2b(corpo, digest_size=16).hexdigest() + '"'
+
+
+def etag_corresponde(if_none_match, etag):
+    """True se o If-None-Match tem a ETag ou é '*' (comparação fraca, como pede o GET condicional)."""
+    if not if_none_match:
+        return False
+    for candidata in if_none_match.split(','):
+        candidata = candidata.strip()
+        if candidata == '*' or candidata.removeprefix('W/') == etag:
+            return True
+    return False
+
+
+def escolher_codificacao(accept_encoding):
+    """Codificação suportada de maior q no Accept-Encoding (empate: preferência do servidor), ou None."""
+    pesos = {}
+    for parte in (accept_encoding or '').split(','):
+        nome, _, parametros = parte.partition(';')
+        peso = 1.0
+        parametros = parametros.strip().replace(' ', '')
+        if parametros.startswith('q='):
+            try:
+                peso = float(parametros[2:])
+            except ValueError:
+                peso = 0.0
+        if nome.strip():
+            pesos[nome.strip().lower()] = peso
+
+    escolhida, maior = None, 0.0
+    for codificacao in CODIFICACOES:
+        peso = pesos.get(codificacao, pesos.get('*', 0.0))
+        if peso > maior:
+            escolhida, maior = codificacao, peso
+    return escolhida
+
+
+def preparar_resposta(pronta, metodo, status, cabecalhos, if_none_match, accept_encoding):
+    """Status, corpo e cabeçalhos finais de uma resposta JSON.
+
+    GETs com sucesso levam a ETag e viram 304 se o cliente já tem o corpo; corpos grandes
+    são comprimidos na codificação negociada.
+    """
+    cabecalhos = dict(cabecalhos or {})
+    codificacao = None
+    if COMPRESSAO_MIN_BYTES and len(pronta.corpo) >= COMPRESSAO_MIN_BYTES:
+        cabecalhos['Vary'] = 'Accept-Encoding'
+        codificacao = escolher_codificacao(accept_encoding)
+
+    if metodo == 'GET' and status == 200:
+        etag = pronta.etag if codificacao is None else f'{pronta.etag[:-1]}-{codificacao}"'
+        cabecalhos['ETag'] = etag
+        if etag_corresponde(if_none_match, etag):
+            return 304, b'', cabecalhos
+
+    if codificacao is None:
+        return status, pronta.corpo, cabecalhos
+    cabecalhos['Content-Encoding'] = codificacao
+    return status, pronta.comprimido(codificacao), cabecalhos
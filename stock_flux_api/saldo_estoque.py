@@ -0,0 +1,281 @@
+"""Saldo de estoque por medicamento em memória, mantido de forma incremental.
+
+A carga completa lê o saldo já somado no banco, um registro por medicamento
+(`get_saldo_estoque`, funcoes_get.sql), e junta a quantidade mínima e o status de
+`get_medicamentos`. Depois dela, cada atualização em segundo plano só lê os movimentos de
+Id maior que o último aplicado (`get_movimentos_saldo`) e soma a diferença nos
+medicamentos tocados. De tempos em tempos a carga completa é refeita (reconciliação), o
+que corrige movimentos alterados ou apagados no banco e Ids gravados fora de ordem.
+
+O sinal de cada movimento vem do tipo de movimentação, nas duas funções PL/SQL. Um tipo
+sem sinal definido lá é um erro: a carga ou a atualização falha (e vai para o log) sem
+publicar nada nem avançar o último Id, em vez de deixar o saldo errado.
+
+Consultar um medicamento é uma busca em dicionário e listar todos os saldos custa
+O(medicamentos), sem percorrer os movimentos. Usado pelo chatbot e por /api/estoque/saldo,
+que iniciam a atualização no primeiro uso.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from consultas import abrir_ref_cursor, listar, listar_async, preparar_ref_cursor
+from database import db_connection, db_connection_async
+from modelos import medicamento_model
+
+# Intervalo (segundos) entre as leituras dos movimentos novos; 0 carrega uma única vez
+INTERVALO_ESTOQUE = float(os.environ.get('STOCKFLUX_ESTOQUE_S') or 5)
+
+# Intervalo (segundos) entre as reconciliações com o saldo somado no banco
+INTERVALO_RECONCILIACAO = float(os.environ.get('STOCKFLUX_ESTOQUE_RECONCILIACAO_S') or 600)
+
+# Tempo máximo que /api/estoque/saldo espera pela primeira carga antes de responder 503
+ESPERA_CARGA = 30
+
+# Movimentos novos trazidos por página de get_movimentos_saldo
+ARRAYSIZE_MOVIMENTOS = 5000
+
+logger = logging.getLogger('stock_flux_api.estoque')
+
+
+def chave_tag(nome):
+    """Chave de busca: sem diferenciar maiúsculas e com '_' valendo espaço (tags do medicamento.json)."""
+    return ' '.join(nome.replace('_', ' ').lower().split())
+
+
+def somar_saldos(linhas):
+    """Saldos (nome -> quantidade) e Id do último movimento, das linhas de get_saldo_estoque.
+
+    Falha se algum medicamento tiver movimentos de tipo sem sinal em funcoes_get.sql.
+    """
+    saldos, ultimo_id, sem_sinal = {}, None, {}
+    for medicamento, saldo, id_maximo, quantidade_sem_sinal in linhas:
+        # Medicamentos diferentes com o mesmo nome dividem o saldo, como na busca por nome
+        saldos[medicamento] = saldos.get(medicamento, 0) + (saldo or 0)
+        ultimo_id = _maior(ultimo_id, id_maximo)
+        if quantidade_sem_sinal:
+            sem_sinal[medicamento] = quantidade_sem_sinal
+    if sem_sinal:
+        raise ValueError(f'Movimentos de tipo de movimentação sem sinal em get_saldo_estoque: {sem_sinal}')
+    return saldos, ultimo_id
+
+
+def somar_movimentos(saldos, linhas):
+    """Acumula em `saldos` (nome -> quantidade) as linhas de get_movimentos_saldo.
+
+    Retorna o maior Id entre as linhas, ou None se não houver linhas. Falha, antes de alterar
+    `saldos`, se algum movimento vier sem sinal (quantidade NULL).
+    """
+    sem_sinal = [id_movimento for id_movimento, _, quantidade in linhas if quantidade is None]
+    if sem_sinal:
+        raise ValueError(f'Movimentos de tipo de movimentação sem sinal em get_movimentos_saldo: {sem_sinal[:20]}')
+
+    ultimo_id = None
+    for id_movimento, medicamento, quantidade in linhas:
+        ultimo_id = _maior(ultimo_id, id_movimento)
+        saldos[medicamento] = saldos.get(medicamento, 0) + quantidade
+    return ultimo_id
+
+
+def _maior(a, b):
+    return b if a is None or (b is not None and b > a) else a
+
+
+def ler_estoque():
+    """Carga completa: medicamentos, saldos e Id do último movimento, somados no banco."""
+    medicamentos = listar('medicamentos', {}, medicamento_model)
+    with db_connection() as connection, connection.cursor() as cursor:
+        linhas = abrir_ref_cursor(cursor, 'saldo_estoque', {}).fetchall()
+    return (medicamentos, *somar_saldos(linhas))
+
+
+def ler_movimentos_novos(ultimo_id):
+    """Movimentos de Id maior que `ultimo_id`, em páginas de get_movimentos_saldo."""
+    novas = []
+    with db_connection() as connection, connection.cursor() as cursor:
+        while True:
+            linhas = abrir_ref_cursor(cursor, 'movimentos_saldo', {}, (ultimo_id, ARRAYSIZE_MOVIMENTOS)).fetchall()
+            novas.extend(linhas)
+            if len(linhas) < ARRAYSIZE_MOVIMENTOS:
+                return novas
+            ultimo_id = linhas[-1][0]
+
+
+async def ler_estoque_async():
+    """Versão assíncrona de `ler_estoque`, para o modo ASGI."""
+    medicamentos = await listar_async('medicamentos', {}, medicamento_model)
+    async with db_connection_async() as connection:
+        query, params, resultado = preparar_ref_cursor(connection, 'saldo_estoque', {})
+        await connection.cursor().execute(query, params)
+        linhas = await resultado.fetchall()
+    return (medicamentos, *somar_saldos(linhas))
+
+
+async def ler_movimentos_novos_async(ultimo_id):
+    """Versão assíncrona de `ler_movimentos_novos`."""
+    novas = []
+    async with db_connection_async() as connection:
+        while True:
+            query, params, resultado = preparar_ref_cursor(connection, 'movimentos_saldo', {}, (ultimo_id, ARRAYSIZE_MOVIMENTOS))
+            await connection.cursor().execute(query, params)
+            linhas = await resultado.fetchall()
+            novas.extend(linhas)
+            if len(linhas) < ARRAYSIZE_MOVIMENTOS:
+                return novas
+            ultimo_id = linhas[-1][0]
+
+
+class SaldosEstoque:
+    """Saldo, quantidade mínima e status de cada medicamento, atualizados pelos movimentos novos."""
+
+    def __init__(self):
+        self.itens = {}  # chave_tag(nome) -> registro publicado em /api/estoque/saldo
+        self.saldos = {}  # Nome -> saldo, inclusive de medicamentos que ainda não estão em `itens`
+        self.ultimo_id = None  # Id do último movimento aplicado
+        self.atualizado_em = None
+        self.reconciliado_em = None
+        self.carregado = threading.Event()
+        self.observadores = []  # Chamados com (itens, chaves tocadas ou None na carga completa)
+        self._lock = threading.Lock()
+        self._iniciado = False
+
+    def observar(self, observador):
+        """Registra quem reage às mudanças de saldo (ex.: alertas_estoque.py)."""
+        self.observadores.append(observador)
+
+    def _notificar(self, itens, tocados):
+        for observador in self.observadores:
+            try:
+                observador(itens, tocados)
+            except Exception:
+                logger.exception('Falha ao notificar a mudança dos saldos de estoque')
+
+    def atualizar(self, medicamentos, saldos, ultimo_id=None):
+        """Carga completa: monta os registros de novo e os publica de uma vez (as consultas em andamento usam os anteriores)."""
+        inicio = time.perf_counter()
+        itens = {}
+        for medicamento in medicamentos:
+            # get_medicamentos traz uma linha por status do medicamento
+            item = itens.setdefault(chave_tag(medicamento['Nome']), {
+                'Medicamento': medicamento['Nome'],
+                'Saldo': saldos.get(medicamento['Nome'], 0),
+                'Quantidade Minima': medicamento['Quantidade Minima'] or 0,
+                'Status': [],
+            })
+            if medicamento['Status'] not in item['Status']:
+                item['Status'].append(medicamento['Status'])
+
+        with self._lock:
+            self.itens = itens
+            self.saldos = saldos
+            self.ultimo_id = ultimo_id
+            self.atualizado_em = self.reconciliado_em = datetime.now()
+        self._notificar(itens, None)
+        self.carregado.set()
+        return {'medicamentos': len(itens), 'tempo_ms': round((time.perf_counter() - inicio) * 1000, 3)}
+
+    def aplicar(self, linhas):
+        """Soma os movimentos novos (linhas de get_movimentos_saldo) e retorna as chaves dos medicamentos tocados.
+
+        Movimentos de Id até `ultimo_id` já estão no saldo e são ignorados.
+        """
+        with self._lock:
+            if self.ultimo_id is not None:
+                linhas = [linha for linha in linhas if linha[0] > self.ultimo_id]
+            if not linhas:
+                self.atualizado_em = datetime.now()
+                return set()
+
+            diferencas = {}
+            self.ultimo_id = _maior(self.ultimo_id, somar_movimentos(diferencas, linhas))
+
+            itens, tocados = self.itens, set()
+            for nome, diferenca in diferencas.items():
+                saldo = self.saldos[nome] = self.saldos.get(nome, 0) + diferenca
+                chave = chave_tag(nome)
+                item = itens.get(chave)
+                if item is None:
+                    # Medicamento cadastrado depois da última carga completa: mínimo e status
+                    # chegam na próxima reconciliação. Novas chaves vão para uma cópia do
+                    # dicionário, que pode estar sendo percorrido por uma listagem.
+                    if itens is self.itens:
+                        itens = dict(itens)
+                    item = {'Medicamento': nome, 'Saldo': 0, 'Quantidade Minima': 0, 'Status': []}
+                # O registro é trocado, não alterado: quem já o leu continua com um valor consistente
+                itens[chave] = dict(item, Saldo=saldo)
+                tocados.add(chave)
+
+            self.itens = itens
+            self.atualizado_em = datetime.now()
+        self._notificar(itens, tocados)
+        return tocados
+
+    def consultar(self, tag):
+        return self.itens.get(chave_tag(tag))
+
+    def listar(self):
+        """Registros de todos os medicamentos, em O(medicamentos)."""
+        return list(self.itens.values())
+
+    def descrever(self, tag):
+        """Resposta do chatbot sobre o estoque do medicamento, ou None se ele não estiver carregado."""
+        item = self.consultar(tag)
+        if item is None:
+            return None
+
+        nome, saldo, minimo = item['Medicamento'], item['Saldo'], item['Quantidade Minima']
+        if 'Descontinuado' in item['Status']:
+            return f"{nome} foi descontinuado e não está mais à venda."
+        if saldo <= 0:
+            return f"No momento não há {nome} em estoque."
+        if saldo < minimo:
+            return f"O estoque de {nome} está baixo: {saldo} unidades (mínimo de {minimo})."
+        return f"O estoque de {nome} está disponível: {saldo} unidades."
+
+    def iniciar_atualizacao(self, ler, ler_novos, intervalo=INTERVALO_ESTOQUE, reconciliacao=INTERVALO_RECONCILIACAO):
+        """Carrega os saldos e aplica os movimentos novos a cada `intervalo` segundos em uma thread.
+
+        Pode ser chamado por mais de um usuário dos saldos: só a primeira chamada inicia a thread.
+        """
+        with self._lock:
+            if self._iniciado:
+                return
+            self._iniciado = True
+
+        def atualizar():
+            proxima = 0
+            while True:
+                try:
+                    # Carga completa na primeira vez (ou enquanto ela falhar) e a cada `reconciliacao` segundos
+                    if time.monotonic() >= proxima:
+                        self.atualizar(*ler())
+                        proxima = time.monotonic() + reconciliacao
+                    else:
+                        self.aplicar(ler_novos(self.ultimo_id))
+                except Exception:
+                    logger.exception('Falha ao atualizar os saldos de estoque')
+                if not intervalo:
+                    return
+                time.sleep(intervalo)
+
+        threading.Thread(target=atualizar, name='saldo-estoque', daemon=True).start()
+
+    async def manter_atualizado_async(self, ler_async, ler_novos_async, intervalo=INTERVALO_ESTOQUE,
+                                      reconciliacao=INTERVALO_RECONCILIACAO):
+        """Versão para o event loop de `iniciar_atualizacao` (rodar como tarefa)."""
+        proxima = 0
+        while True:
+            try:
+                if time.monotonic() >= proxima:
+                    self.atualizar(*await ler_async())
+                    proxima = time.monotonic() + reconciliacao
+                else:
+                    self.aplicar(await ler_novos_async(self.ultimo_id))
+            except Exception:
+                logger.exception('Falha ao atualizar os saldos de estoque')
+            if not intervalo:
+                return
+            await asyncio.sleep(intervalo)
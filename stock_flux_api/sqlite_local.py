@@ -0,0 +1,575 @@
+"""Backend SQLite local, com a mesma superfície das funções de funcoes_get.sql.
+
+Serve para rodar a API, os testes de carga e os benchmarks sem um Oracle. O pool e as
+conexões imitam o que o resto da API usa do `oracledb`: a chamada
+`BEGIN :ref_cursor := get_x(:p0, ...); END;` é executada com a consulta SQLite equivalente
+no cursor de resultado, os comandos DML com binds `:1` rodam como estão e o
+`executemany(batcherrors=True)` guarda os erros por linha. O pool assíncrono
+(`criar_pool_async`) tem a interface do pool asyncio do oracledb, para o modo ASGI.
+
+O banco é um arquivo anexado com o nome `rm93069`, então os nomes qualificados das
+consultas (`rm93069.estoque`, ...) valem sem alteração. Para gerar um banco:
+
+    python sqlite_local.py stockflux.db --estoque 1000000
+"""
+import argparse
+import asyncio
+import random
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import oracledb
+
+ESQUEMA = 'rm93069'
+
+TABELAS = """
+CREATE TABLE IF NOT EXISTS rm93069.categorias (id_categoria INTEGER PRIMARY KEY, descricao TEXT);
+CREATE TABLE IF NOT EXISTS rm93069.motivos (id_motivo INTEGER PRIMARY KEY, descricao TEXT);
+CREATE TABLE IF NOT EXISTS rm93069.status (id_status INTEGER PRIMARY KEY, descricao TEXT, motivo TEXT);
+CREATE TABLE IF NOT EXISTS rm93069.cargos (id_cargo INTEGER PRIMARY KEY, descricao TEXT);
+CREATE TABLE IF NOT EXISTS rm93069.departamentos (id_departamento INTEGER PRIMARY KEY, descricao TEXT);
+CREATE TABLE IF NOT EXISTS rm93069.fornecedores (id_fornecedor INTEGER PRIMARY KEY, nome TEXT, telefone TEXT, email TEXT);
+CREATE TABLE IF NOT EXISTS rm93069.materiais (id_material INTEGER PRIMARY KEY, id_fornecedor INTEGER, descricao TEXT);
+CREATE TABLE IF NOT EXISTS rm93069.medicamentos (
+    id_medicamento INTEGER PRIMARY KEY, nome TEXT, codigo TEXT, quantidade_minima INTEGER,
+    localizacao TEXT, id_categoria INTEGER, id_motivo INTEGER
+);
+CREATE TABLE IF NOT EXISTS rm93069.status_medicamento (id_medicamento INTEGER, id_status INTEGER);
+CREATE TABLE IF NOT EXISTS rm93069.tipo_movimentacoes (id_tipo_movimentacao INTEGER PRIMARY KEY, descricao TEXT);
+CREATE TABLE IF NOT EXISTS rm93069.responsaveis (id_responsavel INTEGER PRIMARY KEY, nome TEXT);
+CREATE TABLE IF NOT EXISTS rm93069.estoque (
+    id_estoque INTEGER PRIMARY KEY, id_medicamento INTEGER, id_responsavel INTEGER,
+    id_tipo_movimentacao INTEGER, quantidade INTEGER, data TIMESTAMP, motivo TEXT
+);
+CREATE TABLE IF NOT EXISTS rm93069.etapas_producao (id_etapa INTEGER PRIMARY KEY, descricao TEXT, prazo_estimado INTEGER);
+CREATE TABLE IF NOT EXISTS rm93069.producao (
+    id_producao INTEGER PRIMARY KEY, id_medicamento INTEGER, id_etapa INTEGER,
+    data_inicio TIMESTAMP, data_fim_prevista TIMESTAMP, data_fim_real TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS rm93069.entradas_previstas (
+    id_entrada_prevista INTEGER PRIMARY KEY, id_material INTEGER, id_medicamento INTEGER,
+    quantidade INTEGER, data_prevista TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS rm93069.atrasos_producao (
+    id_atraso INTEGER PRIMARY KEY, id_producao INTEGER, dias_atraso INTEGER, motivo TEXT
+);
+CREATE VIEW IF NOT EXISTS rm93069.medicamento AS SELECT * FROM medicamentos;
+"""
+
+# Índices criados depois da carga, para não pesar na inserção em massa
+INDICES = """
+CREATE INDEX IF NOT EXISTS rm93069.ix_estoque_medicamento ON estoque (id_medicamento);
+CREATE INDEX IF NOT EXISTS rm93069.ix_producao_medicamento ON producao (id_medicamento);
+CREATE INDEX IF NOT EXISTS rm93069.ix_atrasos_producao ON atrasos_producao (id_producao);
+CREATE INDEX IF NOT EXISTS rm93069.ix_entradas_medicamento ON entradas_previstas (id_medicamento);
+CREATE INDEX IF NOT EXISTS rm93069.ix_status_medicamento ON status_medicamento (id_medicamento);
+CREATE INDEX IF NOT EXISTS rm93069.ix_medicamentos_nome ON medicamentos (nome);
+"""
+
+# Consultas equivalentes às funções de funcoes_get.sql: nomes dos parâmetros, na ordem
+# dos argumentos da função (:p0, :p1, ...), e o SELECT do cursor
+FUNCOES = {
+    'get_medicamentos': (['p_categoria', 'p_motivo', 'p_status', 'p_medicamento'], """
+        SELECT c.descricao AS Categoria, mt.descricao AS Motivo, m.nome, m.codigo, m.quantidade_minima, m.localizacao, s.descricao AS Status
+        FROM rm93069.medicamentos m
+        JOIN rm93069.categorias c ON m.id_categoria = c.id_categoria
+        JOIN rm93069.motivos mt ON m.id_motivo = mt.id_motivo
+        JOIN rm93069.status_medicamento sm ON m.id_medicamento = sm.id_medicamento
+        JOIN rm93069.status s ON sm.id_status = s.id_status
+        WHERE (:p_categoria IS NULL OR c.descricao = :p_categoria)
+        AND (:p_motivo IS NULL OR mt.descricao = :p_motivo)
+        AND (:p_status IS NULL OR s.descricao = :p_status)
+        AND (:p_medicamento IS NULL OR m.nome = :p_medicamento)"""),
+    'get_status': (['p_status'], """
+        SELECT id_status, descricao, motivo
+        FROM rm93069.status
+        WHERE (:p_status IS NULL OR descricao = :p_status)"""),
+    'get_fornecedores': (['p_fornecedor_id'], """
+        SELECT id_fornecedor, nome, telefone, email
+        FROM rm93069.fornecedores
+        WHERE (:p_fornecedor_id IS NULL OR id_fornecedor = :p_fornecedor_id)"""),
+    'get_materiais': (['p_material_id', 'p_fornecedor_id'], """
+        SELECT id_material, f.nome, descricao
+        FROM rm93069.materiais m
+        JOIN rm93069.fornecedores f ON m.id_fornecedor = f.id_fornecedor
+        WHERE (:p_material_id IS NULL OR m.id_material = :p_material_id)
+        AND (:p_fornecedor_id IS NULL OR f.id_fornecedor = :p_fornecedor_id)"""),
+    'get_categorias': (['p_categoria_id'], """
+        SELECT id_categoria, descricao
+        FROM rm93069.categorias
+        WHERE (:p_categoria_id IS NULL OR id_categoria = :p_categoria_id)"""),
+    'get_motivos': (['p_motivo_id'], """
+        SELECT id_motivo, descricao
+        FROM rm93069.motivos
+        WHERE (:p_motivo_id IS NULL OR id_motivo = :p_motivo_id)"""),
+    'get_cargos': (['p_cargo_id'], """
+        SELECT id_cargo, descricao
+        FROM rm93069.cargos
+        WHERE (:p_cargo_id IS NULL OR id_cargo = :p_cargo_id)"""),
+    'get_departamentos': (['p_departamento_id'], """
+        SELECT id_departamento, descricao
+        FROM rm93069.departamentos
+        WHERE (:p_departamento_id IS NULL OR id_departamento = :p_departamento_id)"""),
+    'get_estoque': (['p_estoque_id', 'p_medicamento_id', 'p_responsavel_id', 'p_tipo_movimentacao_id'], """
+        SELECT id_estoque, m.nome, r.nome, tm.descricao, quantidade, data, motivo
+        FROM rm93069.estoque e
+        JOIN rm93069.tipo_movimentacoes tm ON e.id_tipo_movimentacao = tm.id_tipo_movimentacao
+        JOIN rm93069.responsaveis r ON e.id_responsavel = r.id_responsavel
+        JOIN rm93069.medicamentos m ON e.id_medicamento = m.id_medicamento
+        WHERE (:p_estoque_id IS NULL OR e.id_estoque = :p_estoque_id)
+        AND (:p_medicamento_id IS NULL OR m.id_medicamento = :p_medicamento_id)
+        AND (:p_responsavel_id IS NULL OR r.id_responsavel = :p_responsavel_id)
+        AND (:p_tipo_movimentacao_id IS NULL OR tm.id_tipo_movimentacao = :p_tipo_movimentacao_id)"""),
+    'get_estoque_pagina': (['p_estoque_id', 'p_medicamento_id', 'p_responsavel_id', 'p_tipo_movimentacao_id', 'p_after_id', 'p_limit'], """
+        SELECT id_estoque, m.nome, r.nome, tm.descricao, quantidade, data, motivo
+        FROM rm93069.estoque e
+        JOIN rm93069.tipo_movimentacoes tm ON e.id_tipo_movimentacao = tm.id_tipo_movimentacao
+        JOIN rm93069.responsaveis r ON e.id_responsavel = r.id_responsavel
+        JOIN rm93069.medicamentos m ON e.id_medicamento = m.id_medicamento
+        WHERE (:p_estoque_id IS NULL OR e.id_estoque = :p_estoque_id)
+        AND (:p_medicamento_id IS NULL OR m.id_medicamento = :p_medicamento_id)
+        AND (:p_responsavel_id IS NULL OR r.id_responsavel = :p_responsavel_id)
+        AND (:p_tipo_movimentacao_id IS NULL OR tm.id_tipo_movimentacao = :p_tipo_movimentacao_id)
+        AND (:p_after_id IS NULL OR e.id_estoque > :p_after_id)
+        ORDER BY e.id_estoque
+        LIMIT :p_limit"""),
+    'get_etapas_producao': (['p_etapa_id'], """
+        SELECT id_etapa, descricao, prazo_estimado
+        FROM rm93069.etapas_producao
+        WHERE (:p_etapa_id IS NULL OR id_etapa = :p_etapa_id)"""),
+    'get_producao': (['p_producao_id', 'p_medicamento_id', 'p_etapa_id'], """
+        SELECT id_producao, m.nome, ep.descricao, data_inicio, data_fim_prevista, data_fim_real
+        FROM rm93069.producao p
+        JOIN rm93069.medicamentos m ON p.id_medicamento = m.id_medicamento
+        JOIN rm93069.etapas_producao ep ON p.id_etapa = ep.id_etapa
+        WHERE (:p_producao_id IS NULL OR p.id_producao = :p_producao_id)
+        AND (:p_medicamento_id IS NULL OR m.id_medicamento = :p_medicamento_id)
+        AND (:p_etapa_id IS NULL OR ep.id_etapa = :p_etapa_id)"""),
+    'get_producao_pagina': (['p_producao_id', 'p_medicamento_id', 'p_etapa_id', 'p_after_id', 'p_limit'], """
+        SELECT id_producao, m.nome, ep.descricao, data_inicio, data_fim_prevista, data_fim_real
+        FROM rm93069.producao p
+        JOIN rm93069.medicamentos m ON p.id_medicamento = m.id_medicamento
+        JOIN rm93069.etapas_producao ep ON p.id_etapa = ep.id_etapa
+        WHERE (:p_producao_id IS NULL OR p.id_producao = :p_producao_id)
+        AND (:p_medicamento_id IS NULL OR m.id_medicamento = :p_medicamento_id)
+        AND (:p_etapa_id IS NULL OR ep.id_etapa = :p_etapa_id)
+        AND (:p_after_id IS NULL OR p.id_producao > :p_after_id)
+        ORDER BY p.id_producao
+        LIMIT :p_limit"""),
+    'get_entradas_previstas': (['p_entrada_prevista_id', 'p_material_id', 'p_medicamento_id'], """
+        SELECT id_entrada_prevista, mat.descricao, m.nome, ep.quantidade, ep.data_prevista
+        FROM rm93069.entradas_previstas ep
+        JOIN rm93069.materiais mat ON ep.id_material = mat.id_material
+        JOIN rm93069.medicamentos m ON ep.id_medicamento = m.id_medicamento
+        WHERE (:p_entrada_prevista_id IS NULL OR ep.id_entrada_prevista = :p_entrada_prevista_id)
+        AND (:p_material_id IS NULL OR mat.id_material = :p_material_id)
+        AND (:p_medicamento_id IS NULL OR m.id_medicamento = :p_medicamento_id)"""),
+    'get_atrasos_producao': (['p_atraso_id', 'p_producao_id', 'p_medicamento_id', 'p_etapa_id'], """
+        SELECT id_atraso, m.nome, ep.descricao, dias_atraso, motivo
+        FROM rm93069.atrasos_producao ap
+        JOIN rm93069.producao p ON p.id_producao = ap.id_producao
+        JOIN rm93069.medicamentos m ON p.id_medicamento = m.id_medicamento
+        JOIN rm93069.etapas_producao ep ON p.id_etapa = ep.id_etapa
+        WHERE (:p_atraso_id IS NULL OR ap.id_atraso = :p_atraso_id)
+        AND (:p_producao_id IS NULL OR p.id_producao = :p_producao_id)
+        AND (:p_medicamento_id IS NULL OR m.id_medicamento = :p_medicamento_id)
+        AND (:p_etapa_id IS NULL OR ep.id_etapa = :p_etapa_id)"""),
+    'get_saldo_estoque': ([], """
+        SELECT m.nome, SUM(e.quantidade_saldo), MAX(e.id_estoque), COUNT(*) - COUNT(e.quantidade_saldo)
+        FROM (
+            SELECT id_estoque, id_medicamento,
+                   CASE id_tipo_movimentacao
+                       WHEN 1 THEN ABS(COALESCE(quantidade, 0))
+                       WHEN 4 THEN ABS(COALESCE(quantidade, 0))
+                       WHEN 2 THEN -ABS(COALESCE(quantidade, 0))
+                       WHEN 3 THEN COALESCE(quantidade, 0)
+                   END AS quantidade_saldo
+            FROM rm93069.estoque
+        ) e
+        JOIN rm93069.medicamentos m ON e.id_medicamento = m.id_medicamento
+        GROUP BY m.id_medicamento, m.nome"""),
+    'get_movimentos_saldo': (['p_after_id', 'p_limit'], """
+        SELECT e.id_estoque, m.nome,
+               CASE e.id_tipo_movimentacao
+                   WHEN 1 THEN ABS(COALESCE(e.quantidade, 0))
+                   WHEN 4 THEN ABS(COALESCE(e.quantidade, 0))
+                   WHEN 2 THEN -ABS(COALESCE(e.quantidade, 0))
+                   WHEN 3 THEN COALESCE(e.quantidade, 0)
+               END
+        FROM rm93069.estoque e
+        JOIN rm93069.medicamentos m ON e.id_medicamento = m.id_medicamento
+        WHERE (:p_after_id IS NULL OR e.id_estoque > :p_after_id)
+        ORDER BY e.id_estoque
+        LIMIT :p_limit"""),
+}
+
+CHAMADA_FUNCAO = re.compile(r'^\s*BEGIN\s+:ref_cursor\s*:=\s*(\w+)\((.*)\);\s*END;\s*$', re.S | re.I)
+BIND_POSICIONAL = re.compile(r':(\d+)\b')
+
+# Datas gravadas em texto ISO e lidas de volta como datetime, como o oracledb entrega DATE
+sqlite3.register_adapter(datetime, lambda valor: valor.isoformat(' '))
+sqlite3.register_converter('TIMESTAMP', lambda valor: datetime.fromisoformat(valor.decode()))
+
+
+class ErroPool(oracledb.Error):
+    """Tempo esgotado esperando uma conexão, tratado pela API como o erro equivalente do oracledb."""
+
+
+class CursorSQLite:
+    """Cursor com a parte da interface do oracledb.Cursor usada pela API."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._cursor = connection._conexao.cursor()
+        self.arraysize = 100
+        self.prefetchrows = 2
+        self.rowfactory = None
+        self.description = None
+        self.rowcount = 0
+        self._erros_lote = []
+
+    def execute(self, query, params=None):
+        chamada = CHAMADA_FUNCAO.match(query)
+        if chamada is not None:
+            self._executar_funcao(chamada.group(1), params)
+            return
+        self._cursor.execute(BIND_POSICIONAL.sub(r'?\1', query), params if params is not None else ())
+        self._definir_descricao(self._cursor)
+        self.rowcount = self._cursor.rowcount
+
+    def _executar_funcao(self, nome, params):
+        # O resultado vai para o cursor passado em :ref_cursor, como o SYS_REFCURSOR do Oracle
+        parametros, sql = FUNCOES[nome]
+        params = dict(params)
+        resultado = params.pop('ref_cursor')
+        binds = {nome_parametro: params.get(f'p{i}') for i, nome_parametro in enumerate(parametros)}
+        resultado._cursor.execute(sql, binds)
+        resultado._definir_descricao(resultado._cursor)
+
+    def _definir_descricao(self, cursor):
+        # Sem os tipos das colunas, a rowfactory aplica todas as conversões do modelo
+        if cursor.description is None:
+            self.description = None
+        else:
+            self.description = [SimpleNamespace(name=coluna[0], type_code=None, scale=None) for coluna in cursor.description]
+
+    def executemany(self, query, linhas, batcherrors=False):
+        query = BIND_POSICIONAL.sub(r'?\1', query)
+        if not batcherrors:
+            self._cursor.executemany(query, linhas)
+            self.rowcount = self._cursor.rowcount
+            return
+
+        # Cada linha é executada separadamente para que uma falha não interrompa as demais
+        self.rowcount = 0
+        self._erros_lote = []
+        for offset, linha in enumerate(linhas):
+            try:
+                self._cursor.execute(query, linha)
+                self.rowcount += self._cursor.rowcount
+            except sqlite3.Error as e:
+                self._erros_lote.append(SimpleNamespace(offset=offset, message=str(e)))
+
+    def getbatcherrors(self):
+        return self._erros_lote
+
+    def _aplicar_rowfactory(self, rows):
+        if self.rowfactory is None:
+            return rows
+        return [self.rowfactory(*row) for row in rows]
+
+    def fetchall(self):
+        return self._aplicar_rowfactory(self._cursor.fetchall())
+
+    def fetchmany(self, size=None):
+        return self._aplicar_rowfactory(self._cursor.fetchmany(size or self.arraysize))
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def __iter__(self):
+        while True:
+            rows = self.fetchmany()
+            if not rows:
+                return
+            yield from rows
+
+    def close(self):
+        self._cursor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ConexaoSQLite:
+    def __init__(self, arquivo):
+        self._conexao = sqlite3.connect(':memory:', detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        self._conexao.execute(f"ATTACH DATABASE ? AS {ESQUEMA}", (arquivo,))
+
+    def cursor(self):
+        return CursorSQLite(self)
+
+    def commit(self):
+        self._conexao.commit()
+
+    def rollback(self):
+        self._conexao.rollback()
+
+    def close(self):
+        self._conexao.close()
+
+
+class CursorSQLiteAsync(CursorSQLite):
+    """Cursor com a parte da interface do oracledb.AsyncCursor usada pela API; o SQLite roda numa thread."""
+
+    async def execute(self, query, params=None):
+        await asyncio.to_thread(CursorSQLite.execute, self, query, params)
+
+    async def executemany(self, query, linhas, batcherrors=False):
+        await asyncio.to_thread(CursorSQLite.executemany, self, query, linhas, batcherrors)
+
+    async def fetchall(self):
+        return await asyncio.to_thread(CursorSQLite.fetchall, self)
+
+    async def fetchmany(self, size=None):
+        return await asyncio.to_thread(CursorSQLite.fetchmany, self, size)
+
+    async def fetchone(self):
+        rows = await self.fetchmany(1)
+        return rows[0] if rows else None
+
+
+class ConexaoSQLiteAsync(ConexaoSQLite):
+    # rollback e close continuam síncronos: só o pool os chama, ao devolver e ao fechar
+    def cursor(self):
+        return CursorSQLiteAsync(self)
+
+    async def commit(self):
+        await asyncio.to_thread(ConexaoSQLite.commit, self)
+
+
+class PoolSQLite:
+    """Pool de conexões SQLite com os mesmos atributos de estatística do oracledb.ConnectionPool."""
+
+    conexao = ConexaoSQLite
+
+    def __init__(self, arquivo, min=2, max=10, increment=1, ping_interval=60, wait_timeout=5000, **_):
+        self.arquivo = arquivo
+        self.min = min
+        self.max = max
+        self.increment = increment
+        self.ping_interval = ping_interval
+        self.wait_timeout = wait_timeout
+        self.busy = 0
+        self._livres = [self.conexao(arquivo) for _ in range(min)]
+        self._vagas = threading.BoundedSemaphore(max)
+        self._lock = threading.Lock()
+
+    @property
+    def opened(self):
+        return len(self._livres) + self.busy
+
+    def acquire(self):
+        if not self._vagas.acquire(timeout=self.wait_timeout / 1000):
+            raise ErroPool('Tempo esgotado aguardando uma conexão livre do pool SQLite.')
+        with self._lock:
+            connection = self._livres.pop() if self._livres else None
+            self.busy += 1
+        return connection or self.conexao(self.arquivo)
+
+    def release(self, connection):
+        connection.rollback()  # Descarta o que não foi confirmado, como o oracledb ao devolver a sessão
+        with self._lock:
+            self._livres.append(connection)
+            self.busy -= 1
+        self._vagas.release()
+
+    def close(self, force=False):
+        with self._lock:
+            for connection in self._livres:
+                connection.close()
+            self._livres = []
+
+
+class PoolSQLiteAsync(PoolSQLite):
+    """Pool com a interface do oracledb.AsyncConnectionPool; a espera por uma vaga roda numa thread."""
+
+    conexao = ConexaoSQLiteAsync
+
+    async def acquire(self):
+        return await asyncio.to_thread(PoolSQLite.acquire, self)
+
+    async def release(self, connection):
+        PoolSQLite.release(self, connection)
+
+    async def close(self, force=False):
+        PoolSQLite.close(self, force)
+
+
+def _criar_tabelas(arquivo):
+    conexao = ConexaoSQLite(arquivo)
+    conexao._conexao.executescript(TABELAS)
+    conexao.close()
+
+
+def criar_pool(arquivo, **config):
+    """Abre o banco SQLite (criando as tabelas se ainda não existirem) e retorna o pool."""
+    _criar_tabelas(arquivo)
+    return PoolSQLite(arquivo, **config)
+
+
+def criar_pool_async(arquivo, **config):
+    """Como `criar_pool`, mas com o pool assíncrono do modo ASGI."""
+    _criar_tabelas(arquivo)
+    return PoolSQLiteAsync(arquivo, **config)
+
+
+# Geração de dados sintéticos
+
+MEDICAMENTOS = [
+    'Paracetamol', 'Ibuprofeno', 'Dipirona', 'Amoxicilina', 'Aspirina', 'Cloridrato de metformina',
+    'Omeprazol', 'Loratadina', 'Insulina', 'Azitromicina', 'Oxcarbazepina', 'Losartana', 'Sinvastatina',
+    'Atenolol', 'Captopril', 'Enalapril', 'Fluoxetina', 'Sertralina', 'Clonazepam', 'Diazepam',
+    'Cetirizina', 'Prednisona', 'Dexametasona', 'Cefalexina', 'Ciprofloxacino', 'Metronidazol',
+    'Ranitidina', 'Pantoprazol', 'Levotiroxina', 'Furosemida', 'Hidroclorotiazida', 'Anlodipino',
+]
+CATEGORIAS = ['Analgésico', 'Antibiótico', 'Anti-inflamatório', 'Antialérgico', 'Antidiabético', 'Anti-hipertensivo']
+MOTIVOS = ['Uso contínuo', 'Uso eventual', 'Controle especial', 'Alta demanda']
+STATUS = [('Ativo', 'Em linha'), ('Em falta', 'Sem estoque no fornecedor'), ('Descontinuado', 'Fabricação encerrada')]
+TIPOS_MOVIMENTACAO = ['Entrada', 'Saída', 'Ajuste', 'Devolução']
+ETAPAS = [('Pesagem', 1), ('Mistura', 2), ('Compressão', 3), ('Revestimento', 2), ('Embalagem', 1)]
+MOTIVOS_ESTOQUE = ['Compra', 'Venda', 'Inventário', 'Vencimento', 'Transferência']
+MOTIVOS_ATRASO = ['Falta de matéria-prima', 'Manutenção de equipamento', 'Reprovação no controle de qualidade']
+
+
+def _nomes_medicamentos(quantidade):
+    # Os primeiros são os nomes conhecidos; depois, variações numeradas para manter os nomes únicos
+    return [MEDICAMENTOS[i % len(MEDICAMENTOS)] + (f' {i // len(MEDICAMENTOS) + 1}' if i >= len(MEDICAMENTOS) else '')
+            for i in range(quantidade)]
+
+
+def _inserir(conexao, tabela, linhas, lote=50000):
+    """Insere as linhas do gerador em lotes, sem montar a tabela inteira em memória."""
+    lote_atual = []
+    sql = None
+    for linha in linhas:
+        if sql is None:
+            sql = f"INSERT INTO {ESQUEMA}.{tabela} VALUES ({', '.join('?' * len(linha))})"
+        lote_atual.append(linha)
+        if len(lote_atual) >= lote:
+            conexao.executemany(sql, lote_atual)
+            lote_atual = []
+    if lote_atual:
+        conexao.executemany(sql, lote_atual)
+
+
+def gerar_dados(arquivo, estoque=100000, producao=10000, medicamentos=200, fornecedores=50, materiais=500,
+                responsaveis=100, semente=42):
+    """Cria (ou recria) o banco SQLite com dados sintéticos, de forma determinística pela `semente`.
+
+    Os movimentos de estoque são gerados e inseridos em lotes, então o volume pode chegar a
+    dezenas de milhões de linhas com memória constante.
+    """
+    aleatorio = random.Random(semente)
+    inicio_periodo = datetime(2022, 1, 1)
+
+    conexao = sqlite3.connect(':memory:')
+    conexao.execute(f"ATTACH DATABASE ? AS {ESQUEMA}", (arquivo,))
+    conexao.executescript(f"""
+        PRAGMA {ESQUEMA}.journal_mode = OFF;
+        PRAGMA {ESQUEMA}.synchronous = OFF;
+    """)
+    for tabela in re.findall(r'CREATE TABLE IF NOT EXISTS rm93069\.(\w+)', TABELAS):
+        conexao.execute(f"DROP TABLE IF EXISTS {ESQUEMA}.{tabela}")
+    conexao.execute(f"DROP VIEW IF EXISTS {ESQUEMA}.medicamento")
+    conexao.executescript(TABELAS)
+
+    _inserir(conexao, 'categorias', ((i, nome) for i, nome in enumerate(CATEGORIAS, 1)))
+    _inserir(conexao, 'motivos', ((i, nome) for i, nome in enumerate(MOTIVOS, 1)))
+    _inserir(conexao, 'status', ((i, nome, motivo) for i, (nome, motivo) in enumerate(STATUS, 1)))
+    _inserir(conexao, 'cargos', ((i, nome) for i, nome in enumerate(['Farmacêutico', 'Técnico', 'Gerente'], 1)))
+    _inserir(conexao, 'departamentos', ((i, nome) for i, nome in enumerate(['Produção', 'Logística', 'Qualidade'], 1)))
+    _inserir(conexao, 'tipo_movimentacoes', ((i, nome) for i, nome in enumerate(TIPOS_MOVIMENTACAO, 1)))
+    _inserir(conexao, 'etapas_producao', ((i, nome, prazo) for i, (nome, prazo) in enumerate(ETAPAS, 1)))
+    _inserir(conexao, 'responsaveis', ((i, f'Responsável {i}') for i in range(1, responsaveis + 1)))
+    _inserir(conexao, 'fornecedores', (
+        (i, f'Fornecedor {i}', f'11 9{i:04d}-{i:04d}', f'contato{i}@fornecedor{i}.com.br')
+        for i in range(1, fornecedores + 1)
+    ))
+    _inserir(conexao, 'materiais', (
+        (i, aleatorio.randint(1, fornecedores), f'Material {i}') for i in range(1, materiais + 1)
+    ))
+
+    _inserir(conexao, 'medicamentos', (
+        (i, nome, f'MED{i:05d}', aleatorio.choice([10, 20, 50, 100, 200]), f'Corredor {aleatorio.randint(1, 20)}',
+         aleatorio.randint(1, len(CATEGORIAS)), aleatorio.randint(1, len(MOTIVOS)))
+        for i, nome in enumerate(_nomes_medicamentos(medicamentos), 1)
+    ))
+    # A maioria ativa, alguns em falta e poucos descontinuados
+    _inserir(conexao, 'status_medicamento', (
+        (i, aleatorio.choices([1, 2, 3], weights=[90, 8, 2])[0]) for i in range(1, medicamentos + 1)
+    ))
+
+    segundos_periodo = 3 * 365 * 24 * 3600
+    _inserir(conexao, 'estoque', (
+        (i, aleatorio.randint(1, medicamentos), aleatorio.randint(1, responsaveis),
+         aleatorio.randint(1, len(TIPOS_MOVIMENTACAO)), aleatorio.randint(1, 500),
+         inicio_periodo + timedelta(seconds=aleatorio.randrange(segundos_periodo)), aleatorio.choice(MOTIVOS_ESTOQUE))
+        for i in range(1, estoque + 1)
+    ))
+
+    atrasadas = []
+
+    def linhas_producao():
+        for i in range(1, producao + 1):
+            data_inicio = inicio_periodo + timedelta(days=aleatorio.randrange(3 * 365))
+            data_fim_prevista = data_inicio + timedelta(days=aleatorio.randint(5, 30))
+            atraso = aleatorio.random() < 0.1
+            data_fim_real = None
+            if aleatorio.random() < 0.8:
+                data_fim_real = data_fim_prevista + timedelta(days=aleatorio.randint(1, 15) if atraso else 0)
+            if atraso:
+                atrasadas.append(i)
+            yield (i, aleatorio.randint(1, medicamentos), aleatorio.randint(1, len(ETAPAS)),
+                   data_inicio, data_fim_prevista, data_fim_real)
+
+    _inserir(conexao, 'producao', linhas_producao())
+    _inserir(conexao, 'atrasos_producao', (
+        (i, id_producao, aleatorio.randint(1, 15), aleatorio.choice(MOTIVOS_ATRASO))
+        for i, id_producao in enumerate(atrasadas, 1)
+    ))
+    _inserir(conexao, 'entradas_previstas', (
+        (i, aleatorio.randint(1, materiais), aleatorio.randint(1, medicamentos), aleatorio.randint(10, 1000),
+         inicio_periodo + timedelta(days=aleatorio.randrange(4 * 365)))
+        for i in range(1, max(producao // 2, 1) + 1)
+    ))
+
+    conexao.commit()
+    conexao.executescript(INDICES)
+    conexao.execute(f"ANALYZE {ESQUEMA}")
+    conexao.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gera um banco SQLite com dados sintéticos do StockFlux')
+    parser.add_argument('arquivo', help='caminho do banco SQLite (recriado se já existir)')
+    parser.add_argument('--estoque', type=int, default=100000, help='movimentações de estoque')
+    parser.add_argument('--producao', type=int, default=10000, help='ordens de produção')
+    parser.add_argument('--medicamentos', type=int, default=200)
+    parser.add_argument('--fornecedores', type=int, default=50)
+    parser.add_argument('--materiais', type=int, default=500)
+    parser.add_argument('--semente', type=int, default=42)
+    opcoes = parser.parse_args()
+
+    inicio = time.perf_counter()
+    gerar_dados(opcoes.arquivo, estoque=opcoes.estoque, producao=opcoes.producao, medicamentos=opcoes.medicamentos,
+                fornecedores=opcoes.fornecedores, materiais=opcoes.materiais, semente=opcoes.semente)
+    print(f'Banco {opcoes.arquivo} gerado em {time.perf_counter() - inicio:.1f}s')
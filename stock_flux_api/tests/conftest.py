@@ -0,0 +1,5 @@
+"""Os módulos da API são importados pelo nome, como ao rodar `python main.py` em stock_flux_api/."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
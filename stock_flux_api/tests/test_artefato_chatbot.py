@@ -0,0 +1,71 @@
+"""Artefato do chatbot truncado ou mal formado: `carregar` recusa com ValueError e `carregar_ou_compilar` recompila."""
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from artefato_chatbot import MAGICO, carregar, carregar_ou_compilar, compilar_arquivo
+
+INTENTS = {'intents': [
+    {'tag': 'saudacao', 'patterns': ['bom dia', 'olá'], 'responses': ['Olá!']},
+    {'tag': 'estoque', 'patterns': ['tem estoque de paracetamol'], 'responses': []},
+]}
+
+
+def cabecalho(meta):
+    dados = json.dumps(meta).encode('utf-8')
+    return MAGICO + struct.pack('<Q', len(dados)) + dados
+
+
+@pytest.fixture
+def intents(tmp_path):
+    caminho = tmp_path / 'intents.json'
+    caminho.write_text(json.dumps(INTENTS), encoding='utf-8')
+    return str(caminho)
+
+
+def corromper(caminho, caso):
+    with open(caminho, 'rb') as f:
+        original = f.read()
+    conteudo = {
+        'vazio': b'',
+        'so_magico': MAGICO,
+        'tamanho_incompleto': MAGICO + b'\x10\x00',
+        'cabecalho_truncado': original[:len(MAGICO) + 20],
+        'dados_truncados': original[:len(original) // 2],
+        'json_invalido': MAGICO + struct.pack('<Q', 5) + b'{"a":',
+        'sem_arrays': cabecalho({'formato': 1, 'checksum': 'x'}),
+        'cabecalho_lista': cabecalho([1, 2]),
+        'array_sem_dtype': cabecalho({'arrays': {'termos': {'shape': [3], 'offset': 0}}}),
+    }[caso]
+    with open(caminho, 'wb') as f:
+        f.write(conteudo)
+
+
+CASOS = ['vazio', 'so_magico', 'tamanho_incompleto', 'cabecalho_truncado', 'dados_truncados', 'json_invalido',
+         'sem_arrays', 'cabecalho_lista', 'array_sem_dtype']
+
+
+@pytest.mark.parametrize('caso', CASOS)
+def test_carregar_recusa_com_value_error(intents, caso):
+    caminho = compilar_arquivo(intents)
+    corromper(caminho, caso)
+    with pytest.raises(ValueError):
+        carregar(caminho)
+
+
+@pytest.mark.parametrize('caso', CASOS)
+def test_carregar_ou_compilar_recompila(intents, caso):
+    caminho = compilar_arquivo(intents)
+    esperado = carregar(caminho)
+    esperado = (esperado.meta, {nome: array.copy() for nome, array in esperado.arrays.items()})
+    corromper(caminho, caso)
+
+    artefato = carregar_ou_compilar(intents)
+    assert artefato.meta == esperado[0]
+    assert artefato.arrays.keys() == esperado[1].keys()
+    for nome, array in esperado[1].items():
+        np.testing.assert_array_equal(artefato.arrays[nome], array)
+    # O arquivo foi regravado e volta a carregar sem recompilar
+    assert carregar(caminho).meta == esperado[0]
@@ -0,0 +1,99 @@
+"""Top-k do índice invertido (`ChatBot.buscar`) igual à busca exaustiva, inclusive nos empates."""
+import json
+
+import pytest
+
+from chatbot import CAMINHO_INTENTS, ChatBot
+
+
+def referencia(bot, mensagem, k, minimo):
+    """Força bruta independente: melhor padrão de cada tag, empate pelo padrão de menor índice."""
+    pontuacoes = bot.calcular_similaridades([mensagem])[0]
+    melhor = {}
+    for indice, (tag, pontuacao) in enumerate(zip(bot.tags, pontuacoes.tolist())):
+        if pontuacao > minimo and (tag not in melhor or pontuacao > melhor[tag][0]):
+            melhor[tag] = (pontuacao, indice)
+    ordem = sorted(melhor.items(), key=lambda item: (-item[1][0], item[1][1]))
+    return [(tag, pontuacao) for tag, (pontuacao, _) in ordem[:k]]
+
+
+def criar_bot(tmp_path, intents):
+    caminho = tmp_path / 'intents.json'
+    caminho.write_text(json.dumps({'intents': intents}, ensure_ascii=False), encoding='utf-8')
+    return ChatBot(str(caminho), str(tmp_path / 'intents.chatbot.bin'))
+
+
+@pytest.fixture(scope='module')
+def bot(tmp_path_factory):
+    with open(CAMINHO_INTENTS, encoding='utf-8') as f:
+        intents = json.load(f)['intents']
+    return criar_bot(tmp_path_factory.mktemp('intents'), intents)
+
+
+@pytest.fixture(scope='module')
+def mensagens(bot):
+    with open(CAMINHO_INTENTS, encoding='utf-8') as f:
+        padroes = [padrao for intent in json.load(f)['intents'] for padrao in intent['patterns']]
+    extras = ['tem', 'estoque', 'tem estoque', 'qual o estoque de remédio', 'paracetamol ibuprofeno dipirona',
+              'tem paracetamol ou ibuprofeno em estoque', 'bom dia', '']
+    return [bot.corrigir_ortografia(mensagem) for mensagem in padroes + extras]
+
+
+@pytest.mark.parametrize('k', [1, 3, 5, 50])
+@pytest.mark.parametrize('minimo', [0.0, 0.5])
+def test_buscar_igual_a_forca_bruta(bot, mensagens, k, minimo):
+    for mensagem in mensagens:
+        esperado = referencia(bot, mensagem, k, minimo)
+        assert bot.buscar(mensagem, k, minimo) == esperado, mensagem
+        assert bot.buscar_exaustivo(mensagem, k, minimo) == esperado, mensagem
+
+
+def test_k_maior_que_os_candidatos(bot):
+    # Só as tags com algum padrão acima do mínimo entram, mesmo com k maior que o total
+    total_tags = len(set(bot.tags))
+    resultado = bot.buscar('tem paracetamol', total_tags + 10)
+    assert resultado == referencia(bot, 'tem paracetamol', total_tags + 10, 0.0)
+    assert len(resultado) <= total_tags
+
+
+def test_empates(tmp_path):
+    # Padrões idênticos em várias tags: todas empatam e a ordem é a dos padrões
+    intents = [
+        {'tag': 'Gama', 'patterns': ['tem remedio em estoque', 'gama']},
+        {'tag': 'Alfa', 'patterns': ['tem remedio em estoque', 'alfa']},
+        {'tag': 'Beta', 'patterns': ['quero alfa', 'tem remedio em estoque']},
+        {'tag': 'Delta', 'patterns': ['delta em estoque']},
+    ]
+    bot = criar_bot(tmp_path, intents)
+    for mensagem in ['tem remedio em estoque', 'remedio', 'estoque', 'alfa', 'tem alfa em estoque']:
+        for k in (1, 2, 3, 4, 10):
+            esperado = referencia(bot, mensagem, k, 0.0)
+            assert bot.buscar(mensagem, k) == esperado, (mensagem, k)
+            assert bot.buscar_exaustivo(mensagem, k) == esperado, (mensagem, k)
+
+    empatadas = bot.buscar('tem remedio em estoque', 10)
+    assert [tag for tag, _ in empatadas[:3]] == ['Gama', 'Alfa', 'Beta']
+    assert empatadas[0][1] == empatadas[1][1] == empatadas[2][1]
+
+
+def test_catalogo_grande_pela_poda(tmp_path, monkeypatch):
+    # Com muitas tags os termos comuns são podados: a busca por um nome pontua só os padrões dele
+    modelos = ['tem {nome}?', 'qual o estoque de {nome}?', 'vocês têm {nome} em estoque?', '{nome} está disponível?']
+    intents = [{'tag': f'Med{i}', 'patterns': [modelo.format(nome=f'med{i}') for modelo in modelos]} for i in range(300)]
+    bot = criar_bot(tmp_path, intents)
+    exaustiva = []
+    monkeypatch.setattr(bot, 'buscar_exaustivo', lambda *args: exaustiva.append(args) or ChatBot.buscar_exaustivo(bot, *args))
+
+    for i in range(0, 300, 7):
+        for mensagem in [f'tem med{i} em estoque', f'med{i}', f'med{i} med{i + 1} disponível']:
+            for k in (1, 5, 400):
+                assert bot.buscar(mensagem, k) == referencia(bot, mensagem, k, 0.0), (mensagem, k)
+
+    exaustiva.clear()
+    for i in range(300):
+        assert bot.buscar(f'med{i}', 1) == referencia(bot, f'med{i}', 1, 0.0)
+    assert not exaustiva
+
+
+def test_sem_termos_conhecidos(bot):
+    assert bot.buscar('xyz', 5) == [] == referencia(bot, 'xyz', 5, 0.0)
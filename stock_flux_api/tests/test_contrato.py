@@ -0,0 +1,236 @@
+"""Contrato comum dos modos Flask (main.py) e ASGI (main_async.py), sobre o backend SQLite.
+
+Cada caso faz a mesma requisição nas duas APIs e compara status, corpo e os cabeçalhos que
+os clientes usam. As diferenças conhecidas (seção do modo ASGI no README) ficam de fora.
+"""
+import gzip
+import json
+
+import pytest
+from starlette.testclient import TestClient
+
+import cache
+import database
+import main
+import main_async
+import sqlite_local
+
+# Cabeçalhos comparados literalmente; Vary é comparado como conjunto de nomes
+CABECALHOS = ('content-type', 'content-encoding', 'etag', 'x-next-cursor')
+PEDIDO = {'Origin': 'http://painel.exemplo', 'Accept-Encoding': 'identity'}
+
+
+@pytest.fixture(scope='module')
+def apis(tmp_path_factory):
+    arquivo = str(tmp_path_factory.mktemp('contrato') / 'stockflux.db')
+    sqlite_local.gerar_dados(arquivo, estoque=300, producao=40, medicamentos=40, fornecedores=5, materiais=10,
+                             responsaveis=5)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv('STOCKFLUX_SQLITE', arquivo)
+        monkeypatch.setattr(database, '_pool', None)
+        monkeypatch.setattr(database, '_pool_async', None)
+        with TestClient(main_async.app, raise_server_exceptions=False) as asgi:
+            yield main.app.test_client(), asgi
+
+
+def pedir(cliente, metodo, url, corpo=None, cabecalhos=None, bruto=None, limpar_cache=True):
+    """(status, cabeçalhos em minúsculas, corpo descomprimido) da resposta, nos dois clientes.
+
+    `corpo` vai como JSON; `bruto` vai como está, com Content-Type application/json. O cache é
+    do processo, então por padrão é limpo antes para que cada API monte a própria resposta.
+    """
+    if limpar_cache:
+        cache.lookup_cache.clear()
+    cabecalhos = {**PEDIDO, **(cabecalhos or {})}
+    if bruto is not None:
+        cabecalhos['Content-Type'] = 'application/json'
+    if isinstance(cliente, TestClient):
+        resposta = cliente.request(metodo, url, json=corpo, content=bruto, headers=cabecalhos)
+        dados = resposta.content  # O httpx já descomprime
+    else:
+        resposta = cliente.open(url, method=metodo, json=corpo, data=bruto, headers=cabecalhos)
+        dados = resposta.data
+        if resposta.headers.get('Content-Encoding') == 'gzip':
+            dados = gzip.decompress(dados)
+
+    # Cabeçalhos repetidos (o Flask envia um Vary por valor) viram um só, separado por vírgulas
+    recebidos = {}
+    for nome, valor in resposta.headers.items():
+        nome = nome.lower()
+        recebidos[nome] = f'{recebidos[nome]}, {valor}' if nome in recebidos else valor
+    return resposta.status_code, recebidos, dados
+
+
+def vary(cabecalhos):
+    return {nome.strip().lower() for nome in cabecalhos.get('vary', '').split(',') if nome.strip()}
+
+
+def sem_campos(dados, *campos):
+    if isinstance(dados, dict):
+        return {k: sem_campos(v, *campos) for k, v in dados.items() if k not in campos}
+    if isinstance(dados, list):
+        return [sem_campos(item, *campos) for item in dados]
+    return dados
+
+
+def comparar(apis, metodo, url, corpo=None, cabecalhos=None, bruto=None):
+    flask, asgi = (pedir(cliente, metodo, url, corpo, cabecalhos, bruto) for cliente in apis)
+    assert flask[0] == asgi[0], url
+    for nome in CABECALHOS:
+        assert flask[1].get(nome) == asgi[1].get(nome), (url, nome)
+    assert vary(flask[1]) == vary(asgi[1]), url
+    assert flask[2] == asgi[2], url
+    return flask
+
+
+@pytest.mark.parametrize('url', [
+    '/api/status',
+    '/api/status?status=Ativo',
+    '/api/fornecedores',
+    '/api/materiais?fornecedor_id=1&fornecedor_id=2',
+    '/api/categorias',
+    '/api/etapas_producao',
+    '/api/estoque',
+    '/api/estoque?limit=5',
+    '/api/estoque?limit=5&after_id=5',
+    '/api/producao?limit=7&medicamento_id=3',
+    '/api/entradas_previstas',
+    '/api/atrasos_producao',
+    '/api/medicamentos',
+    '/api/medicamentos?categoria=Analgésico',
+    '/api/medicamentos/id?nome_medicamento=Paracetamol',
+    '/api/estoque/saldo',
+    '/api/export/estoque',
+])
+def test_listagens(apis, url):
+    status, cabecalhos, _ = comparar(apis, 'GET', url)
+    assert status == 200
+    if not url.startswith('/api/export/'):
+        assert cabecalhos['content-type'] == 'application/json'
+        assert cabecalhos.get('etag')
+
+
+def test_cursor_da_proxima_pagina(apis):
+    _, cabecalhos, corpo = comparar(apis, 'GET', '/api/estoque?limit=5')
+    assert cabecalhos['x-next-cursor'] == str(json.loads(corpo)[-1]['Id'])
+
+
+def test_get_condicional_e_compressao(apis):
+    for url in ('/api/estoque?limit=50', '/api/medicamentos'):
+        _, cabecalhos, _ = comparar(apis, 'GET', url, cabecalhos={'Accept-Encoding': 'gzip'})
+        assert cabecalhos['content-encoding'] == 'gzip'
+        status, _, corpo = comparar(apis, 'GET', url, cabecalhos={'Accept-Encoding': 'gzip',
+                                                                 'If-None-Match': cabecalhos['etag']})
+        assert (status, corpo) == (304, b'')
+
+
+def test_cors(apis):
+    for cliente in apis:
+        _, cabecalhos, _ = pedir(cliente, 'GET', '/api/status')
+        assert cabecalhos['access-control-allow-origin'] in ('*', PEDIDO['Origin'])
+        expostos = {nome.strip() for nome in cabecalhos['access-control-expose-headers'].split(',')}
+        assert expostos == {'ETag', 'X-Next-Cursor'}
+
+
+@pytest.mark.parametrize('url', ['/api/alertas/estoque_baixo', '/api/dashboard'])
+def test_saldos_e_alertas(apis, url):
+    # "Desde" é o momento em que cada API viu o alerta pela primeira vez; os tempos variam
+    respostas = [pedir(cliente, 'GET', url) for cliente in apis]
+    assert [status for status, _, _ in respostas] == [200, 200]
+    flask, asgi = (sem_campos(json.loads(corpo), 'Desde', 'tempos_ms') for _, _, corpo in respostas)
+    assert flask == asgi
+
+
+@pytest.mark.parametrize('metodo, url, corpo, status', [
+    ('GET', '/api/estoque?limit=abc', None, 400),
+    ('GET', '/api/producao?limit=0', None, 400),
+    ('GET', '/api/medicamentos/id', None, 400),
+    ('GET', '/api/medicamentos/id?nome_medicamento=%20', None, 400),
+    ('GET', '/api/medicamentos/id?nome_medicamento=Inexistente', None, 404),
+    ('POST', '/api/chatbot', {}, 400),
+    ('POST', '/api/chatbot/bulk', {'messages': 'texto'}, 400),
+    ('POST', '/api/status/bulk', {'Id': 1}, 400),
+    ('POST', '/api/status/bulk?batch_size=0', [], 400),
+    ('POST', '/api/status', {'Id': 1, 'Descrição': 'Ativo', 'Motivo': 'Duplicado'}, 500),
+    ('POST', '/api/fornecedores', {'Id': 900}, 500),
+    ('PUT', '/api/materiais', None, 415),
+    ('DELETE', '/api/status/bulk', None, 415),
+    ('DELETE', '/api/status/bulk?batch_size=x', None, 400),
+])
+def test_erros(apis, metodo, url, corpo, status):
+    assert comparar(apis, metodo, url, corpo)[0] == status
+
+
+@pytest.mark.parametrize('url', ['/api/status', '/api/status/bulk'])
+def test_json_malformado(apis, url):
+    assert comparar(apis, 'POST', url, bruto=b'{"Id": ')[0] == 400
+
+
+def test_erro_500_nao_invalida_o_cache(apis):
+    for cliente in apis:
+        versao = cache.versao('status')
+        assert pedir(cliente, 'POST', '/api/status', {'Id': 2, 'Descrição': 'Em falta', 'Motivo': 'x'})[0] == 500
+        assert cache.versao('status') == versao
+
+
+def test_exportacao_de_tabela_desconhecida(apis):
+    # O flask-restx acrescenta ao 404 a sugestão de rotas parecidas ("did you mean ...")
+    (status_flask, _, flask), (status_asgi, _, asgi) = (pedir(cliente, 'GET', '/api/export/nada') for cliente in apis)
+    assert status_flask == status_asgi == 404
+    assert json.loads(flask)['message'].startswith(json.loads(asgi)['message'])
+
+
+def test_chatbot(apis):
+    assert comparar(apis, 'POST', '/api/chatbot', {'message': 'qual o estoque de dipirona?'})[0] == 200
+
+    # Só perguntas de estoque: as respostas das demais intenções são sorteadas
+    corpo = {'messages': ['estoque de paracetamol', 'qual o estoque de dipirona?']}
+    respostas = [pedir(cliente, 'POST', '/api/chatbot/bulk', corpo) for cliente in apis]
+    assert [status for status, _, _ in respostas] == [200, 200]
+    flask, asgi = (sem_campos(json.loads(dados), 'tempo_ms', 'mensagens_por_segundo') for _, _, dados in respostas)
+    assert flask == asgi
+
+
+def escrever(cliente, base):
+    """Escritas e leituras em ids próprios de cada API; retorna (método, status, corpo sem os ids)."""
+    registro = {'Id': base, 'Descrição': 'Em teste', 'Motivo': 'Contrato'}
+    passos = [
+        ('POST', '/api/status', registro),
+        ('GET', '/api/status?status_id=Em teste', None),  # O filtro status_id compara a descrição
+        ('PUT', '/api/status', {**registro, 'Descrição': 'Revisado'}),
+        ('PUT', '/api/status', {**registro, 'Id': base + 50}),  # Sem linha correspondente
+        ('POST', '/api/status/bulk', [{**registro, 'Id': base + 1}, registro, {**registro, 'Id': base + 2}]),
+        ('PUT', '/api/status/bulk?batch_size=2', [{**registro, 'Id': base + 1, 'Descrição': 'Lote'}]),
+        ('DELETE', '/api/status/bulk', [{'Id': base + 1}, {'Id': base + 2}]),
+        ('GET', '/api/status?status_id=Revisado', None),
+        ('DELETE', '/api/status', {'Id': base}),
+        ('DELETE', '/api/status', {'Id': base}),
+        ('GET', '/api/status?status_id=Revisado', None),
+    ]
+    respostas = []
+    for metodo, url, corpo in passos:
+        status, _, dados = pedir(cliente, metodo, url, corpo)
+        respostas.append((metodo, status, sem_campos(json.loads(dados), 'Id')))
+    return respostas
+
+
+def test_escritas(apis):
+    flask, asgi = escrever(apis[0], 100), escrever(apis[1], 200)
+    assert flask == asgi
+    assert [status for _, status, _ in flask] == [201, 200, 200, 200, 207, 200, 200, 200, 200, 200, 200]
+    assert flask[1][2] == [{'Descrição': 'Em teste', 'Motivo': 'Contrato'}]
+    assert flask[4][2]['erros'][0]['indice'] == 1
+    assert flask[7][2] == [{'Descrição': 'Revisado', 'Motivo': 'Contrato'}]
+    assert flask[-1][2] == []
+
+
+def test_escrita_invalida_a_listagem_em_cache(apis):
+    for cliente, base in zip(apis, (300, 400)):
+        url = f'/api/status?status_id=Cache {base}'
+        assert pedir(cliente, 'GET', url)[2] == b'[]\n'  # Listagem vazia, agora no cache
+        registro = {'Id': base, 'Descrição': f'Cache {base}', 'Motivo': 'x'}
+        assert pedir(cliente, 'POST', '/api/status', registro, limpar_cache=False)[0] == 201
+        _, _, dados = pedir(cliente, 'GET', url, limpar_cache=False)
+        assert [linha['Id'] for linha in json.loads(dados)] == [base]
+        assert pedir(cliente, 'DELETE', '/api/status', {'Id': base}, limpar_cache=False)[0] == 200
+        assert pedir(cliente, 'GET', url, limpar_cache=False)[2] == b'[]\n'
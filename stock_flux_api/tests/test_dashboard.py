@@ -0,0 +1,28 @@
+"""Dashboards simultâneos rodam em paralelo, sem esperar pelas threads uns dos outros."""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import dashboard
+
+ESPERA = 0.2
+PEDIDOS = [{'medicamento_id': '1'}, {'medicamento_id': '2'}]
+
+
+def test_dashboards_simultaneos_em_paralelo(monkeypatch):
+    def listar(tabela, args, modelo):
+        time.sleep(ESPERA)  # Consulta lenta; o pool de conexões não entra no teste
+        return [{'tabela': tabela, **args}]
+
+    monkeypatch.setattr(dashboard, 'listar', listar)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=2) as requisicoes:
+        respostas = list(requisicoes.map(dashboard.montar_dashboard, PEDIDOS))
+    total = time.perf_counter() - inicio
+
+    # Em fila seriam pelo menos duas esperas; em paralelo, uma e a sobrecarga das threads
+    assert total < 1.75 * ESPERA, total
+    for args, resposta in zip(PEDIDOS, respostas):
+        for tabela in dashboard.SECOES_DASHBOARD:
+            assert resposta[tabela] == [{'tabela': tabela, **args}]
+        assert resposta['tempos_ms']['total'] < 1.75 * ESPERA * 1000
@@ -0,0 +1,62 @@
+"""Log de requisições lentas sem e-mail nem telefone, nem nos binds das consultas nem no corpo."""
+import logging
+
+import pytest
+
+import cache
+import database
+import main
+import metricas
+import sqlite_local
+
+EMAIL = 'compras@fornecedor.exemplo'
+TELEFONE = '11 98765-4321'
+
+
+@pytest.fixture
+def log_lento(monkeypatch, caplog):
+    monkeypatch.setattr(metricas, 'LIMITE_LENTO_MS', 0.0)  # Toda requisição entra no log
+    caplog.set_level(logging.WARNING, logger=metricas.logger.name)
+    return caplog
+
+
+def registros(caplog):
+    return [registro.getMessage() for registro in caplog.records if registro.name == metricas.logger.name]
+
+
+def test_binds_posicionais_e_corpo_aninhado(log_lento):
+    metricas.iniciar('/api/fornecedores', 'PUT')
+    metricas.registrar_execute('UPDATE rm93069.fornecedores', 0.01, ('Fornecedor', TELEFONE, EMAIL, 7))
+    metricas.registrar_execute('get_fornecedores', 0.01, {'fornecedor_id': 7, 'email': EMAIL})
+    metricas.finalizar(200, {'telefone': TELEFONE},
+                       lambda: {'Id': 7, 'Contato': {'Email': EMAIL, 'Telefone': TELEFONE}, 'Lista': [EMAIL]})
+
+    (mensagem,) = registros(log_lento)
+    assert EMAIL not in mensagem and TELEFONE not in mensagem
+    assert '"binds": {"itens": 4}' in mensagem
+    assert '"fornecedor_id": 7' in mensagem
+
+
+@pytest.fixture
+def cliente(tmp_path, monkeypatch):
+    arquivo = str(tmp_path / 'metricas.db')
+    sqlite_local.gerar_dados(arquivo, estoque=10, producao=5, medicamentos=5, fornecedores=2, materiais=2,
+                             responsaveis=2)
+    monkeypatch.setattr(database, '_pool', sqlite_local.criar_pool(arquivo))
+    cache.lookup_cache.clear()
+    yield main.app.test_client()
+    database.close_pool()
+
+
+def test_escritas_de_fornecedores(cliente, log_lento):
+    registro = {'Id': 900, 'Nome': 'Fornecedor', 'Telefone': TELEFONE, 'Email': EMAIL}
+    assert cliente.post('/api/fornecedores', json=registro).status_code == 201
+    assert cliente.put('/api/fornecedores', json=registro).status_code == 200
+    assert cliente.post('/api/fornecedores/bulk', json=[{**registro, 'Id': 901}]).status_code == 201
+    assert cliente.put('/api/fornecedores/bulk', json=[{**registro, 'Id': 901}]).status_code == 200
+    assert cliente.get(f'/api/fornecedores?email={EMAIL}&telefone={TELEFONE}').status_code == 200
+
+    mensagens = registros(log_lento)
+    assert len(mensagens) == 5
+    for mensagem in mensagens:
+        assert EMAIL not in mensagem and TELEFONE not in mensagem, mensagem
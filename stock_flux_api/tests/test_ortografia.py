@@ -0,0 +1,76 @@
+"""CorretorOrtografico contra a referência, `difflib.get_close_matches(n=1, cutoff=0.8)`."""
+import json
+import random
+from difflib import get_close_matches
+
+import pytest
+
+from chatbot import CAMINHO_INTENTS
+from ortografia import CorretorOrtografico
+
+CUTOFF = 0.8
+
+
+def referencia(palavra, vocabulario):
+    # Como o chatbot fazia antes do índice: a palavra fica como está quando nada passa do corte
+    return (get_close_matches(palavra, vocabulario, n=1, cutoff=CUTOFF) or [palavra])[0]
+
+
+@pytest.fixture(scope='module')
+def vocabulario():
+    with open(CAMINHO_INTENTS, encoding='utf-8') as f:
+        intents = json.load(f)['intents']
+    return sorted(set(" ".join(padrao for intent in intents for padrao in intent['patterns']).lower().split()))
+
+
+def erros_de_digitacao(palavra, aleatorio):
+    """Troca, remoção, inserção e transposição de uma letra em uma posição sorteada."""
+    i = aleatorio.randrange(len(palavra))
+    letra = aleatorio.choice('abcdefghijklmnopqrstuvwxyzçãé')
+    variantes = [palavra[:i] + letra + palavra[i + 1:], palavra[:i] + palavra[i + 1:], palavra[:i] + letra + palavra[i:]]
+    if i + 1 < len(palavra):
+        variantes.append(palavra[:i] + palavra[i + 1] + palavra[i] + palavra[i + 2:])
+    return variantes
+
+
+def test_palavras_do_vocabulario_ficam_iguais(vocabulario):
+    corretor = CorretorOrtografico(vocabulario, cutoff=CUTOFF)
+    for palavra in vocabulario:
+        assert corretor.corrigir_palavra(palavra) == referencia(palavra, vocabulario) == palavra
+
+
+def test_erros_de_digitacao(vocabulario):
+    corretor = CorretorOrtografico(vocabulario, cutoff=CUTOFF)
+    aleatorio = random.Random(7)
+    for palavra in vocabulario:
+        for variante in erros_de_digitacao(palavra, aleatorio):
+            assert corretor.corrigir_palavra(variante) == referencia(variante, vocabulario), variante
+
+
+def test_abaixo_do_corte_fica_como_veio(vocabulario):
+    corretor = CorretorOrtografico(vocabulario, cutoff=CUTOFF)
+    for palavra in ['xyz', 'q', 'kkkkkkkk', 'farmacovigilância', 'paracetamolzinhos', '']:
+        assert corretor.corrigir_palavra(palavra) == referencia(palavra, vocabulario), palavra
+    assert corretor.corrigir_palavra('xyz') == 'xyz'
+
+
+def test_empate_fica_com_a_maior_palavra_como_no_difflib():
+    vocabulario = ['remedio1', 'remedio2', 'remedio9', 'remedios']
+    corretor = CorretorOrtografico(vocabulario, cutoff=CUTOFF)
+    # A mesma razão (14/16) para as quatro palavras: o get_close_matches fica com a maior
+    assert referencia('remedio5', vocabulario) == 'remedios'
+    assert corretor.corrigir_palavra('remedio5') == 'remedios'
+
+
+def test_mensagem_inteira(vocabulario):
+    corretor = CorretorOrtografico(vocabulario, cutoff=CUTOFF)
+    mensagem = 'Tme PARACETAMOL no estoqeu xyz'
+    esperado = " ".join(referencia(palavra, vocabulario) for palavra in mensagem.lower().split())
+    assert corretor.corrigir(mensagem) == esperado
+
+
+def test_indice_recriado_corrige_igual(vocabulario):
+    corretor = CorretorOrtografico(vocabulario, cutoff=CUTOFF)
+    recriado = CorretorOrtografico.a_partir_do_indice(*corretor.indice(), cutoff=CUTOFF)
+    for palavra in ['paracetamo', 'ibuprofenno', 'estoqeu', 'xyz']:
+        assert recriado.corrigir_palavra(palavra) == corretor.corrigir_palavra(palavra)
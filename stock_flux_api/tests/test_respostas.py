@@ -0,0 +1,68 @@
+"""Corpo JSON com os dois serializadores (STOCKFLUX_JSON=json e orjson): mesmos campos e datas em ISO 8601."""
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from flask_restx import marshal
+
+import respostas
+from consultas import CONSULTAS, criar_rowfactory
+from modelos import estoque_model
+
+pytestmark = pytest.mark.skipif(respostas.orjson is None, reason='orjson não instalado')
+
+COLUNAS = CONSULTAS['estoque']['colunas']
+LINHAS = [
+    (1, 'Paracetamol', 'Responsável 1', 'Saída', 12, datetime(2024, 1, 31, 10, 5, 7, 120000), 'Venda'),
+    (2, 'Dipirona', 'Responsável 2', 'Entrada', 300, datetime(2024, 2, 1), 'Compra'),
+    (3, 'Ibuprofeno', 'Responsável 3', 'Ajuste', -4, None, None),
+]
+
+
+def montar(modelo=None):
+    # Colunas sem metadados de tipo, como no backend SQLite: o modelo aplica todas as conversões
+    cursor = SimpleNamespace(description=[SimpleNamespace(type_code=None, scale=None) for _ in COLUNAS])
+    rowfactory = criar_rowfactory(cursor, COLUNAS, modelo)
+    return [rowfactory(*linha) for linha in LINHAS]
+
+
+@pytest.mark.parametrize('serializador', ['json', 'orjson'])
+def test_corpo_igual_ao_marshal(monkeypatch, serializador):
+    monkeypatch.setattr(respostas, 'SERIALIZADOR', serializador)
+    esperado = marshal([dict(zip(COLUNAS, linha)) for linha in LINHAS], estoque_model)
+
+    corpo = respostas.serializar(montar(estoque_model))
+    assert corpo.endswith(b'\n')
+    assert json.loads(corpo) == json.loads(json.dumps(esperado))
+    assert json.loads(corpo)[0]['Data'] == '2024-01-31T10:05:07.120000'
+    assert json.loads(corpo)[1]['Data'] == '2024-02-01T00:00:00'
+
+
+def test_json_e_orjson_decodificam_igual(monkeypatch):
+    corpos = {}
+    for serializador in ('json', 'orjson'):
+        monkeypatch.setattr(respostas, 'SERIALIZADOR', serializador)
+        corpos[serializador] = json.loads(respostas.serializar(montar(estoque_model)))
+    assert corpos['json'] == corpos['orjson']
+    assert list(corpos['orjson'][0]) == COLUNAS
+
+
+def test_ndjson_igual_nos_dois_serializadores(monkeypatch):
+    linhas = {}
+    for serializador in ('json', 'orjson'):
+        monkeypatch.setattr(respostas, 'SERIALIZADOR', serializador)
+        corpo = respostas.serializar_linhas(montar())
+        linhas[serializador] = [json.loads(linha) for linha in corpo.decode('utf-8').splitlines()]
+    assert linhas['json'] == linhas['orjson']
+    assert linhas['orjson'][0]['Data'] == '2024-01-31T10:05:07.120000'
+
+
+def test_opcoes_indent_e_sort_keys(monkeypatch):
+    dados = {'b': 1, 'a': ['ç', None]}
+    corpos = {}
+    for serializador in ('json', 'orjson'):
+        monkeypatch.setattr(respostas, 'SERIALIZADOR', serializador)
+        corpos[serializador] = respostas.serializar(dados, indent=2, sort_keys=True)
+    assert json.loads(corpos['json']) == json.loads(corpos['orjson']) == dados
+    assert corpos['orjson'].decode('utf-8').splitlines()[1] == '  "a": ['
@@ -0,0 +1,80 @@
+"""Saldo de estoque somado no banco (get_saldo_estoque / get_movimentos_saldo) sobre o backend SQLite."""
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+import database
+import sqlite_local
+from saldo_estoque import SaldosEstoque, ler_estoque, ler_movimentos_novos
+
+# Referência independente do CASE das funções: o sinal pela descrição do tipo
+SINAIS = {'Entrada': 1, 'Devolução': 1, 'Saída': -1}
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    arquivo = str(tmp_path / 'saldo.db')
+    sqlite_local.gerar_dados(arquivo, estoque=2000, producao=10, medicamentos=30, fornecedores=2, materiais=2,
+                             responsaveis=3)
+    monkeypatch.setattr(database, '_pool', sqlite_local.criar_pool(arquivo))
+    yield arquivo
+    database.close_pool()
+
+
+def referencia(arquivo):
+    conexao = sqlite3.connect(arquivo)
+    linhas = conexao.execute("""
+        SELECT m.nome, tm.descricao, e.quantidade, e.id_estoque
+        FROM estoque e
+        JOIN medicamentos m ON e.id_medicamento = m.id_medicamento
+        JOIN tipo_movimentacoes tm ON e.id_tipo_movimentacao = tm.id_tipo_movimentacao""").fetchall()
+    conexao.close()
+    saldos = {}
+    for nome, tipo, quantidade, _ in linhas:
+        sinal = SINAIS.get(tipo)
+        saldos[nome] = saldos.get(nome, 0) + (quantidade if sinal is None else sinal * abs(quantidade))
+    return saldos, max(linha[3] for linha in linhas)
+
+
+def inserir(arquivo, *movimentos):
+    conexao = sqlite3.connect(arquivo)
+    conexao.executemany("INSERT INTO estoque VALUES (?, ?, 1, ?, ?, ?, 'Teste')",
+                        [(*movimento, datetime(2026, 1, 1).isoformat(' ')) for movimento in movimentos])
+    conexao.commit()
+    conexao.close()
+
+
+def test_carga_completa_igual_a_soma_dos_movimentos(banco):
+    inserir(banco, (2001, 1, 3, -7), (2002, 1, 2, -5), (2003, 2, 1, -4))  # Ajuste negativo e quantidades negativas
+    _, saldos, ultimo_id = ler_estoque()
+    assert (saldos, ultimo_id) == referencia(banco)
+
+
+def test_movimentos_novos_somados_aos_tocados(banco):
+    medicamentos, saldos, ultimo_id = ler_estoque()
+    estoque = SaldosEstoque()
+    estoque.atualizar(medicamentos, saldos, ultimo_id)
+
+    inserir(banco, (ultimo_id + 1, 1, 1, 10), (ultimo_id + 2, 1, 2, 3), (ultimo_id + 3, 2, 4, 6), (ultimo_id + 4, 2, 3, -2))
+    estoque.aplicar(ler_movimentos_novos(estoque.ultimo_id))
+
+    esperado, ultimo_esperado = referencia(banco)
+    assert estoque.saldos == esperado
+    assert estoque.ultimo_id == ultimo_esperado
+    assert estoque.aplicar(ler_movimentos_novos(estoque.ultimo_id)) == set()
+
+
+def test_tipo_sem_sinal_e_erro(banco):
+    medicamentos, saldos, ultimo_id = ler_estoque()
+    estoque = SaldosEstoque()
+    estoque.atualizar(medicamentos, dict(saldos), ultimo_id)
+
+    inserir(banco, (ultimo_id + 1, 1, 1, 10), (ultimo_id + 2, 1, 9, 5))  # Tipo 9 fora do CASE
+    with pytest.raises(ValueError, match='sem sinal'):
+        estoque.aplicar(ler_movimentos_novos(estoque.ultimo_id))
+    # Nada publicado: a próxima atualização lê os mesmos movimentos de novo
+    assert (estoque.saldos, estoque.ultimo_id) == (saldos, ultimo_id)
+
+    with pytest.raises(ValueError, match='sem sinal'):
+        ler_estoque()
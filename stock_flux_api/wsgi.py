@@ -0,0 +1,10 @@
+"""Ponto de entrada dos servidores WSGI, por exemplo:
+
+    gunicorn --chdir stock_flux_api wsgi:app
+
+A importação já abre o pool com as credenciais (`main.iniciar_app`), então cada worker sobe
+com as conexões prontas e falha na subida se o credentials.json for inválido.
+"""
+from main import app, iniciar_app
+
+iniciar_app()